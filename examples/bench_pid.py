@@ -0,0 +1,108 @@
+# Measure the cost of one PID.control() tick
+#
+# Compares the former control law (kept here as LegacyPID) with the current
+# PID in float and fixed point mode, with the AlphaBeta estimator rate and with the
+# tick instrumentation (tickstats) on. Reports the time per tick and the heap
+# consumed per tick (gc.mem_alloc, MicroPython only: 'heap unmeasured' on the
+# host, whose gc stand-in returns -1).
+#
+# Run on the Pico from REPL ( import bench_pid ) or on the host with:
+#   python3 host/run.py examples/bench_pid.py
+#
+from pid import PID
+from estimator import AlphaBeta
+from tickstats import TickStats
+import gc
+import time
+
+TICKS = 2000
+
+try:
+	from time import perf_counter # CPython (host)
+	def now_us():
+		return int( perf_counter()*1000000 )
+	def elapsed_us( start ):
+		return now_us()-start
+except ImportError:
+	now_us = time.ticks_us
+	def elapsed_us( start ):
+		return time.ticks_diff( time.ticks_us(), start )
+
+class LegacyPID:
+	""" The control law as it was before the precomputed/fixed point version """
+	def __init__(self, Kp, Ki, Kd, dt, setpoint, measure_func, output_func, output_min, output_max):
+		self.Kp = Kp
+		self.Ki = Ki
+		self.Kd = Kd
+		self.dt = int(round(dt / 1000))
+		self.setpoint = setpoint
+		self.measure_func = measure_func
+		self.output_func = output_func
+		self.output_min = output_min
+		self.output_max = output_max
+		self.last_measure = measure_func()
+		self.error = setpoint - self.last_measure
+		self.integral = 0
+
+	def control(self, timer):
+		self.last_measure = self.measure_func()
+		error = self.setpoint - self.last_measure
+		proportional = self.Kp * error
+		self.integral = self.integral + error * self.dt
+		if (proportional > self.output_max) or (proportional < self.output_min):
+			self.integral = 0
+		self.derivative = (error - self.error) / self.dt
+		output = proportional + self.Ki * self.integral + self.Kd * self.derivative
+		self.error = error
+		output = max(self.output_min, output)
+		output = min(self.output_max, output)
+		self.output_func(output)
+
+_float_temps = [ 148.0+(i%16)*0.25 for i in range(16) ]
+_fixed_temps = [ int(t*4) for t in _float_temps ] # quarter of degree
+_idx = 0
+
+def measure_float():
+	global _idx
+	_idx = (_idx+1) & 15
+	return _float_temps[_idx]
+
+def measure_fixed():
+	global _idx
+	_idx = (_idx+1) & 15
+	return _fixed_temps[_idx]
+
+def output( value ):
+	pass
+
+def bench( label, pid ):
+	if hasattr( pid, 'timer' ):
+		pid.timer.deinit() # ticks are triggered by the bench
+	gc.collect()
+	_alloc = gc.mem_alloc() if hasattr(gc, 'mem_alloc') else None
+	if (_alloc != None) and (_alloc < 0):
+		_alloc = None # host stand-in
+	_start = now_us()
+	for i in range( TICKS ):
+		pid.control( None )
+	_us = elapsed_us( _start )
+	_bytes = (gc.mem_alloc()-_alloc) if _alloc != None else None
+	print( '%-14s %8.2f us/tick  %s' % (label, _us/TICKS, ('%6.1f bytes/tick' % (_bytes/TICKS)) if _bytes != None else '(heap unmeasured)') )
+
+gc.disable()
+try:
+	bench( 'legacy', LegacyPID(Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, setpoint=150, measure_func=measure_float, output_func=output, output_min=0, output_max=100) )
+	bench( 'float', PID(Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, setpoint=150, measure_func=measure_float, output_func=output, output_min=0, output_max=100) )
+	_est = AlphaBeta( 100, tau_ms=3000 )
+	def measure_est():
+		_est.update( measure_float() ) # 1 sample per tick here, 10 per tick with a 100ms sampler
+		return _est.value
+	def rate_est():
+		return _est.rate
+	bench( 'float+estim.', PID(Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, setpoint=150, measure_func=measure_est, output_func=output, output_min=0, output_max=100, rate_func=rate_est) )
+	_pid = PID(Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, setpoint=150, measure_func=measure_float, output_func=output, output_min=0, output_max=100)
+	_pid.stats = TickStats()
+	bench( 'float+stats', _pid )
+	bench( 'fixed (Q16)', PID(Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, setpoint=150*4, measure_func=measure_fixed, output_func=output, output_min=0, output_max=100, fixed=True) )
+finally:
+	gc.enable()
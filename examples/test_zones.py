@@ -0,0 +1,28 @@
+# Regulate two heating zones with a ZoneBank (one Timer, one SPI burst)
+#
+# Zone 0: thermocouple CS on GP5, SSR on GP13 (the plate wiring)
+# Zone 1: thermocouple CS on GP20, SSR on GP14
+# Both MAX31855 share SPI(0). Prints elapsed, temperature and duty of each zone.
+#
+# Compatible with:
+#  * Raspberry-Pico
+#
+from plancha import Plancha
+import time
+
+SETPOINTS = (150, 180)
+COUPLING = [[0, 0.3], [0.3, 0]] # share of the power of the other zone received by a zone (None: no compensation)
+
+p = Plancha()
+bank = p.setup_zones( [(5, 13), (20, 14)], Kp=1.95, Ki=0.0125, Kd=4.5, dt=1000, coupling=COUPLING )
+for zone, temp in enumerate( SETPOINTS ):
+	bank.set( zone, temp )
+
+print( 'elapsed (sec) , temp 0 (°c) , ratio 0 (%) , temp 1 (°c) , ratio 1 (%)' )
+start = time.time()
+try:
+	while True:
+		print( '%i , %.2f , %i , %.2f , %i' % (time.time()-start, bank.measure[0], bank.output[0], bank.measure[1], bank.output[1]) )
+		time.sleep( 1 )
+finally:
+	bank.deinit()
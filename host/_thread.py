@@ -0,0 +1,55 @@
+""" Host stand-in for the MicroPython `_thread` module (RP2040: the second core)
+
+	start_new_thread() runs the function in a thread scheduled on the virtual
+	clock (see hostsim.VirtualClock.start_core). A lock held by the other core
+	is spun on in virtual time, like on the Pico.
+
+	`_thread` is a builtin module of CPython: hostsim.install() loads this file
+	in sys.modules. Other names are those of the CPython module (used by the
+	standard library).
+"""
+import hostsim
+
+_builtin = hostsim.builtin_thread
+
+def __getattr__( name ):
+	return getattr( _builtin, name )
+
+class LockType:
+	def __init__( self ):
+		self._locked = False
+
+	def acquire( self, waitflag=1, timeout=-1 ):
+		while self._locked:
+			if not waitflag:
+				return False
+			hostsim.board.clock.spend_us( 2 ) # spin: lets the owner run
+		self._locked = True
+		return True
+
+	def release( self ):
+		if not self._locked:
+			raise RuntimeError( 'release unlocked lock' )
+		self._locked = False
+
+	def locked( self ):
+		return self._locked
+
+	def __enter__( self ):
+		return self.acquire()
+
+	def __exit__( self, *args ):
+		self.release()
+
+def allocate_lock():
+	return LockType()
+
+def start_new_thread( func, args ):
+	hostsim.board.clock.start_core( func, args )
+
+def get_ident():
+	_core = hostsim.board.clock._core()
+	return 0 if _core == None else _core.id
+
+def exit():
+	raise SystemExit()
@@ -0,0 +1,37 @@
+""" Fit a first-order-plus-dead-time model of the plate on ramp / regulation logs
+
+	python3 host/fit_fopdt.py [log files...]
+
+	Logs are the CSV of examples/test_ramp.py, test_pid.py or tlog_decode.py
+	(elapsed, ratio, temp [, setpoint]), the spreadsheets of docs/test-ramp.zip
+	(.ods) or zip archives of them (default: docs/test-ramp.zip). Each log is
+	simulated with its recorded duty until the heater stops for good, so the
+	closed-loop runs count as well as the open-loop ramps (see host/tuning/).
+
+	Model, for the duty u (%) and the temperature T0 at the start of a log:
+
+		tau * dT/dt = K*u(t-theta) - (T - T0)
+
+	K (C per %), tau and theta (sec) are shared by every log. K is solved
+	by least squares for each (tau, theta) of a grid. The result is printed
+	as the FF_MODEL constant of main.py (see lib/feedforward.py). Needs NumPy.
+"""
+import argparse
+
+import tuning
+
+def main():
+	parser = argparse.ArgumentParser( description='Fit a FOPDT plate model on ramp / regulation logs' )
+	parser.add_argument( 'files', nargs='*', help='CSV logs, .ods or .zip of them (default: docs/test-ramp.zip)' )
+	args = parser.parse_args()
+
+	logs = tuning.load_logs( args.files )
+	for _log in logs:
+		_run = _log.driven()
+		print( '  %-48s %3i-%3i %%  %4i sec  %6.2f -> %6.2f C' % (_log.name, _run.ratio.min(), _run.ratio.max(), _run.elapsed[-1], _run.temp[0], _run.temp[-1]) )
+	_fit = tuning.fit_fopdt( logs )
+	print( 'K %.3f C/%%  tau %.0f sec  theta %.0f sec  (RMS %.2f C on %i logs)' % (_fit['K'], _fit['tau'], _fit['theta'], _fit['rms'], len(logs)) )
+	print( 'FF_MODEL = (%.3f, %.0f, %.0f) # (K C per %%, tau sec, theta sec)' % (_fit['K'], _fit['tau'], _fit['theta']) )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,195 @@
+""" Drive several planchas at once over their serial ports (lib/remote.py protocol)
+
+	python3 host/fleet.py -p /dev/ttyACM0 -p /dev/ttyACM1 state
+	python3 host/fleet.py -p ... upload SnPb snpb.json    # [[150,90],[183,60],...]
+	python3 host/fleet.py -p ... profile SnCu | preheat 150 | cool [stop temp] | stop
+	python3 host/fleet.py -p ... batch SnCu | next          # back-to-back reflows, next board
+	python3 host/fleet.py -p ... boot                       # boot timing and free heap (main.py boot report)
+	python3 host/fleet.py -p ... watch [--every 2]
+
+	Every Board is read by the asyncio loop as soon as bytes arrive: the
+	#RC replies resolve the pending commands (matched by their id), the
+	telemetry (tlog_decode.FrameDecoder, "#TL" lines or raw frames) keeps
+	the last sample. A command is sent to all the boards concurrently, the
+	errors of one board (ERR reply, timeout, unplugged) do not stop the others.
+"""
+import argparse
+import asyncio
+import errno
+import json
+import os
+import sys
+import tty
+
+from tlog_decode import FrameDecoder
+
+REPLY_TAG = '#RC '
+TIMEOUT = 5.0 # sec
+
+class RemoteError( Exception ):
+	""" ERR reply of a board """
+	pass
+
+class Board:
+	def __init__( self, port ):
+		self.port = port
+		self.fd = None
+		self.decoder = FrameDecoder( text=True )
+		self.sample = None # last telemetry sample (tlog_decode.Sample)
+		self._pending = {} # id -> Future
+		self._id = 0
+
+	async def open( self ):
+		self.fd = os.open( self.port, os.O_RDWR | os.O_NOCTTY )
+		if os.isatty( self.fd ):
+			tty.setraw( self.fd )
+		os.set_blocking( self.fd, False )
+		asyncio.get_running_loop().add_reader( self.fd, self._readable )
+
+	def close( self ):
+		if self.fd != None:
+			asyncio.get_running_loop().remove_reader( self.fd )
+			os.close( self.fd )
+			self.fd = None
+		for _future in self._pending.values():
+			if not _future.done():
+				_future.set_exception( ConnectionError( '%s closed' % self.port ) )
+		self._pending = {}
+
+	def _readable( self ):
+		while True:
+			try:
+				_data = os.read( self.fd, 4096 )
+			except BlockingIOError:
+				return
+			except OSError as e:
+				if e.errno != errno.EIO:
+					raise
+				_data = b''
+			if not _data: # unplugged
+				self.close()
+				return
+			_samples = self.decoder.feed( _data )
+			if _samples:
+				self.sample = _samples[-1]
+			for _line in self.decoder.lines:
+				if _line.startswith( REPLY_TAG ):
+					self._reply( _line )
+			self.decoder.lines.clear()
+
+	def _reply( self, line ):
+		_words = line.split( ' ', 3 )
+		try:
+			_future = self._pending.pop( int(_words[1]) )
+		except (IndexError, ValueError, KeyError):
+			return # not ours (other client, echo)
+		if _future.done():
+			return
+		if _words[2] == 'OK':
+			_future.set_result( json.loads( _words[3] ) )
+		else:
+			_future.set_exception( RemoteError( _words[3] if len(_words) > 3 else '' ) )
+
+	async def command( self, name, args='', timeout=TIMEOUT ):
+		""" Send a command, returns the result of its OK reply (RemoteError for ERR) """
+		if self.fd == None:
+			raise ConnectionError( '%s not open' % self.port )
+		self._id += 1
+		_id = self._id
+		_future = asyncio.get_running_loop().create_future()
+		self._pending[_id] = _future
+		_data = ('%i %s %s\n' % (_id, name, args)).encode()
+		while _data:
+			try:
+				_data = _data[os.write( self.fd, _data ):]
+			except BlockingIOError:
+				await asyncio.sleep( 0.01 )
+		try:
+			return await asyncio.wait_for( _future, timeout )
+		finally:
+			self._pending.pop( _id, None )
+
+	async def state( self ):
+		return await self.command( 'state' )
+
+	async def preheat( self, temp ):
+		return await self.command( 'preheat', '%i' % temp )
+
+	async def profile( self, name ):
+		return await self.command( 'profile', name )
+
+	async def cool( self, stop_temp=None ):
+		return await self.command( 'cool', '' if stop_temp == None else '%i' % stop_temp )
+
+	async def stop( self ):
+		return await self.command( 'stop' )
+
+	async def upload( self, name, phases ):
+		return await self.command( 'upload', '%s %s' % (name, json.dumps( [ list(p) for p in phases ] )) )
+
+class Fleet:
+	def __init__( self, ports ):
+		self.boards = [ Board(p) for p in ports ]
+
+	async def open( self ):
+		await asyncio.gather( *[ b.open() for b in self.boards ] )
+
+	def close( self ):
+		for b in self.boards:
+			b.close()
+
+	async def each( self, method, *args ):
+		""" Call Board.method( *args ) on every board concurrently. Returns the results / exceptions """
+		return await asyncio.gather( *[ getattr( b, method )( *args ) for b in self.boards ], return_exceptions=True )
+
+	async def status( self ):
+		""" State of every board (dict or exception) """
+		return await self.each( 'state' )
+
+	def table( self, states ):
+		""" Lines of a status table """
+		_lines = [ '%-14s %-9s %-8s %7s %7s %6s %5s %6s %8s' % ('port', 'state', 'profile', 'temp', 'setp.', 'duty', 'phase', 'cycles', 'samples') ]
+		for b, s in zip( self.boards, states ):
+			if isinstance( s, BaseException ):
+				_lines.append( '%-14s error: %r' % (b.port, s) )
+				continue
+			_lines.append( '%-14s %-9s %-8s %7.2f %7.2f %6.1f %5i %6i %8i' % (b.port, s['state'], s['profile'] or '-', s['temp'], s['setpoint'], s['duty'], s['phase'], s.get( 'cycles', 0 ), b.decoder.samples) )
+		return _lines
+
+def print_results( fleet, results ):
+	for b, r in zip( fleet.boards, results ):
+		print( '%-14s %s' % (b.port, ('ERR %s' % r) if isinstance( r, BaseException ) else ('OK %s' % json.dumps( r ))) )
+
+async def run( args ):
+	fleet = Fleet( args.port )
+	await fleet.open()
+	try:
+		if args.command == 'watch':
+			while True:
+				print( '\n'.join( fleet.table( await fleet.status() ) ) + '\n' )
+				await asyncio.sleep( args.every )
+		elif args.command == 'upload':
+			with open( args.args[1] ) as f:
+				_phases = json.load( f )
+			print_results( fleet, await fleet.each( 'upload', args.args[0], _phases ) )
+		elif args.command == 'state':
+			print( '\n'.join( fleet.table( await fleet.status() ) ) )
+		else:
+			print_results( fleet, await fleet.each( 'command', args.command, ' '.join( args.args ) ) )
+	finally:
+		fleet.close()
+
+def main():
+	parser = argparse.ArgumentParser( description='Drive several planchas over their serial ports' )
+	parser.add_argument( '-p', '--port', action='append', required=True, help='serial port of a board (repeat for each board)' )
+	parser.add_argument( '--every', type=float, default=2.0, help='watch period (sec)' )
+	parser.add_argument( 'command', help='state, preheat, profile, batch, next, cool, stop, upload, history, boot or watch' )
+	parser.add_argument( 'args', nargs='*' )
+	args = parser.parse_args()
+	try:
+		asyncio.run( run( args ) )
+	except KeyboardInterrupt:
+		pass
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,124 @@
+""" Pull and aggregate the run history of several planchas (lib/history.py)
+
+	python3 host/fleet_history.py -p /dev/ttyACM0 -p /dev/ttyACM1 [--last 50]
+	python3 host/fleet_history.py board1.bin board2.bin     # mpremote cp :history/runs.bin board1.bin
+	        [--csv runs.csv] [--drift 5]
+
+	The runs are pulled with the remote command `history` (lib/remote.py,
+	REMOTE_CONTROL = True) or read from copies of history/runs.bin. Prints a
+	line per board and profile (completed runs only): mean and standard
+	deviation of the peak, overshoot, time above liquidus, heater energy and
+	the worst tick lateness. A plate is flagged DRIFT when its heater energy
+	for the same profile moved by more than --drift % between the first and
+	the second half of its runs, or differs by more than --drift % from the
+	median of the boards (element, insulation or thermocouple ageing).
+"""
+import argparse
+import asyncio
+import csv
+import statistics
+import struct
+import sys
+
+RECORD_FMT = '<II14shhhHHHHHHB' # Must match lib/history.py
+RECORD_SIZE = struct.calcsize( RECORD_FMT )
+FIELDS = ('run', 'time', 'profile', 'start', 'peak', 'overshoot', 'tal_s', 'up', 'down', 'heater_s', 'duration_s', 'late_us', 'flags')
+TEMP_SCALE = 16
+RATE_SCALE = 100
+FLAG_ABORTED = 1
+
+def decode( data ):
+	""" Record bytes -> dict of FIELDS (temperatures and rates in C, C/s) """
+	_v = list( struct.unpack( RECORD_FMT, data ) )
+	_v[2] = _v[2].rstrip( b'\x00' ).decode()
+	for i in (3, 4, 5):
+		_v[i] /= TEMP_SCALE
+	for i in (7, 8):
+		_v[i] /= RATE_SCALE
+	return dict( zip( FIELDS, _v ) )
+
+def read_file( filename ):
+	""" Runs of a copy of runs.bin, oldest first (a torn last record is ignored) """
+	with open( filename, 'rb' ) as f:
+		_data = f.read()
+	return [ decode( _data[i:i+RECORD_SIZE] ) for i in range( 0, len(_data) - RECORD_SIZE + 1, RECORD_SIZE ) ]
+
+async def pull( ports, last ):
+	""" {port: runs oldest first} through the remote control """
+	from fleet import Fleet
+	fleet = Fleet( ports )
+	await fleet.open()
+	try:
+		_results = await fleet.each( 'command', 'history', str( last ) )
+	finally:
+		fleet.close()
+	_runs = {}
+	for _port, _r in zip( ports, _results ):
+		if isinstance( _r, BaseException ):
+			print( '%-14s ERR %s' % (_port, _r), file=sys.stderr )
+			continue
+		_runs[_port] = list( reversed( _r ) )
+	return _runs
+
+def _stats( values ):
+	return (statistics.mean( values ), statistics.pstdev( values ) if len( values ) > 1 else 0.0)
+
+def aggregate( runs_by_board, drift=5.0 ):
+	""" Rows (board, profile, summary dict) of the completed runs, with the DRIFT flags """
+	_rows = []
+	for _board, _runs in runs_by_board.items():
+		_done = [ r for r in _runs if not( r['flags'] & FLAG_ABORTED ) ]
+		for _profile in sorted( set( r['profile'] for r in _done ) ):
+			_r = [ r for r in _done if r['profile'] == _profile ]
+			_s = { 'runs': len( _r ), 'aborted': sum( 1 for r in _runs if r['profile'] == _profile ) - len( _r ) }
+			for _key in ('peak', 'overshoot', 'tal_s', 'up', 'down', 'heater_s', 'duration_s'):
+				_s[_key] = _stats( [ r[_key] for r in _r ] )
+			_s['late_us'] = max( r['late_us'] for r in _r )
+			_half = len( _r )//2
+			if _half:
+				_first = statistics.mean( r['heater_s'] for r in _r[:_half] )
+				_s['trend'] = 100*(statistics.mean( r['heater_s'] for r in _r[-_half:] ) - _first)/_first if _first else 0.0
+			else:
+				_s['trend'] = 0.0
+			_rows.append( (_board, _profile, _s) )
+	for _profile in set( p for b, p, s in _rows ):
+		_median = statistics.median( s['heater_s'][0] for b, p, s in _rows if p == _profile )
+		for b, p, s in _rows:
+			if p == _profile:
+				s['vs_fleet'] = 100*(s['heater_s'][0] - _median)/_median if _median else 0.0
+				s['drift'] = (abs( s['trend'] ) > drift) or (abs( s['vs_fleet'] ) > drift)
+	return _rows
+
+def table( rows ):
+	_lines = [ '%-14s %-8s %4s %13s %12s %10s %12s %7s %7s %7s %s' % ('board', 'profile', 'runs', 'peak (C)', 'overshoot', 'TAL (s)', 'heater (s)', 'trend', 'fleet', 'late', '') ]
+	for _board, _profile, s in sorted( rows, key=lambda r: (r[1], r[0]) ):
+		_lines.append( '%-14s %-8s %4i %6.1f+-%-5.1f %5.1f+-%-5.1f %4.0f+-%-4.0f %6.1f+-%-4.1f %+6.1f%% %+6.1f%% %5ius %s' % (_board, _profile, s['runs'],
+			s['peak'][0], s['peak'][1], s['overshoot'][0], s['overshoot'][1], s['tal_s'][0], s['tal_s'][1], s['heater_s'][0], s['heater_s'][1],
+			s['trend'], s['vs_fleet'], s['late_us'], 'DRIFT' if s['drift'] else '') )
+	return _lines
+
+def write_csv( filename, runs_by_board ):
+	with open( filename, 'w', newline='' ) as f:
+		_w = csv.writer( f )
+		_w.writerow( ('board',) + FIELDS )
+		for _board, _runs in runs_by_board.items():
+			for r in _runs:
+				_w.writerow( [_board] + [ r[k] for k in FIELDS ] )
+
+def main():
+	parser = argparse.ArgumentParser( description='Aggregate the run history of several planchas' )
+	parser.add_argument( '-p', '--port', action='append', default=[], help='serial port of a board (repeat for each board)' )
+	parser.add_argument( 'files', nargs='*', help='copies of history/runs.bin' )
+	parser.add_argument( '--last', type=int, default=50, help='runs pulled per board (50 max)' )
+	parser.add_argument( '--drift', type=float, default=5.0, help='heater energy change flagged as drift (%%)' )
+	parser.add_argument( '--csv', default=None, help='write every run' )
+	args = parser.parse_args()
+	_runs = { _file: read_file( _file ) for _file in args.files }
+	if args.port:
+		_runs.update( asyncio.run( pull( args.port, args.last ) ) )
+	if args.csv:
+		write_csv( args.csv, _runs )
+	print( '\n'.join( table( aggregate( _runs, args.drift ) ) ) )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,373 @@
+""" Host-side stand-in for the Plancha-CMS hardware
+
+	Runs lib/*.py and main.py under CPython with a virtual clock and a thermal
+	model of the plate. Nothing waits for the wall clock: time.sleep_ms(),
+	bus transactions and Timer(-1) callbacks only move the virtual clock forward
+	so a full reflow runs in a fraction of a second. install( speed=x ) paces
+	the virtual clock at x times the wall clock instead, for a client talking
+	to the board over a serial line (see host/sim_fleet.py).
+
+	Usage:
+		import hostsim
+		board = hostsim.install()   # must be called BEFORE importing plancha/main
+		from main import App
+
+	The stand-in modules (machine, micropython, max31855, lcdi2c, i2cenc, lfpwm,
+	_thread) are stored next to this file. The `time` module is replaced in sys.modules
+	by a virtual one offering the MicroPython ticks_xxx() API, `gc` by one
+	offering mem_free() / mem_alloc() (always -1: the heap is not modelled).
+
+	The current directory becomes the root of the flash (board.flash): a new
+	temporary directory with a copy of profiles/ unless install( flash=path ).
+	The application writes its files there (pid.json, profiles/, history/),
+	never in the repository: make the paths given to a script absolute first.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import types
+import random
+import threading
+import importlib.util
+import time as _real_time
+import gc as _real_gc
+
+builtin_thread = sys.modules['_thread'] # CPython one, replaced by host/_thread.py for the application
+
+from thermal import PlateModel
+
+TICKS_PERIOD = 1 << 30 # MicroPython ticks_ms() wraps at 2**30
+EPOCH = 1735689600 # 2025-01-01, returned by virtual time.time() at boot
+
+class HostReset( Exception ):
+	""" Raised by machine.reset() since there is no board to reboot """
+	pass
+
+class _Core:
+	""" A core of the RP2040 emulated by a thread (see VirtualClock.start_core) """
+	def __init__( self, id, ident ):
+		self.id = id
+		self.ident = ident
+		self.target = 0 # virtual us this core waits for (its current time while it runs)
+		self.alive = True
+
+class VirtualClock:
+	""" Microsecond clock moving forward only when asked. Schedules the Timer callbacks.
+
+	    With a second core (_thread.start_new_thread), each core runs in its own
+	    thread but only one runs at a time: a core moving the clock to T waits
+	    until the other core also reached T (or is idle until later). The
+	    Timer callbacks belong to core 0, like the soft timers of MicroPython. """
+	def __init__( self ):
+		self.us = 0
+		self._timers = [] # [due_us, period_us or 0, callback, owner]
+		self._firing = False
+		self.on_advance = None # function(from_us, to_us) to integrate the physics
+		self._cores = [] # empty while there is a single core
+		self._cond = threading.Condition()
+		self._turn = 0 # id of the running core
+		self.core_exception = None # HostReset raised by core 1, re-raised on core 0
+		self.speed = None # None: as fast as possible. Otherwise virtual sec per wall sec (a client talks to the board)
+		self._wall_start = None
+
+	def add_timer( self, owner, period_ms, callback, periodic=True ):
+		self.remove_timer( owner )
+		_period = int(period_ms*1000)
+		self._timers.append( [self.us+_period, _period if periodic else 0, callback, owner] )
+
+	def remove_timer( self, owner ):
+		self._timers = [ t for t in self._timers if t[3] is not owner ]
+
+	def _move( self, to_us ):
+		if to_us <= self.us:
+			return
+		if self.speed:
+			_wall = _real_time.monotonic()
+			if self._wall_start == None:
+				self._wall_start = _wall - self.us/1000000/self.speed
+			_late = self._wall_start + to_us/1000000/self.speed - _wall
+			if _late > 0:
+				_real_time.sleep( _late )
+		if self.on_advance:
+			self.on_advance( self.us, to_us )
+		self.us = to_us
+
+	# --- cores ---
+	def start_core( self, func, args ):
+		""" Run func(*args) on an emulated second core (thread) """
+		if not self._cores:
+			self._cores.append( _Core( 0, threading.get_ident() ) )
+		_core = _Core( len(self._cores), None )
+		_core.target = self.us
+		self._cores.append( _core )
+		def _run():
+			_core.ident = threading.get_ident()
+			try:
+				self._wait_turn( _core, self.us )
+				func( *args )
+			except HostReset as e:
+				self.core_exception = e
+			except BaseException as e:
+				print( 'Unhandled exception in thread (core %i): %r' % (_core.id, e) )
+			finally:
+				with self._cond:
+					_core.alive = False
+					self._turn = self._next_core().id
+					self._cond.notify_all()
+		_thread = threading.Thread( target=_run, daemon=True )
+		with self._cond:
+			_thread.start()
+			while _core.ident == None:
+				self._cond.wait( 0.01 )
+
+	def _core( self ):
+		if not self._cores:
+			return None
+		_ident = threading.get_ident()
+		for _c in self._cores:
+			if _c.ident == _ident:
+				return _c
+		return None
+
+	def _next_core( self ):
+		_alive = [ c for c in self._cores if c.alive ]
+		return min( _alive, key=lambda c: (c.target, c.id) )
+
+	def _wait_turn( self, core, target ):
+		""" Block this core until every other core reached target """
+		with self._cond:
+			core.target = target
+			while True:
+				_next = self._next_core()
+				if _next is core:
+					break
+				self._turn = _next.id
+				self._cond.notify_all()
+				while self._turn != core.id:
+					self._cond.wait()
+			self._turn = core.id
+		if (core.id == 0) and (self.core_exception != None):
+			_e, self.core_exception = self.core_exception, None
+			raise _e
+
+	def _move_core( self, core, to_us ):
+		if core != None:
+			self._wait_turn( core, to_us )
+		self._move( to_us )
+
+	def spend_us( self, us ):
+		""" Time consumed by a blocking operation (bus transaction, busy code).
+		    Timers due meanwhile wait for the end of the operation. """
+		core = self._core()
+		self._move_core( core, self.us+int(us) )
+		if (not self._firing) and ((core == None) or (core.id == 0)):
+			self.advance_us( 0 )
+
+	def advance_us( self, us ):
+		""" Move the clock forward and fire the timers due in the interval """
+		core = self._core()
+		target = self.us + int(us)
+		if (core != None) and (core.id != 0):
+			self._move_core( core, target ) # no Timer on the other cores
+			return
+		while True:
+			due = [ t for t in self._timers if t[0] <= target ]
+			if not due:
+				break
+			t = min( due, key=lambda t: t[0] )
+			self._move_core( core, t[0] )
+			if t[1]:
+				t[0] += t[1]
+			else:
+				self._timers.remove( t )
+			self._firing = True
+			try:
+				t[2]( t[3] )
+			finally:
+				self._firing = False
+			# a callback may have consumed time
+			target = max( target, self.us )
+		self._move_core( core, target )
+
+
+class HostBoard:
+	""" The whole virtual board: clock, pins, plate model and human inputs """
+	HEATER_PIN = 13
+	COOLING_PIN = 19
+	RUN_APP_PIN = 3
+
+	def __init__( self, ambient=24.0, noise=0.0, seed=0, run_app=True, speed=None ):
+		self.clock = VirtualClock()
+		self.clock.speed = speed
+		self.clock.on_advance = self._integrate
+		self.plate = PlateModel( ambient=ambient )
+		self.noise = noise
+		self.rand = random.Random( seed )
+		self.pins = {} # pin_id -> level, written by machine.Pin
+		self.pins[self.RUN_APP_PIN] = 0 if run_app else 1
+		# I2C / SPI bus statistics
+		self.i2c_transactions = 0
+		self.i2c_bytes = 0
+		self.i2c_by_device = {} # address -> transactions
+		self.spi_transactions = 0
+		self.spi_devices = {} # chip select pin id -> function() returning the bytes read while selected
+		# Encoder user actions
+		self._turns = [] # (at_us, steps)
+		self._presses = [] # (from_us, to_us)
+		self.heater_on_us = 0 # Cumulated time with heater ON (energy)
+		self.lcd = None # LCDI2C instance created by the application
+
+	# --- physics ---
+	def _integrate( self, from_us, to_us ):
+		_on = self.pins.get( self.HEATER_PIN, 0 )
+		if _on:
+			self.heater_on_us += to_us-from_us
+		self.plate.step( (to_us-from_us)/1000000, 1.0 if _on else 0.0, 1.0 if self.pins.get(self.COOLING_PIN, 0) else 0.0 )
+
+	def thermocouple( self ):
+		""" MAX31855 reading: 0.25 C resolution + optional gaussian noise """
+		_t = self.plate.sensor
+		if self.noise:
+			_t += self.rand.gauss( 0, self.noise )
+		return round( _t*4 )/4
+
+	# --- human inputs ---
+	def press( self, at_ms, hold_ms=150 ):
+		""" Schedule an encoder button press at a given virtual time """
+		self._presses.append( (int(at_ms*1000), int((at_ms+hold_ms)*1000)) )
+
+	def turn( self, at_ms, steps ):
+		""" Schedule an encoder rotation (+/- steps) at a given virtual time """
+		self._turns.append( (int(at_ms*1000), steps) )
+
+	def button( self ):
+		_now = self.clock.us
+		for _from, _to in self._presses:
+			if _from <= _now < _to:
+				return True
+		return False
+
+	def position( self ):
+		_now = self.clock.us
+		return sum( steps for at, steps in self._turns if at <= _now )
+
+	# --- bus accounting ---
+	def i2c_transfer( self, nbytes, addr=0 ):
+		""" Account an I2C transaction of nbytes at 100 KHz (9 bits per byte + addressing) """
+		self.i2c_transactions += 1
+		self.i2c_by_device[addr] = self.i2c_by_device.get( addr, 0 ) + 1
+		self.i2c_bytes += nbytes
+		self.clock.spend_us( 90*(nbytes+1) )
+
+	def spi_transfer( self, nbytes ):
+		self.spi_transactions += 1
+		self.clock.spend_us( 5+2*nbytes ) # 5 MHz + CS handling
+
+	def spi_selected( self ):
+		""" Bytes of the SPI device whose chip select is low (None: no device) """
+		for _cs, _read in self.spi_devices.items():
+			if self.pins.get( _cs, 1 ) == 0:
+				return _read()
+		return None
+
+	@property
+	def now_ms( self ):
+		return self.clock.us // 1000
+
+
+class _VirtualTime( types.ModuleType ):
+	""" Replacement for the `time` module with MicroPython ticks API """
+	def __init__( self, clock, real_time ):
+		super().__init__( 'time' )
+		self._clock = clock
+		self._real = real_time
+
+	def __getattr__( self, name ):
+		return getattr( self._real, name )
+
+	def ticks_ms( self ):
+		return (self._clock.us//1000) % TICKS_PERIOD
+
+	def ticks_us( self ):
+		return self._clock.us % TICKS_PERIOD
+
+	def ticks_cpu( self ):
+		return self.ticks_us()
+
+	def ticks_add( self, ticks, delta ):
+		return (ticks+delta) % TICKS_PERIOD
+
+	def ticks_diff( self, ticks1, ticks2 ):
+		_diff = (ticks1-ticks2) % TICKS_PERIOD
+		if _diff >= TICKS_PERIOD//2:
+			_diff -= TICKS_PERIOD
+		return _diff
+
+	def sleep_us( self, us ):
+		self._clock.advance_us( us )
+
+	def sleep_ms( self, ms ):
+		self._clock.advance_us( ms*1000 )
+
+	def sleep( self, sec ):
+		self._clock.advance_us( sec*1000000 )
+
+	def time( self ):
+		return EPOCH + self._clock.us//1000000
+
+	def time_ns( self ):
+		return (EPOCH*1000000 + self._clock.us)*1000
+
+
+class _HostGC( types.ModuleType ):
+	""" Replacement for the `gc` module with the MicroPython mem_free() / mem_alloc():
+	    the heap of the board is not modelled, both return -1 """
+	def __init__( self, real_gc ):
+		super().__init__( 'gc' )
+		self._real = real_gc
+
+	def __getattr__( self, name ):
+		return getattr( self._real, name )
+
+	def mem_free( self ):
+		return -1
+
+	def mem_alloc( self ):
+		return -1
+
+
+board = None # The current HostBoard
+
+def install( flash=None, **kwargs ):
+	""" Create a fresh HostBoard, plug the stand-in modules and the virtual time.
+	    flash: directory used as the root of the flash (None: temporary copy of profiles/).
+	    kwargs are passed to HostBoard(). Returns the board. """
+	global board
+	_here = os.path.dirname( os.path.abspath(__file__) )
+	_root = os.path.dirname( _here )
+	if flash == None:
+		flash = tempfile.mkdtemp( prefix='flash-' )
+		shutil.copytree( os.path.join( _root, 'profiles' ), os.path.join( flash, 'profiles' ) )
+	os.makedirs( flash, exist_ok=True )
+	os.chdir( flash )
+	for _path in (os.path.join(_root,'lib'), _root, _here):
+		if _path in sys.path:
+			sys.path.remove( _path )
+		sys.path.insert( 0, _path )
+	board = HostBoard( **kwargs )
+	board.flash = flash
+	_real = sys.modules['time']
+	if isinstance( _real, _VirtualTime ):
+		_real = _real._real
+	sys.modules['time'] = _VirtualTime( board.clock, _real )
+	sys.modules['gc'] = _HostGC( _real_gc )
+	_spec = importlib.util.spec_from_file_location( '_thread', os.path.join( _here, '_thread.py' ) )
+	sys.modules['_thread'] = importlib.util.module_from_spec( _spec )
+	_spec.loader.exec_module( sys.modules['_thread'] )
+	# Application modules must be re-imported to bind the new board & time
+	for _name, _mod in list( sys.modules.items() ):
+		_file = getattr( _mod, '__file__', None ) or ''
+		if _file.startswith( _root ) and not _file.startswith( _here ):
+			del sys.modules[_name]
+	return board
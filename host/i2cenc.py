@@ -0,0 +1,37 @@
+""" Host stand-in for the M5Stack U135 I2C encoder (position, button, RGB led)
+
+	User actions are scheduled on the board with hostsim.board.press() and
+	hostsim.board.turn(). Each property access is one I2C transaction.
+"""
+import hostsim
+
+class I2CEncoder:
+	def __init__( self, i2c, address=0x40 ):
+		self.i2c = i2c
+		self.address = address
+		self._offset = 0
+		self._color = (0,0,0)
+
+	@property
+	def position( self ):
+		hostsim.board.i2c_transfer( 3, self.address ) # register + 2 bytes
+		return hostsim.board.position() - self._offset
+
+	@position.setter
+	def position( self, value ):
+		hostsim.board.i2c_transfer( 3, self.address )
+		self._offset = hostsim.board.position() - value
+
+	@property
+	def button( self ):
+		hostsim.board.i2c_transfer( 2, self.address )
+		return hostsim.board.button()
+
+	@property
+	def color( self ):
+		return self._color
+
+	@color.setter
+	def color( self, rgb ):
+		hostsim.board.i2c_transfer( 5, self.address )
+		self._color = rgb
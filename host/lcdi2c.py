@@ -0,0 +1,53 @@
+""" Host stand-in for LCDI2C (HD44780 behind a PCF8574 I2C backpack)
+
+	The screen content is kept in `lines`. Each command/character is accounted
+	as one I2C transaction of 4 bytes (two nibbles, Enable high/low).
+"""
+import hostsim
+
+class LCDI2C:
+	def __init__( self, i2c, cols=16, rows=2, address=0x27 ):
+		self.i2c = i2c
+		self.cols = cols
+		self.rows = rows
+		self.address = address
+		self.lines = [ [' ']*cols for r in range(rows) ]
+		self.cursor = (0,0)
+		self.writes = 0 # characters & commands sent
+		hostsim.board.lcd = self
+
+	def _send( self ):
+		self.writes += 1
+		hostsim.board.i2c_transfer( 4, self.address )
+
+	def backlight( self, on=True ):
+		self._send()
+
+	def clear( self ):
+		self._send()
+		hostsim.board.clock.spend_us( 1600 ) # HD44780 clear delay
+		self.lines = [ [' ']*self.cols for r in range(self.rows) ]
+		self.cursor = (0,0)
+
+	def home( self ):
+		self._send()
+		self.cursor = (0,0)
+
+	def set_cursor( self, pos ):
+		self._send()
+		self.cursor = pos
+
+	def print( self, s, pos=None ):
+		if pos != None:
+			self.set_cursor( pos )
+		x, y = self.cursor
+		for ch in str(s):
+			self._send()
+			if (x < self.cols) and (y < self.rows):
+				self.lines[y][x] = ch
+			x += 1
+		self.cursor = (x, y)
+
+	def text( self ):
+		""" Screen content as a list of strings """
+		return [ ''.join(l) for l in self.lines ]
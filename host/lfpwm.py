@@ -0,0 +1,42 @@
+""" Host stand-in for LowFreqPWM (software PWM with a period of several seconds for SSR)
+
+	A periodic timer switches the pin ON at the start of each period, a one-shot
+	timer switches it OFF after duty*period. Pulses shorter than the SSR
+	activation time (ton_ms) are skipped like they would be lost on the relay.
+"""
+from machine import Timer
+
+class LowFreqPWM:
+	def __init__( self, pin, period, ton_ms=0, toff_ms=0 ):
+		self.pin = pin
+		self.period_ms = int( period*1000 )
+		self.ton_ms = ton_ms
+		self.toff_ms = toff_ms
+		self.ratio = 0
+		self._cycle = Timer(-1)
+		self._off = Timer(-1)
+		self._cycle.init( mode=Timer.PERIODIC, period=self.period_ms, callback=self._start_cycle )
+
+	def _start_cycle( self, timer ):
+		_on_ms = self.period_ms*self.ratio//100
+		if _on_ms < self.ton_ms:
+			self.pin.off()
+			return
+		self.pin.on()
+		if _on_ms < self.period_ms-self.toff_ms:
+			self._off.init( mode=Timer.ONE_SHOT, period=_on_ms, callback=self._stop_pulse )
+
+	def _stop_pulse( self, timer ):
+		self.pin.off()
+
+	def duty_ratio( self, ratio ):
+		""" ratio from 0 to 100% """
+		self.ratio = max( 0, min(100, int(ratio)) )
+		if self.ratio == 0:
+			self._off.deinit()
+			self.pin.off()
+
+	def deinit( self ):
+		self._cycle.deinit()
+		self._off.deinit()
+		self.pin.off()
@@ -0,0 +1,114 @@
+""" Host stand-in for the MicroPython `machine` module (RP2040 subset used by Plancha-CMS) """
+import hostsim
+
+class _Board:
+	""" Pin.board.GPxx namespace """
+	def __getattr__( self, name ):
+		if name.startswith('GP'):
+			return int( name[2:] )
+		raise AttributeError( name )
+
+class Pin:
+	IN = 0
+	OUT = 1
+	OPEN_DRAIN = 2
+	PULL_UP = 1
+	PULL_DOWN = 2
+	IRQ_FALLING = 4
+	IRQ_RISING = 8
+	board = _Board()
+
+	def __init__( self, id, mode=-1, pull=-1, value=None ):
+		self.id = id
+		self.mode = mode
+		self.pull = pull
+		if (value != None) and (mode == Pin.OUT):
+			self.value( value )
+		elif (mode == Pin.IN) and (self.id not in hostsim.board.pins):
+			hostsim.board.pins[self.id] = 1 if pull==Pin.PULL_UP else 0
+
+	def value( self, v=None ):
+		if v == None:
+			return hostsim.board.pins.get( self.id, 0 )
+		hostsim.board.pins[self.id] = 1 if v else 0
+
+	def __call__( self, v=None ):
+		return self.value( v )
+
+	def on( self ):
+		self.value( 1 )
+
+	def off( self ):
+		self.value( 0 )
+
+	def irq( self, handler=None, trigger=IRQ_FALLING|IRQ_RISING ):
+		return None
+
+	def __repr__( self ):
+		return 'Pin(GPIO%i)' % self.id
+
+class SPI:
+	def __init__( self, id, baudrate=1000000, polarity=0, phase=0, sck=None, mosi=None, miso=None ):
+		self.id = id
+
+	def read( self, nbytes, write=0 ):
+		hostsim.board.spi_transfer( nbytes )
+		return bytes( nbytes )
+
+	def readinto( self, buf, write=0 ):
+		hostsim.board.spi_transfer( len(buf) )
+		_data = hostsim.board.spi_selected()
+		if _data != None:
+			buf[:len(_data)] = _data
+
+	def write( self, buf ):
+		hostsim.board.spi_transfer( len(buf) )
+
+class I2C:
+	def __init__( self, id, sda=None, scl=None, freq=100000 ):
+		self.id = id
+
+	def scan( self ):
+		return [0x27, 0x40]
+
+	def writeto( self, addr, buf, stop=True ):
+		hostsim.board.i2c_transfer( len(buf), addr )
+		return len(buf)
+
+	def readfrom( self, addr, nbytes, stop=True ):
+		hostsim.board.i2c_transfer( nbytes, addr )
+		return bytes( nbytes )
+
+class Timer:
+	ONE_SHOT = 0
+	PERIODIC = 1
+
+	def __init__( self, id=-1, mode=PERIODIC, period=-1, callback=None, freq=-1 ):
+		if callback != None:
+			self.init( mode=mode, period=period, callback=callback, freq=freq )
+
+	def init( self, mode=PERIODIC, period=-1, callback=None, freq=-1 ):
+		if freq > 0:
+			period = 1000/freq
+		hostsim.board.clock.add_timer( self, period, callback, periodic=(mode==Timer.PERIODIC) )
+
+	def deinit( self ):
+		hostsim.board.clock.remove_timer( self )
+
+def reset():
+	raise hostsim.HostReset( 'machine.reset() called' )
+
+def soft_reset():
+	reset()
+
+def freq( hz=None ):
+	return 125000000
+
+def idle():
+	hostsim.board.clock.advance_us( 100 )
+
+def disable_irq():
+	return 0
+
+def enable_irq( state=0 ):
+	pass
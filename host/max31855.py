@@ -0,0 +1,17 @@
+""" Host stand-in for the MAX31855 thermocouple amplifier (reads the plate model) """
+import hostsim
+
+class MAX31855:
+	def __init__( self, spi, cs_pin ):
+		self.spi = spi
+		self.cs = cs_pin
+
+	def temperature( self ):
+		hostsim.board.spi_transfer( 4 ) # 32 bits frame
+		return hostsim.board.thermocouple()
+
+def frame( temp, fault=False ):
+	""" The 4 bytes sent by a MAX31855 measuring temp (C), for HostBoard.spi_devices """
+	_t = int( round( temp*4 ) ) & 0x3FFF
+	_hi = (_t << 2) | (1 if fault else 0)
+	return bytes( (_hi >> 8, _hi & 0xFF, 0, 0) )
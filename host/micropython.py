@@ -0,0 +1,25 @@
+""" Host stand-in for the `micropython` module """
+
+def const( value ):
+	return value
+
+def alloc_emergency_exception_buf( size ):
+	pass
+
+def schedule( func, arg ):
+	func( arg )
+
+def heap_lock():
+	return 0
+
+def heap_unlock():
+	return 0
+
+def mem_info( verbose=False ):
+	print( 'mem: host stand-in' )
+
+def native( func ):
+	return func
+
+def viper( func ):
+	return func
@@ -0,0 +1,18 @@
+""" Run a MicroPython script (examples/*.py, main.py) against the host stand-in
+
+	python3 host/run.py examples/bench_pid.py
+"""
+import os
+import runpy
+import sys
+
+import hostsim
+
+if __name__ == '__main__':
+	if len( sys.argv ) < 2:
+		print( 'usage: python3 host/run.py <script.py> [args]' )
+		sys.exit( 1 )
+	_script = os.path.abspath( sys.argv[1] )
+	hostsim.install()
+	sys.argv = sys.argv[1:]
+	runpy.run_path( _script, run_name='__main__' )
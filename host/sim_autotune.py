@@ -0,0 +1,90 @@
+""" Run the relay autotune against the host stand-in and compare the gains
+
+	python3 host/sim_autotune.py [--setpoint 150] [--step 150] [--noise 0.25]
+
+	1. Plancha.autotune() on a fresh plate (relay around --setpoint)
+	2. a step from ambient to --step with the default gains of main.py and
+	   with the tuned gains: time to setpoint, overshoot, settling
+	3. the SnCu reflow tracking error with both gain sets (see sim_reflow.py)
+"""
+import argparse
+import io
+import os
+import contextlib
+import tempfile
+
+import hostsim
+import sim_reflow
+
+def run_autotune( setpoint=150, noise=0.0, filename=None ):
+	""" Returns (gains dict, virtual seconds of the test). The gains are saved to
+	    filename (a temporary pid.json by default, never the one of the repository) """
+	if filename == None:
+		filename = os.path.join( tempfile.mkdtemp(), 'pid.json' )
+	board = hostsim.install( noise=noise )
+	import main
+	import uasyncio as asyncio
+
+	app = main.App()
+	_log = []
+	async def scenario():
+		return await app.p.autotune( setpoint, progress_cb=_log.append )
+	with contextlib.redirect_stdout( io.StringIO() ):
+		gains = asyncio.run( scenario() )
+	app.p.apply_gains( gains, filename ) # [Save]
+	return gains, board.clock.us/1000000
+
+def run_step( target, gains, noise=0.0, duration_s=900, band=2.0 ):
+	""" Regulates at target from ambient. Returns (sec to target-band, overshoot C, sec to settle in +/-band) """
+	board = hostsim.install( noise=noise )
+	import main
+	import uasyncio as asyncio
+
+	app = main.App()
+	app.p.gains = tuple( gains )
+	app.p.set_schedule( None ) # this single gain set
+	samples = []
+	async def scenario():
+		app.p.temperature = target
+		for i in range( duration_s*4 ):
+			samples.append( (board.clock.us/1000000, app.p.sampler.value) )
+			await asyncio.sleep_ms( 250 )
+		app.p.stop()
+	with contextlib.redirect_stdout( io.StringIO() ):
+		asyncio.run( scenario() )
+	_start = samples[0][0]
+	_reach = next( (sec-_start for sec, t in samples if t >= target-band), None )
+	_settle = None
+	for sec, t in samples:
+		if abs(t-target) > band:
+			_settle = None
+		elif _settle == None:
+			_settle = sec-_start
+	return _reach, max( t for sec, t in samples )-target, _settle
+
+def main():
+	parser = argparse.ArgumentParser( description='Relay autotune on the host simulator' )
+	parser.add_argument( '--setpoint', type=float, default=150, help='relay oscillation temperature' )
+	parser.add_argument( '--step', type=float, default=150, help='step response target' )
+	parser.add_argument( '--noise', type=float, default=0.0, help='thermocouple noise (C, sigma)' )
+	args = parser.parse_args()
+
+	_file = os.path.join( tempfile.mkdtemp(), 'pid.json' )
+	gains, _sec = run_autotune( args.setpoint, noise=args.noise, filename=_file )
+	print( 'Autotune at %i C: %.0f virtual sec' % (args.setpoint, _sec) )
+	print( '  Ku %.3f  Pu %.1f sec  amplitude %.2f C' % (gains['Ku'], gains['Pu'], gains['amplitude']) )
+	print( '  Kp %.3f  Ki %.5f  Kd %.2f  (saved to %s)' % (gains['Kp'], gains['Ki'], gains['Kd'], _file) )
+
+	import main as _main
+	_sets = [ ('default', _main.PID_GAINS), ('tuned', (gains['Kp'], gains['Ki'], gains['Kd'])) ]
+	print( 'Step to %i C        reach (s)  overshoot (C)  settle (s)  reflow RMS  reflow max' % args.step )
+	for name, _g in _sets:
+		_reach, _over, _settle = run_step( args.step, _g, noise=args.noise )
+		board, samples, _log = sim_reflow.run_reflow( noise=args.noise, cooling=False, gains=_g )
+		_rms, _max = sim_reflow.tracking_error( board, samples, _main.PROFILE_SNCU )
+		print( '  %-16s %9s  %13.2f  %10s  %10.2f  %10.2f' % (name,
+			'-' if _reach == None else '%.0f' % _reach, _over,
+			'-' if _settle == None else '%.0f' % _settle, _rms, _max) )
+
+if __name__ == '__main__':
+	main()
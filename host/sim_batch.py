@@ -0,0 +1,83 @@
+""" Throughput of back-to-back reflows: single reflows vs the batch mode of main.py
+
+	python3 host/sim_batch.py [--boards 5] [--swap 15] [--standby 100]
+
+	Single: App.reflow() per board (cooling down to COOLING_MIN_T), then the
+	operator swaps the board (--swap sec) and starts the next one.
+	Batch: App.batch(), the plate waits at STANDBY_T while the operator swaps
+	the board, then the next board starts from the standby temperature (the
+	remote command next plays the [Next] press).
+	Prints the cycle times, the boards per hour and, for every board, the
+	peak temperature and the time above the liquidus.
+"""
+import argparse
+import io
+import contextlib
+
+import hostsim
+
+LIQUIDUS_T = 217 # SnCu
+
+def run_boards( batch, boards=5, swap_sec=15, standby_t=None ):
+	""" Returns (board, app, samples, total_sec): samples are (sec, temperature, phase) every second """
+	board = hostsim.install()
+	import main
+	import uasyncio as asyncio
+	if standby_t != None:
+		main.STANDBY_T = standby_t
+	app = main.App()
+	samples = []
+	board.clock.add_timer( 'samples', 1000, lambda owner: samples.append( (board.clock.us/1000000, app.p.temperature, app.p.phase) ), periodic=True )
+
+	async def scenario():
+		asyncio.create_task( app.p.ev.run() )
+		if not( batch ):
+			for i in range( boards ):
+				await app.reflow( 'SnCu' )
+				if i < boards-1:
+					await asyncio.sleep( swap_sec )
+			return board.clock.us/1000000
+		_task = asyncio.create_task( app.batch( 'SnCu' ) )
+		while True:
+			await asyncio.sleep_ms( 500 )
+			if app.state != 'standby':
+				continue
+			if app.cycles >= boards:
+				break
+			await asyncio.sleep( swap_sec )
+			app.cmd_next( '' )
+		_total = board.clock.us/1000000
+		_task.cancel()
+		await asyncio.sleep_ms( 10 )
+		return _total
+	with contextlib.redirect_stdout( io.StringIO() ):
+		_total = asyncio.run( scenario() )
+	app.p.stop()
+	return board, app, samples, _total
+
+def board_metrics( samples ):
+	""" [(peak C, sec above LIQUIDUS_T)] per board: from the start of its profile to the start of the next one """
+	_starts = [ i for i in range( len(samples) ) if samples[i][2] == 1 and (i == 0 or samples[i-1][2] == 0) ]
+	_result = []
+	for k, _from in enumerate( _starts ):
+		_to = _starts[k+1] if k+1 < len(_starts) else len( samples )
+		_window = samples[_from:_to]
+		_result.append( (max( t for sec, t, ph in _window ), sum( 1 for sec, t, ph in _window if t >= LIQUIDUS_T )) )
+	return _result
+
+def main():
+	parser = argparse.ArgumentParser( description='Single reflows vs batch mode throughput' )
+	parser.add_argument( '--boards', type=int, default=5 )
+	parser.add_argument( '--swap', type=float, default=15, help='board swap by the operator (sec)' )
+	parser.add_argument( '--standby', type=float, default=None, help='STANDBY_T (C), default: the one of main.py' )
+	args = parser.parse_args()
+	for _batch in (False, True):
+		board, app, samples, _total = run_boards( _batch, args.boards, args.swap, args.standby )
+		print( '%s: %i boards in %.0f sec, %.1f boards/h' % ('batch ' if _batch else 'single', args.boards, _total, args.boards*3600/_total) )
+		if _batch:
+			print( '  last cycle (start -> standby): %i sec' % (app.cycle_ms//1000) )
+		for i, (_peak, _above) in enumerate( board_metrics( samples ) ):
+			print( '  board %i: peak %6.2f C, %3i sec above %i C' % (i+1, _peak, _above, LIQUIDUS_T) )
+
+if __name__ == '__main__':
+	main()
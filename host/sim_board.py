@@ -0,0 +1,48 @@
+""" Run main.py on the host stand-in behind a pseudo-terminal, like a Pico on its USB serial
+
+	python3 host/sim_board.py [--speed 20] [--binary] [--flash DIR]
+
+	Prints the path of the serial port (/dev/pts/N) on stderr then runs the
+	application with the remote control on (lib/remote.py): stdin / stdout
+	of the application are the pty. The virtual clock is paced at `speed`
+	times the wall clock. Drive it with host/fleet.py or host/telemetry.py.
+	The flash is a temporary directory with a copy of profiles/ (--flash:
+	a directory kept between the runs, see hostsim.install).
+"""
+import argparse
+import os
+import pty
+import sys
+import tty
+
+import hostsim
+
+def main():
+	parser = argparse.ArgumentParser( description='Simulated plancha on a pseudo-terminal' )
+	parser.add_argument( '--speed', type=float, default=20, help='virtual sec per wall sec' )
+	parser.add_argument( '--binary', action='store_true', help='raw telemetry frames (TELEMETRY_BINARY)' )
+	parser.add_argument( '--noise', type=float, default=0.0, help='thermocouple noise (C, sigma)' )
+	parser.add_argument( '--flash', default=None, help='root directory of the flash (default: temporary, with a copy of profiles/)' )
+	args = parser.parse_args()
+	if args.flash != None:
+		args.flash = os.path.abspath( args.flash )
+
+	_master, _slave = pty.openpty()
+	tty.setraw( _slave ) # no echo of the board output into its input before a client opens the port
+	print( os.ttyname( _slave ), file=sys.stderr, flush=True )
+	os.dup2( _master, 0 )
+	os.dup2( _master, 1 )
+	sys.stdout.reconfigure( line_buffering=True )
+
+	board = hostsim.install( flash=args.flash, noise=args.noise, speed=args.speed )
+	import main
+	main.REMOTE_CONTROL = True
+	main.TELEMETRY_BINARY = args.binary
+	app = main.App()
+	try:
+		app.run()
+	except hostsim.HostReset:
+		print( 'board reset at %.1f sec' % (board.clock.us/1000000), file=sys.stderr )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,87 @@
+""" Boot of main.py on the host stand-in: boot report and modules compiled at boot
+
+	python3 host/sim_boot.py [--all] [--no-mpy]
+
+	Creates the App like main.py does and prints its boot report (virtual ms:
+	only the bus transactions and their delays are modelled, not the
+	compilation of the modules nor the heap). Then lists the modules of lib/
+	and main.py imported before the menu, with their source size and the
+	size of their .mpy (mpy-cross, when installed): on the board the source
+	is compiled at every boot unless installed by `install.sh --mpy`. Lists
+	the modules imported later by a SnCu reflow. --all turns on the options
+	of main.py (estimator, feed-forward, tick stats, sigma-delta SSR, remote
+	control) which import their own modules.
+"""
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import contextlib
+
+import hostsim
+
+_root = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+_host = os.path.dirname( os.path.abspath( __file__ ) )
+
+def app_modules():
+	""" {name: source file} of the modules of lib/ and main.py currently imported """
+	_mods = {}
+	for _name, _mod in list( sys.modules.items() ):
+		_file = getattr( _mod, '__file__', None ) or ''
+		if _file.startswith( _root ) and not _file.startswith( _host ):
+			_mods[_name] = _file
+	return _mods
+
+def mpy_size( path, mpy_cross ):
+	""" Size of the .mpy of the source file, None without mpy-cross """
+	if mpy_cross == None:
+		return None
+	with tempfile.TemporaryDirectory() as _dir:
+		_out = os.path.join( _dir, 'out.mpy' )
+		subprocess.run( [mpy_cross, '-march=armv6m', '-o', _out, path], check=True )
+		return os.path.getsize( _out )
+
+def print_modules( title, mods, mpy_cross ):
+	_src = _mpy = 0
+	print( '%s:' % title )
+	for _name in sorted( mods ):
+		_size = os.path.getsize( mods[_name] )
+		_msize = mpy_size( mods[_name], mpy_cross )
+		_src += _size
+		_mpy += _msize or 0
+		print( '  %-12s %6i bytes %s' % (_name, _size, ('-> %5i bytes .mpy' % _msize) if _msize != None else '') )
+	print( '  %-12s %6i bytes %s' % ('total', _src, ('-> %5i bytes .mpy' % _mpy) if mpy_cross != None else '') )
+
+def main():
+	parser = argparse.ArgumentParser( description='Boot report and modules compiled at boot' )
+	parser.add_argument( '--all', action='store_true', help='turn on the options of main.py' )
+	parser.add_argument( '--no-mpy', action='store_true', help='do not compile the modules with mpy-cross' )
+	args = parser.parse_args()
+	_mpy_cross = None if args.no_mpy else shutil.which( 'mpy-cross' )
+
+	board = hostsim.install()
+	import main
+	import uasyncio as asyncio
+	if args.all:
+		main.USE_ESTIMATOR = main.USE_FEEDFORWARD = main.TICK_STATS = main.SSR_SIGMA_DELTA = main.REMOTE_CONTROL = True
+		import remote # imported by App.main() with the remote control
+	app = main.App()
+	with contextlib.redirect_stdout( io.StringIO() ) as _out:
+		app.boot_report()
+	print( _out.getvalue().strip() )
+	_boot = app_modules()
+	print_modules( 'compiled at boot', _boot, _mpy_cross )
+
+	async def scenario():
+		asyncio.create_task( app.p.ev.run() )
+		await app.reflow( 'SnCu' )
+	with contextlib.redirect_stdout( io.StringIO() ):
+		asyncio.run( scenario() )
+	_later = { _name: _file for _name, _file in app_modules().items() if _name not in _boot }
+	print_modules( 'imported by the first reflow', _later, _mpy_cross )
+
+if __name__ == '__main__':
+	main()
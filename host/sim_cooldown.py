@@ -0,0 +1,68 @@
+""" Cool-down after the peak: fans full on vs fans regulated on the profile ramp
+
+	python3 host/sim_cooldown.py [--ramp 200 45] [--stop 100]
+
+	Runs the SnCu profile of main.py without then with a cool-down ramp
+	(--ramp: target C, seconds after the peak hold) and cools the plate to
+	--stop with App.cooling(). Prints the maximum cooling rate (thermocouple,
+	over 5 sec), the handover to free cooling, the time from the end of the
+	peak hold to --stop and the tracking of the ramp.
+"""
+import argparse
+import io
+import contextlib
+
+import hostsim
+
+def run_cooldown( ramp, stop_t=100 ):
+	""" Returns (samples, peak_end_sec, handover): samples are (sec, temperature, ramp setpoint or None) every second,
+	    handover is (sec, temperature) of the switch to free cooling """
+	board = hostsim.install()
+	import main
+	import uasyncio as asyncio
+	_profile = list( main.PROFILE_SNCU[:4] ) + ([ tuple( ramp ) ] if ramp else [])
+	app = main.App()
+	samples = []
+	_handover = [None]
+	def sample( owner ):
+		_cd = app.p.cooldown
+		samples.append( (board.clock.us/1000000, app.p.temperature, _cd.setpoint if _cd != None and not _cd.free else None) )
+		if (_handover[0] == None) and (board.pins.get( board.COOLING_PIN, 0 )) and ((_cd == None) or _cd.free):
+			_handover[0] = (board.clock.us/1000000, app.p.temperature)
+	board.clock.add_timer( 'samples', 1000, sample, periodic=True )
+	_peak_end = [0]
+	async def scenario():
+		asyncio.create_task( app.p.ev.run() )
+		_start = board.clock.us/1000000
+		_peak_end[0] = _start + sum( _phase[1] for _phase in main.PROFILE_SNCU[:4] )
+		await app.profile_heating( _profile )
+		await app.cooling( cooling_stop_t=stop_t )
+		app.p.stop()
+	with contextlib.redirect_stdout( io.StringIO() ):
+		asyncio.run( scenario() )
+	return samples, _peak_end[0], _handover[0]
+
+def main():
+	parser = argparse.ArgumentParser( description='Cool-down with and without the fans regulated on a ramp' )
+	parser.add_argument( '--ramp', type=float, nargs=2, default=[200, 45], metavar=('TEMP', 'SEC') )
+	parser.add_argument( '--stop', type=float, default=100, help='end of the cooling (C)' )
+	args = parser.parse_args()
+	for _ramp in (None, args.ramp):
+		samples, _peak_end, _handover = run_cooldown( _ramp, args.stop )
+		_after = [ s for s in samples if s[0] >= _peak_end ]
+		_rate = max( (_after[k][1]-_after[k+5][1])/5 for k in range( len(_after)-5 ) )
+		_end = samples[-1][0]
+		if _ramp:
+			print( 'ramp %i C in %i sec (max %.2f C/s):' % (_ramp[0], _ramp[1], (245-_ramp[0])/_ramp[1]) )
+		else:
+			print( 'fans full on:' )
+		print( '  max cooling rate    : %.2f C/s' % _rate )
+		if _handover != None:
+			print( '  free cooling from   : %4i sec after the peak, %5.1f C' % (_handover[0]-_peak_end, _handover[1]) )
+		_tracked = [ t-sp for sec, t, sp in _after if sp != None ]
+		if _tracked:
+			print( '  ramp tracking       : RMS %.2f C, max %+.2f C' % ((sum( e*e for e in _tracked )/len(_tracked))**0.5, max( _tracked, key=abs )) )
+		print( '  peak end -> %3i C   : %4i sec' % (args.stop, _end-_peak_end) )
+
+if __name__ == '__main__':
+	main()
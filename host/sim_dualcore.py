@@ -0,0 +1,40 @@
+""" Control tick jitter with the regulation on core 0 (Timers) or on core 1 (_thread)
+
+	python3 host/sim_dualcore.py
+
+	Runs the sim_ui.py scenario (menus, SnCu reflow, cooling) twice and records
+	the virtual time at which the PID reads its measure. The jitter is the
+	difference between two ticks and the PID period. On core 0, the Timer
+	callbacks wait for the end of the I2C transactions of the LCD and the
+	encoder (and for the other callbacks); on core 1 they do not.
+"""
+import time as _wall
+
+import sim_ui
+
+def tick_jitter( core1 ):
+	""" Returns (board, marks, [jitter in us]) """
+	_ticks = [] # (us, period_ms)
+	def on_app( app, board ):
+		_pid = app.p._pid
+		_measure = _pid.measure_func
+		def spy():
+			_ticks.append( (board.clock.us, _pid.period_ms) )
+			return _measure()
+		_pid.measure_func = spy
+	board, marks = sim_ui.run_ui( core1=core1, on_app=on_app )
+	_jitter = [ abs( (b[0]-a[0]) - b[1]*1000 ) for a, b in zip( _ticks, _ticks[1:] ) if a[1] == b[1] ]
+	return board, marks, _jitter
+
+def main():
+	print( '                 ticks   mean (us)   p99 (us)   max (us)   encoder+LCD I2C   wall (s)' )
+	for name, _core1 in (('core 0 (Timer)', False), ('core 1 (_thread)', True)):
+		_start = _wall.perf_counter()
+		board, marks, jitter = tick_jitter( _core1 )
+		_wall_s = _wall.perf_counter() - _start
+		jitter.sort()
+		print( '  %-16s %5i %10.1f %10i %10i   %15i   %8.2f' % (name, len(jitter), sum(jitter)/len(jitter),
+			jitter[ int(len(jitter)*0.99) ], jitter[-1], board.i2c_transactions, _wall_s) )
+
+if __name__ == '__main__':
+	main()
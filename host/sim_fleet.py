@@ -0,0 +1,78 @@
+""" Drive a fleet of simulated planchas over pseudo-terminals with host/fleet.py
+
+	python3 host/sim_fleet.py [--boards 3] [--speed 40] [--duration 360]
+
+	Starts `boards` host/sim_board.py processes (one pty each, the odd ones
+	with raw binary telemetry) and runs on them at once: upload of a short
+	profile, a reflow SnCu, a preheat at 150 C, the uploaded profile... then
+	prints the status table every 30 virtual sec, stops everything and
+	checks the replies and the telemetry (sequence gaps, crc errors).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+from fleet import Fleet, RemoteError
+
+QUICK = [(120, 30), (150, 30), (150, 20)]
+
+async def scenario( fleet, speed, duration ):
+	_boards = fleet.boards
+	print( '\n'.join( fleet.table( await fleet.status() ) ) + '\n' )
+	print( 'boot          :', await fleet.each( 'command', 'boot', '' ) )
+	print( 'upload Quick  :', await fleet.each( 'upload', 'Quick', QUICK ) )
+	try:
+		await _boards[0].upload( 'Bad', [(500, 10)] )
+	except RemoteError as e:
+		print( 'upload Bad    : ERR', e )
+	_jobs = [ ('profile', 'SnCu'), ('preheat', 150), ('profile', 'Quick') ]
+	_started = await asyncio.gather( *[ getattr( b, _jobs[i % len(_jobs)][0] )( _jobs[i % len(_jobs)][1] ) for i, b in enumerate(_boards) ], return_exceptions=True )
+	print( 'start         :', _started )
+	for _t in range( 30, duration+1, 30 ):
+		await asyncio.sleep( 30/speed )
+		print( '\nt=%3i sec' % _t )
+		print( '\n'.join( fleet.table( await fleet.status() ) ) )
+	print( '\nstop          :', await fleet.each( 'stop' ) )
+	await asyncio.sleep( 2/speed )
+	_states = await fleet.status()
+	print( '\n'.join( fleet.table( _states ) ) + '\n' )
+	for b in _boards:
+		d = b.decoder
+		print( '%-14s %4i frames %6i samples %3i lost %3i bad %3i dropped' % (b.port, d.frames, d.samples, d.lost, d.bad, d.dropped) )
+	return _states
+
+async def run( args ):
+	_here = os.path.dirname( os.path.abspath(__file__) )
+	_procs = []
+	_ports = []
+	try:
+		for i in range( args.boards ):
+			_cmd = [ sys.executable, os.path.join( _here, 'sim_board.py' ), '--speed', str(args.speed) ]
+			if i % 2:
+				_cmd.append( '--binary' )
+			_p = subprocess.Popen( _cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True )
+			_procs.append( _p )
+			_ports.append( _p.stderr.readline().strip() )
+		fleet = Fleet( _ports )
+		await fleet.open()
+		try:
+			await scenario( fleet, args.speed, args.duration )
+		finally:
+			fleet.close()
+	finally:
+		for _p in _procs:
+			_p.terminate()
+			_p.wait()
+
+def main():
+	parser = argparse.ArgumentParser( description='Fleet of simulated planchas on pseudo-terminals' )
+	parser.add_argument( '--boards', type=int, default=3 )
+	parser.add_argument( '--speed', type=float, default=40, help='virtual sec per wall sec' )
+	parser.add_argument( '--duration', type=int, default=360, help='virtual sec before the stop' )
+	args = parser.parse_args()
+	asyncio.run( run( args ) )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,48 @@
+""" Run history of a small fleet of simulated planchas, aggregated by host/fleet_history.py
+
+	python3 host/sim_history.py [--boards 3] [--runs 8] [--ageing 2]
+
+	Every board runs `runs` SnCu reflows (App.reflow, cooling included) on
+	its own flash. The element of the last board loses --ageing % of its
+	power at every run. The runs.bin of the boards are then read and
+	aggregated like copies pulled from real boards: the last one must be
+	flagged DRIFT.
+"""
+import argparse
+import io
+import os
+import contextlib
+
+import hostsim
+import fleet_history
+
+def run_board( runs, ageing=0.0 ):
+	""" Returns the path of the runs.bin of a new board after `runs` reflows """
+	board = hostsim.install()
+	import main
+	import uasyncio as asyncio
+	app = main.App()
+	async def scenario():
+		asyncio.create_task( app.p.ev.run() )
+		for i in range( runs ):
+			await app.reflow( 'SnCu' )
+			board.plate.a *= 1 - ageing/100
+	with contextlib.redirect_stdout( io.StringIO() ):
+		asyncio.run( scenario() )
+	return os.path.join( board.flash, main.HISTORY_DIR, 'runs.bin' )
+
+def main():
+	parser = argparse.ArgumentParser( description='Run history of simulated planchas' )
+	parser.add_argument( '--boards', type=int, default=3 )
+	parser.add_argument( '--runs', type=int, default=8 )
+	parser.add_argument( '--ageing', type=float, default=2.0, help='power lost by the element of the last board at each run (%%)' )
+	args = parser.parse_args()
+	_runs = {}
+	for i in range( args.boards ):
+		_file = run_board( args.runs, args.ageing if i == args.boards-1 else 0.0 )
+		_runs['board%i' % (i+1)] = fleet_history.read_file( _file )
+		print( 'board%i: %i runs, %i bytes in %s' % (i+1, len( _runs['board%i' % (i+1)] ), os.path.getsize( _file ), _file) )
+	print( '\n'.join( fleet_history.table( fleet_history.aggregate( _runs ) ) ) )
+
+if __name__ == '__main__':
+	main()
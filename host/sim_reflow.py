@@ -0,0 +1,101 @@
+""" Run a full reflow profile of main.py against the host stand-in
+
+	python3 host/sim_reflow.py [--profile SnCu] [--csv out.csv] [--noise 0.25]
+
+	Prints the wall clock duration of the simulation, the virtual duration and
+	a short summary of the temperature curve (CSV: time, setpoint, temperature).
+"""
+import argparse
+import io
+import os
+import contextlib
+import time as _wall
+
+import hostsim
+
+def run_reflow( profile_name='SnCu', noise=0.0, cooling=True, estimator=False, gains=None, feedforward=False, sigma_delta=False ):
+	""" Execute App.profile_heating() on a fresh board. Returns (board, samples, log_lines)
+	    samples are (virtual_sec, setpoint, thermocouple temperature) """
+	board = hostsim.install( noise=noise )
+	import main
+	import uasyncio as asyncio
+
+	samples = []
+	app = main.App()
+	if gains:
+		app.p.gains = tuple( gains )
+		app.p.set_schedule( None ) # this single gain set
+	if estimator:
+		app.p.enable_estimator()
+	if feedforward:
+		app.p.enable_feedforward( *main.FF_MODEL )
+	if sigma_delta:
+		app.p.use_sigma_delta()
+	_pid = app.p._pid
+	_measure = _pid.measure_func
+	def spy():
+		_t = _measure()
+		samples.append( (board.clock.us/1000000, _pid.setpoint, app.p.sampler.value) )
+		return _t
+	_pid.measure_func = spy
+	board.duties = []
+	_output = _pid.output_func
+	def spy_output( value ):
+		board.duties.append( value )
+		return _output( value )
+	_pid.output_func = spy_output
+
+	_profile = { 'SnCu': main.PROFILE_SNCU }[profile_name]
+	_log = []
+	async def scenario():
+		asyncio.create_task( app.p.ev.run() )
+		board.profile_window = (board.clock.us/1000000, app.p.temperature)
+		await app.profile_heating( _profile, progress_cb=_log.append )
+		board.profile_window += (board.clock.us/1000000,)
+		if cooling:
+			await app.cooling( cooling_stop_t=100 )
+		app.p.stop()
+	with contextlib.redirect_stdout( io.StringIO() ):
+		asyncio.run( scenario() )
+	return board, samples, _log
+
+def tracking_error( board, samples, profile ):
+	""" RMS and max error of the measured temperature against the ideal profile """
+	from trajectory import Trajectory
+	_start, _temp, _end = board.profile_window
+	_ideal = Trajectory( profile, _temp )
+	_errors = [ t - _ideal.at( int((sec-_start)*1000) ) for sec, sp, t in samples if _start <= sec <= _end ]
+	return (sum( e*e for e in _errors )/len(_errors))**0.5, max( abs(e) for e in _errors )
+
+def main():
+	parser = argparse.ArgumentParser( description='Simulate a reflow on the host' )
+	parser.add_argument( '--profile', default='SnCu' )
+	parser.add_argument( '--csv', default=None, help='write time,setpoint,temperature' )
+	parser.add_argument( '--noise', type=float, default=0.0, help='thermocouple noise (C, sigma)' )
+	parser.add_argument( '--estimator', action='store_true', help='enable the AlphaBeta estimator' )
+	parser.add_argument( '--feedforward', action='store_true', help='add the FOPDT plate model (main.FF_MODEL) to the PID' )
+	parser.add_argument( '--sigma-delta', action='store_true', help='drive the SSR by half-cycle slots (lib/ssr.py)' )
+	parser.add_argument( '--gains', type=float, nargs=3, default=None, metavar=('KP','KI','KD') )
+	args = parser.parse_args()
+	if args.csv != None:
+		args.csv = os.path.abspath( args.csv ) # the simulation runs in its flash directory
+	_start = _wall.perf_counter()
+	board, samples, _log = run_reflow( args.profile, noise=args.noise, estimator=args.estimator, gains=args.gains, feedforward=args.feedforward, sigma_delta=args.sigma_delta )
+	_elapsed = _wall.perf_counter() - _start
+
+	print( 'Reflow %s simulated: %.1f virtual sec in %.3f wall sec' % (args.profile, board.clock.us/1000000, _elapsed) )
+	print( 'Peak temperature : %.2f C' % max(s[2] for s in samples) )
+	print( 'Heater energy    : %.1f sec ON' % (board.heater_on_us/1000000) )
+	print( 'I2C transactions : %i' % board.i2c_transactions )
+	_d = board.duties
+	print( 'Duty chatter     : %.2f %% mean step between ticks' % (sum( abs(_d[i]-_d[i-1]) for i in range(1, len(_d)) )/max(1, len(_d)-1)) )
+	import main as app_main
+	print( 'Tracking error   : RMS %.2f C, max %.2f C' % tracking_error( board, samples, { 'SnCu': app_main.PROFILE_SNCU }[args.profile] ) )
+	if args.csv:
+		with open( args.csv, 'w' ) as f:
+			f.write( 'time,setpoint,temperature\n' )
+			for s in samples:
+				f.write( '%.3f,%s,%s\n' % s )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,75 @@
+""" Compare the SSR drivers: LowFreqPWM (1.5 s window) and SigmaDelta (10 ms half-cycle slots)
+
+	python3 host/sim_ssr.py
+
+	For each driver, on the plate model of the host stand-in:
+	  * latency: delay between a new duty and the first ON edge (mean / max
+	    over steps at random instants),
+	  * ripple: peak to peak and standard deviation of the sole temperature
+	    (not the thermocouple, which filters it) while holding 200 C,
+	  * tracking: RMS / max error of a SnCu reflow (host/sim_reflow.py).
+"""
+import random
+
+import hostsim
+import sim_reflow
+
+HOLD_T = 200
+
+def latency( sigma_delta, steps=200, seed=1 ):
+	""" mean / max delay (ms) from duty_ratio( 37 ) to the first ON edge """
+	board = hostsim.install()
+	from machine import Pin
+	from lfpwm import LowFreqPWM
+	from ssr import SigmaDelta
+	_pin = Pin( 13, Pin.OUT, value=False )
+	_drv = SigmaDelta( _pin ) if sigma_delta else LowFreqPWM( pin=_pin, period=1.5, ton_ms=9, toff_ms=10 )
+	_rand = random.Random( seed )
+	_delays = []
+	for i in range( steps ):
+		_drv.duty_ratio( 0 )
+		board.clock.advance_us( _rand.randrange( 1000, 3000000 ) )
+		_start = board.clock.us
+		_drv.duty_ratio( 37 )
+		while not board.pins.get( 13, 0 ):
+			board.clock.advance_us( 500 )
+		_delays.append( (board.clock.us-_start)/1000 )
+	_drv.deinit()
+	return sum( _delays )/len( _delays ), max( _delays )
+
+def ripple( sigma_delta, settle_sec=600, window_sec=300 ):
+	""" peak to peak, standard deviation of the sole (C) and mean duty step holding HOLD_T """
+	board = hostsim.install()
+	import main
+	app = main.App()
+	if sigma_delta:
+		app.p.use_sigma_delta()
+	_soles = []
+	_integrate = board.clock.on_advance
+	_from = settle_sec*1000000
+	def spy( from_us, to_us ):
+		_integrate( from_us, to_us )
+		if to_us >= _from:
+			_soles.append( board.plate.sole )
+	board.clock.on_advance = spy
+	app.p.temperature = HOLD_T
+	board.clock.advance_us( (settle_sec+window_sec)*1000000 )
+	app.p.stop()
+	_mean = sum( _soles )/len( _soles )
+	_std = (sum( (s-_mean)**2 for s in _soles )/len( _soles ))**0.5
+	return max( _soles )-min( _soles ), _std, _mean-HOLD_T
+
+def main():
+	for _sd, _name in ((False, 'LowFreqPWM 1.5 s'), (True, 'SigmaDelta 10 ms')):
+		_lat = latency( _sd )
+		_rip = ripple( _sd )
+		board, samples, _log = sim_reflow.run_reflow( cooling=False, sigma_delta=_sd )
+		import main as app_main # fresh module of this board
+		_rms, _max = sim_reflow.tracking_error( board, samples, app_main.PROFILE_SNCU )
+		print( '%s' % _name )
+		print( '  latency  : mean %6.1f ms, max %6.1f ms' % _lat )
+		print( '  hold %i : sole ripple %.3f C p-p, std %.3f C, offset %+.2f C' % ((HOLD_T,) + _rip) )
+		print( '  reflow   : tracking RMS %.2f C, max %.2f C' % (_rms, _max) )
+
+if __name__ == '__main__':
+	main()
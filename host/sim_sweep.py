@@ -0,0 +1,65 @@
+""" PID gain sweep on the host (NumPy, see host/tuning/)
+
+	python3 host/sim_sweep.py [--profile sncu|sac305|snbi] [--kp 0.5:4:8] [--ki 0:0.05:6] [--kd 0:12:7] [--dt 500 1000]
+	python3 host/sim_sweep.py --fit plate docs/test-ramp.zip my-ramp.csv
+
+	Ranges are start:stop:count (linspace) or a single value. The plant is the
+	PlateModel of host/thermal.py, or a model fitted first on ramp logs
+	(--fit plate|fopdt). Prints the best gain sets ranked by --sort.
+"""
+import argparse
+import time
+import numpy as np
+
+import tuning
+from tuning.sweep import all_profiles, COLUMNS
+
+def span( text ):
+	""" 'start:stop:count' or a single value """
+	_parts = text.split( ':' )
+	if len(_parts) == 1:
+		return np.array( [float(text)] )
+	return np.linspace( float(_parts[0]), float(_parts[1]), int(_parts[2]) )
+
+def main():
+	_profiles = all_profiles()
+	parser = argparse.ArgumentParser( description='Sweep the PID gains on a simulated reflow' )
+	parser.add_argument( '--profile', default='sncu', choices=sorted(_profiles), help='PROFILE_xxx of main.py or profile of profiles/index.json' )
+	parser.add_argument( '--liquidus', type=float, default=None, help='liquidus of the alloy (C, default: the one of profiles/index.json, else 227)' )
+	parser.add_argument( '--lead', type=int, default=8000, help='setpoint lead (ms, main.PROFILE_LEAD_MS)' )
+	parser.add_argument( '--kp', type=span, default=span('0.5:4:8') )
+	parser.add_argument( '--ki', type=span, default=span('0:0.05:6') )
+	parser.add_argument( '--kd', type=span, default=span('0:12:7') )
+	parser.add_argument( '--dt', type=int, nargs='+', default=[500, 1000], help='PID periods (ms)' )
+	parser.add_argument( '--fit', choices=('plate', 'fopdt'), default=None, help='fit the plant on the logs first' )
+	parser.add_argument( '--workers', type=int, default=None, help='processes (default: CPU count)' )
+	parser.add_argument( '--sort', choices=COLUMNS, default='score' )
+	parser.add_argument( '--top', type=int, default=20 )
+	parser.add_argument( 'logs', nargs='*', help='ramp logs (CSV / .ods / .zip) for --fit (default: docs/test-ramp.zip)' )
+	args = parser.parse_args()
+
+	plant = ('plate', {})
+	if args.fit != None:
+		_start = time.perf_counter()
+		_logs = tuning.load_logs( args.logs )
+		if args.fit == 'plate':
+			_fit = tuning.fit_plate( _logs )
+			plant = ('plate', { 'a':_fit['a'], 'tau':_fit['tau'] })
+		else:
+			_fit = tuning.fit_fopdt( _logs )
+			plant = ('fopdt', _fit)
+		print( 'Fit %s on %i logs in %.1f sec: %s' % (args.fit, len(_logs), time.perf_counter()-_start,
+			'  '.join( '%s %.4g' % kv for kv in _fit.items() )) )
+
+	_phases, _liquidus = _profiles[args.profile]
+	if args.liquidus != None:
+		_liquidus = args.liquidus
+	profile = tuning.Profile( args.profile, _phases, liquidus=_liquidus if _liquidus != None else 227, lead_ms=args.lead )
+	gains = tuning.grid( args.kp, args.ki, args.kd, args.dt )
+	_start = time.perf_counter()
+	result = tuning.sweep( gains, profile, plant=plant, workers=args.workers )
+	print( 'Profile %s: %i gain sets simulated in %.1f sec' % (args.profile, len(gains), time.perf_counter()-_start) )
+	print( tuning.ranked( gains, result, sort=args.sort, top=args.top ) )
+
+if __name__ == '__main__':
+	main()
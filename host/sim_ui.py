@@ -0,0 +1,74 @@
+""" Drive the complete main.py application (menus included) on the host stand-in
+
+	python3 host/sim_ui.py
+
+	Scenario: stay 10 sec in the main menu, select [Reflow] > [SnCu] > [Yes],
+	wait for the end of the reflow and the cooling, then switch RUN_APP to STOP.
+	Prints the encoder & LCD I2C load per phase and the screen content.
+"""
+import io
+import contextlib
+import time as _wall
+
+import hostsim
+
+def run_ui( idle_sec=10, core1=False, on_app=None ):
+	""" Returns (board, marks). on_app( app, board ) is called once the App is created """
+	board = hostsim.install()
+	import main
+
+	main.USE_CORE1 = core1
+	app = main.App()
+	if on_app != None:
+		on_app( app, board )
+	_t0 = board.now_ms + idle_sec*1000
+	# Main menu idle, then rotate twice to [Reflow] and select it
+	board.turn( _t0, 1 )
+	board.turn( _t0+500, 1 )
+	board.press( _t0+1000 )
+	board.press( _t0+2000 ) # [SnCu]
+	board.press( _t0+3000 ) # [Yes]
+
+	_marks = {}
+	def mark( name ):
+		_marks[name] = (board.now_ms, board.i2c_by_device.get( app.p.enc.address, 0 ), board.i2c_by_device.get( board.lcd.address, 0 ))
+	mark( 'start' )
+	board.clock.add_timer( 'idle', idle_sec*1000, lambda owner: mark('idle'), periodic=False )
+	# Stop the application once back in the main menu after the reflow
+	_menu_select = app.p.amenu_select
+	async def spy_menu( options, clear=True ):
+		if options[0][0] == 'PREHEAT':
+			mark( 'menu' )
+			if 'reflow' in _marks:
+				board.pins[board.RUN_APP_PIN] = 1
+				board.press( board.now_ms+100 )
+		elif options[0][0] == True:
+			mark( 'confirm' )
+		return await _menu_select( options, clear )
+	app.p.amenu_select = spy_menu
+	_heating = app.profile_heating
+	async def spy_heating( profile, progress_cb=None ):
+		mark( 'heating' )
+		await _heating( profile, progress_cb )
+		mark( 'reflow' )
+	app.profile_heating = spy_heating
+
+	with contextlib.redirect_stdout( io.StringIO() ):
+		app.run()
+	mark( 'end' )
+	return board, _marks
+
+if __name__ == '__main__':
+	_start = _wall.perf_counter()
+	board, marks = run_ui()
+	print( 'Simulated %.1f virtual sec in %.3f wall sec' % (board.now_ms/1000, _wall.perf_counter()-_start) )
+	def rate( _from, _to ):
+		return (marks[_to][1]-marks[_from][1])*1000/max(1, marks[_to][0]-marks[_from][0])
+	print( 'Encoder I2C, menu idle       : %6.1f transactions/sec' % rate('start', 'idle') )
+	print( 'Encoder I2C, menu navigation : %6.1f transactions/sec' % rate('idle', 'confirm') )
+	print( 'Encoder I2C, reflowing       : %6.1f transactions/sec' % rate('heating', 'reflow') )
+	print( 'LCD I2C, whole scenario      : %6i transactions' % (marks['end'][2]-marks['start'][2]) )
+	print( 'LCD I2C, reflow + cooling    : %6i transactions' % (marks['end'][2]-marks['heating'][2]) )
+	print( 'Screen:' )
+	for line in board.lcd.text():
+		print( '  |%s|' % line )
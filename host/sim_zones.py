@@ -0,0 +1,80 @@
+""" Two heating zones regulated by lib/zones.py on the host stand-in
+
+	python3 host/sim_zones.py [--coupling 0.3] [--setpoints 150 200]
+
+	Each zone is a PlateModel whose element also receives `coupling` times
+	the power of the other zones (radiation / conduction between the zones).
+	The zones are read through two MAX31855 on the SPI stand-in (their own
+	chip select). The same step is run without then with the coupling
+	compensation of ZoneBank; prints overshoot, settling time and the steady
+	error of each zone and the duration of the bank tick.
+"""
+import argparse
+import time as _wall
+
+import hostsim
+from thermal import PlateModel
+
+ZONES = [(5, 13), (20, 14)] # (thermocouple CS, heater) pins
+
+def run_zones( setpoints, coupling, compensate, seconds=900, gains=(1.95, 0.0125, 4.5) ):
+	""" Returns (samples, tick_us): samples are (sec, [temperature per zone], [output per zone]) """
+	board = hostsim.install()
+	_models = [ PlateModel( ambient=board.plate.ambient ) for z in ZONES ]
+	def integrate( from_us, to_us ):
+		_on = [ board.pins.get( h, 0 ) for c, h in ZONES ]
+		for i, _m in enumerate( _models ):
+			_heat = _on[i] + coupling*sum( _on[j] for j in range(len(ZONES)) if j != i )
+			_m.step( (to_us-from_us)/1000000, _heat )
+	board.clock.on_advance = integrate
+	import max31855
+	for i, (c, h) in enumerate( ZONES ):
+		board.spi_devices[c] = (lambda m: lambda: max31855.frame( m.sensor ))( _models[i] )
+
+	from plancha import Plancha
+	from machine import Timer
+	p = Plancha()
+	_n = len( ZONES )
+	_matrix = [ [ coupling if i != j else 0 for j in range(_n) ] for i in range(_n) ] if compensate else None
+	bank = p.setup_zones( ZONES, *gains, coupling=_matrix )
+	for i, _sp in enumerate( setpoints ):
+		bank.set( i, _sp )
+	samples = []
+	_ticks = []
+	_control = bank.control
+	def spy( timer ):
+		_start = _wall.perf_counter()
+		_control( timer )
+		_ticks.append( _wall.perf_counter()-_start )
+		samples.append( (board.clock.us/1000000, list( bank.measure ), list( bank.output )) )
+	bank.timer.init( mode=Timer.PERIODIC, period=bank.period_ms, callback=spy )
+	board.clock.advance_us( seconds*1000000 )
+	bank.deinit()
+	return samples, 1000000*sum( _ticks )/len( _ticks )
+
+def step_metrics( samples, zone, setpoint ):
+	""" overshoot (C), settling time (sec, within 2 C for good), mean error over the last 200 sec """
+	_temps = [ (s[0], s[1][zone]) for s in samples ]
+	_overshoot = max( 0, max( t for sec, t in _temps ) - setpoint )
+	_settle = 0
+	for sec, t in _temps:
+		if abs( t-setpoint ) > 2:
+			_settle = sec
+	_end = _temps[-1][0]
+	_tail = [ t-setpoint for sec, t in _temps if sec >= _end-200 ]
+	return _overshoot, _settle, sum( _tail )/len( _tail )
+
+def main():
+	parser = argparse.ArgumentParser( description='Two zone regulation on the host' )
+	parser.add_argument( '--coupling', type=float, default=0.3, help='share of the power of a zone received by the others' )
+	parser.add_argument( '--setpoints', type=float, nargs='+', default=[150, 200] )
+	parser.add_argument( '--seconds', type=int, default=900 )
+	args = parser.parse_args()
+	for _comp in (False, True):
+		samples, tick_us = run_zones( args.setpoints, args.coupling, _comp, args.seconds )
+		print( 'coupling %.2f, compensation %-3s (bank tick %.1f us on host)' % (args.coupling, 'on' if _comp else 'off', tick_us) )
+		for i, _sp in enumerate( args.setpoints ):
+			print( '  zone %i @ %3i C: overshoot %5.2f C, settled %4i sec, steady error %+5.2f C' % ((i, _sp) + step_metrics( samples, i, _sp )) )
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,197 @@
+""" Live reader of the regulation telemetry (lib/tlog.py)
+
+	python3 host/telemetry.py /dev/ttyACM0 --csv run.csv [--parquet run.parquet] [--plot]
+	python3 host/telemetry.py capture.bin --csv run.csv    # replay a capture
+	mpremote run main.py | python3 host/telemetry.py - --plot
+
+	The source is read by an asyncio task as soon as bytes are available (a
+	tty is switched to raw mode), decoded by tlog_decode.FrameDecoder (raw
+	frames and "#TL" lines) and handed to the sinks:
+	  * --csv     : rows written as they arrive (columns of tlog_decode.py)
+	  * --parquet : written at the end (needs pyarrow)
+	  * --plot    : temperature, estimate, setpoint and duty redrawn twice a
+	                second (needs matplotlib)
+	The plot is refreshed by its own task: a slow redraw only delays it, the
+	bytes wait in the OS buffer of the source. The counters of the decoder
+	(sequence gaps, crc errors, samples dropped by the board) are printed at
+	the end (Ctrl+C).
+"""
+import argparse
+import asyncio
+import bisect
+import errno
+import os
+import stat
+import sys
+import termios
+import tty
+
+from tlog_decode import FrameDecoder, CsvWriter, Sample
+
+READ_SIZE = 4096
+PLOT_PERIOD = 0.5 # sec
+PLOT_WINDOW = 600 # sec shown
+
+class Columns:
+	""" All the samples in columns (lists), for Parquet and the plot """
+	def __init__( self ):
+		self.elapsed = []
+		self.columns = { name: [] for name in Sample._fields }
+		self._last = None
+		self._elapsed = 0
+
+	def write( self, samples ):
+		for s in samples:
+			if self._last != None:
+				self._elapsed += (s.ticks - self._last) % (1 << 30)
+			self._last = s.ticks
+			self.elapsed.append( self._elapsed/1000 )
+			for name, value in zip( Sample._fields, s ):
+				self.columns[name].append( value )
+
+	def __len__( self ):
+		return len( self.elapsed )
+
+def write_parquet( columns, filename ):
+	import pyarrow
+	import pyarrow.parquet
+	_table = pyarrow.table( dict( elapsed=columns.elapsed, **columns.columns ) )
+	pyarrow.parquet.write_table( _table, filename )
+
+class LivePlot:
+	def __init__( self, columns ):
+		import matplotlib.pyplot as plt
+		self.plt = plt
+		self.columns = columns
+		plt.ion()
+		self.fig, (self.ax_t, self.ax_d) = plt.subplots( 2, 1, sharex=True, height_ratios=(3, 1) )
+		self.temp, = self.ax_t.plot( [], [], label='temp' )
+		self.estimate, = self.ax_t.plot( [], [], label='estimate' )
+		self.setpoint, = self.ax_t.plot( [], [], '--', label='setpoint' )
+		self.duty, = self.ax_d.plot( [], [], color='tab:red' )
+		self.ax_t.set_ylabel( '°C' )
+		self.ax_t.legend( loc='upper left' )
+		self.ax_d.set_ylabel( 'duty %' )
+		self.ax_d.set_xlabel( 'sec' )
+		self.ax_d.set_ylim( 0, 105 )
+
+	def update( self ):
+		_c = self.columns
+		if len(_c) == 0:
+			return
+		_from = bisect.bisect_left( _c.elapsed, _c.elapsed[-1]-PLOT_WINDOW )
+		_x = _c.elapsed[_from:]
+		for _line, _name in ((self.temp, 'temp'), (self.estimate, 'estimate'), (self.setpoint, 'setpoint'), (self.duty, 'duty')):
+			_line.set_data( _x, _c.columns[_name][_from:] )
+		for _ax in (self.ax_t, self.ax_d):
+			_ax.relim()
+			_ax.autoscale_view( scaley=(_ax is self.ax_t) )
+		self.fig.canvas.draw_idle()
+		self.fig.canvas.flush_events()
+
+	async def run( self ):
+		while True:
+			self.update()
+			await asyncio.sleep( PLOT_PERIOD )
+
+def open_source( name ):
+	""" Non blocking fd of the source. A tty is set to raw mode (no echo, no line editing) """
+	if name == '-':
+		_fd = sys.stdin.fileno()
+	else:
+		_fd = os.open( name, os.O_RDONLY | os.O_NOCTTY )
+	if os.isatty( _fd ):
+		tty.setraw( _fd, termios.TCSANOW )
+	os.set_blocking( _fd, False )
+	return _fd
+
+async def read_source( fd, decoder, sinks ):
+	""" Feed the decoder until the end of the source. Returns the number of bytes read """
+	_loop = asyncio.get_running_loop()
+	_total = 0
+	if stat.S_ISREG( os.fstat(fd).st_mode ): # a file is always readable: no reader callback
+		while True:
+			_data = os.read( fd, READ_SIZE*16 )
+			if not _data:
+				return _total
+			_total += len(_data)
+			_samples = decoder.feed( _data )
+			for _sink in sinks:
+				_sink.write( _samples )
+			await asyncio.sleep( 0 )
+	_ready = asyncio.Event()
+	_loop.add_reader( fd, _ready.set )
+	try:
+		while True:
+			await _ready.wait()
+			_ready.clear()
+			while True: # empty the OS buffer
+				try:
+					_data = os.read( fd, READ_SIZE )
+				except BlockingIOError:
+					break
+				except OSError as e:
+					if e.errno != errno.EIO:
+						raise
+					_data = b'' # board unplugged / pty closed
+				if not _data:
+					return _total
+				_total += len(_data)
+				_samples = decoder.feed( _data )
+				for _sink in sinks:
+					_sink.write( _samples )
+	finally:
+		_loop.remove_reader( fd )
+
+async def run( args ):
+	_decoder = FrameDecoder()
+	_sinks = []
+	_csv = None
+	if args.csv:
+		_csv = open( args.csv, 'w' )
+		_sinks.append( CsvWriter( _csv ) )
+	_columns = None
+	if args.parquet or args.plot:
+		_columns = Columns()
+		_sinks.append( _columns )
+	_plot = None
+	if args.plot:
+		_plot = LivePlot( _columns )
+		_plot_task = asyncio.create_task( _plot.run() )
+	_fd = open_source( args.source )
+	try:
+		await read_source( _fd, _decoder, _sinks )
+	except asyncio.CancelledError:
+		pass
+	finally:
+		if _plot != None:
+			_plot_task.cancel()
+			_plot.update()
+		if _csv != None:
+			_csv.close()
+		if args.parquet:
+			write_parquet( _columns, args.parquet )
+		print( '%i frames, %i samples, %i lost, %i bad frames, %i dropped by the board' % (_decoder.frames, _decoder.samples, _decoder.lost, _decoder.bad, _decoder.dropped), file=sys.stderr )
+	if _plot != None:
+		_plot.plt.ioff()
+		_plot.plt.show()
+
+def main():
+	parser = argparse.ArgumentParser( description='Read, store and plot the lib/tlog.py telemetry' )
+	parser.add_argument( 'source', help='serial port (/dev/ttyACM0), capture file or - (stdin)' )
+	parser.add_argument( '--csv', default=None, help='write the samples as CSV (tlog_decode.py columns)' )
+	parser.add_argument( '--parquet', default=None, help='write the samples as Parquet at the end (pyarrow)' )
+	parser.add_argument( '--plot', action='store_true', help='live plot (matplotlib)' )
+	args = parser.parse_args()
+	# Missing optional packages are reported before opening the port
+	if args.parquet:
+		import pyarrow.parquet
+	if args.plot:
+		import matplotlib
+	try:
+		asyncio.run( run( args ) )
+	except KeyboardInterrupt:
+		pass
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,50 @@
+""" Thermal model of the plate (iron sole heated by a 2200W element)
+
+	Three nodes + thermocouple lag, fitted on the open-loop ramps stored in
+	docs/test-ramp.zip (5% to 100% PWM, heating phase):
+
+	  element  <-ge->  sole  <-gb->  body (frame, screws, ...)
+	                    |
+	                    +-- convection (ks) + radiation (kr) to ambient, fans (kf)
+
+	The thermocouple sees the sole through a first order lag (tau seconds).
+	Coefficients are expressed in degree per second so the model stays cheap.
+"""
+
+class PlateModel:
+	def __init__( self, ambient=24.0, a=13.5, ge=0.16, gb=0.0133, rb=0.68, ks=0.00045, kr=0.0018, kf=0.004, tau=3.0 ):
+		self.ambient = ambient
+		self.a  = a   # element heating rate at 100% (C/s)
+		self.ge = ge  # element -> sole coupling (1/s)
+		self.gb = gb  # sole -> body coupling (1/s)
+		self.rb = rb  # sole/body heat capacity ratio
+		self.ks = ks  # convection losses (1/s)
+		self.kr = kr  # radiation losses (C/s per (K/100)**4)
+		self.kf = kf  # extra convection when fans are running (1/s)
+		self.tau = tau # thermocouple time constant (s)
+		self.reset()
+
+	def reset( self, temp=None ):
+		_t = self.ambient if temp==None else temp
+		self.element = _t
+		self.sole = _t
+		self.body = _t
+		self.sensor = _t
+
+	def _rad( self, t ):
+		return ((t+273.15)/100)**4
+
+	def step( self, seconds, heater, fan=0.0, max_dt=0.25 ):
+		""" Integrate the model over `seconds` with heater & fan ratios (0..1) """
+		_rad_amb = self._rad( self.ambient )
+		while seconds > 0:
+			dt = min( seconds, max_dt )
+			seconds -= dt
+			e, s, b = self.element, self.sole, self.body
+			d_e = self.a*heater - self.ge*(e-s)
+			d_s = self.ge*(e-s) - self.gb*(s-b) - (self.ks+self.kf*fan)*(s-self.ambient) - self.kr*(self._rad(s)-_rad_amb)
+			d_b = self.gb*self.rb*(s-b)
+			self.element = e + d_e*dt
+			self.sole = s + d_s*dt
+			self.body = b + d_b*dt
+			self.sensor += (s-self.sensor)*dt/self.tau
@@ -0,0 +1,162 @@
+""" Decode the regulation telemetry of lib/tlog.py into CSV
+
+	python3 host/tlog_decode.py capture.txt > test-pid.csv    # REPL capture with "#TL ..." lines
+	python3 host/tlog_decode.py tlog.bin > test-pid.csv       # raw frames (file on the flash, serial dump)
+
+	Both forms may be mixed in a capture: the raw frames are found by their
+	sync bytes and checked with their crc32, other bytes (REPL messages) are
+	skipped. The columns start with those of examples/test_pid.py
+	(docs/test-pid.zip spreadsheets): elapsed (sec), ratio (%%), temp (°c),
+	followed by the setpoint (°c), the PID estimate, the profile phase, the
+	lateness and duration of the PID tick (us) and the sequence number.
+"""
+import argparse
+import binascii
+import collections
+import struct
+import sys
+
+
+RECORD_FMT = '<HIhhhHBhH' # Must match lib/tlog.py
+RECORD_SIZE = struct.calcsize( RECORD_FMT )
+FRAME_HEAD = '<2sBBH'
+FRAME_HEAD_SIZE = struct.calcsize( FRAME_HEAD )
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_VERSION = 2
+TEMP_SCALE = 16
+DUTY_SCALE = 100
+SERIAL_TAG = b'#TL '
+TICKS_PERIOD = 1 << 30
+
+Sample = collections.namedtuple( 'Sample', 'seq ticks setpoint temp estimate duty phase late_us tick_us' )
+
+CSV_HEADER = 'elapsed (sec) , ratio (%) , temp (°c) , setpoint (°c) , estimate (°c) , phase , late (us) , tick (us) , seq\n'
+
+def records( data ):
+	""" Iterate over the Samples of the records of a frame """
+	for _offset in range( 0, len(data) - RECORD_SIZE + 1, RECORD_SIZE ):
+		seq, ticks, setpoint, temp, estimate, duty, phase, late, tick = struct.unpack_from( RECORD_FMT, data, _offset )
+		yield Sample( seq, ticks, setpoint/TEMP_SCALE, temp/TEMP_SCALE, estimate/TEMP_SCALE, duty/DUTY_SCALE, phase, late, tick )
+
+class FrameDecoder:
+	""" Incremental decoder: feed() the bytes as they arrive, get the Samples back.
+
+	    Counters: frames, samples, lost (sequence gaps: frames lost or corrupted
+	    on the link), bad (crc errors), dropped (overwritten in the ring of the board).
+	    With text=True, the other lines (REPL messages, lib/remote.py replies)
+	    are kept in `lines` (str, the caller empties it) """
+	def __init__( self, text=False ):
+		self._buf = bytearray()
+		self._seq = None
+		self._text = bytearray() if text else None
+		self.lines = []
+		self.frames = 0
+		self.samples = 0
+		self.lost = 0
+		self.bad = 0
+		self.dropped = 0
+
+	def _skip( self, size ):
+		""" Drop size bytes of the buffer which are not part of a frame """
+		if self._text != None:
+			self._text += self._buf[:size]
+			while True:
+				_eol = self._text.find( b'\n' )
+				if _eol < 0:
+					break
+				self.lines.append( self._text[:_eol].decode( 'utf8', 'replace' ).rstrip( '\r' ) )
+				del self._text[:_eol+1]
+		del self._buf[:size]
+
+	def feed( self, data ):
+		self._buf += data
+		_out = []
+		while True:
+			_sync = self._buf.find( FRAME_SYNC )
+			_tag = self._buf.find( SERIAL_TAG )
+			if (_tag >= 0) and ((_sync < 0) or (_tag < _sync)):
+				_eol = self._buf.find( b'\n', _tag )
+				self._skip( _tag )
+				if _eol < 0:
+					break # wait for the end of the line
+				_eol -= _tag
+				try:
+					_frame = binascii.a2b_base64( bytes(self._buf[len(SERIAL_TAG):_eol]).strip() )
+				except binascii.Error:
+					_frame = b''
+				del self._buf[:_eol+1]
+				if not self._frame( _frame, _out ):
+					self.bad += 1
+			elif _sync >= 0:
+				self._skip( _sync )
+				if len(self._buf) < FRAME_HEAD_SIZE:
+					break
+				_n = self._buf[3]
+				_size = FRAME_HEAD_SIZE + _n*RECORD_SIZE + 4
+				if len(self._buf) < _size:
+					break
+				if self._frame( bytes(self._buf[:_size]), _out ):
+					del self._buf[:_size]
+				else:
+					self.bad += 1
+					self._skip( 1 ) # false sync: search the next one
+			else:
+				# keep a possible start of sync / tag
+				_keep = 0
+				for k in range( 1, len(SERIAL_TAG) ):
+					if self._buf.endswith( SERIAL_TAG[:k] ) or self._buf.endswith( FRAME_SYNC[:k] ):
+						_keep = k
+				self._skip( len(self._buf)-_keep )
+				break
+		return _out
+
+	def _frame( self, frame, out ):
+		""" Check and decode a frame. False if corrupted """
+		if len(frame) < FRAME_HEAD_SIZE + 4:
+			return False
+		_sync, _version, _n, _dropped = struct.unpack_from( FRAME_HEAD, frame )
+		_end = FRAME_HEAD_SIZE + _n*RECORD_SIZE
+		if (_sync != FRAME_SYNC) or (_version != FRAME_VERSION) or (len(frame) != _end+4):
+			return False
+		if struct.unpack_from( '<I', frame, _end )[0] != binascii.crc32( frame[:_end] ):
+			return False
+		self.frames += 1
+		self.dropped = _dropped
+		for _sample in records( frame[FRAME_HEAD_SIZE:_end] ):
+			if self._seq != None:
+				self.lost += (_sample.seq - self._seq - 1) & 0xFFFF
+			self._seq = _sample.seq
+			self.samples += 1
+			out.append( _sample )
+		return True
+
+class CsvWriter:
+	""" CSV rows of the Samples, elapsed time computed across the ticks_ms() wraps """
+	def __init__( self, out ):
+		self.out = out
+		self._last = None
+		self.elapsed = 0
+		out.write( CSV_HEADER )
+
+	def write( self, samples ):
+		for s in samples:
+			if self._last != None:
+				self.elapsed += (s.ticks - self._last) % TICKS_PERIOD # ticks_ms() wraps
+			self._last = s.ticks
+			self.out.write( '%.3f , %.2f , %.4f , %.4f , %.4f , %i , %i , %i , %i\n' % (self.elapsed/1000, s.duty, s.temp, s.setpoint, s.estimate, s.phase, s.late_us, s.tick_us, s.seq) )
+
+def to_csv( samples, out ):
+	CsvWriter( out ).write( samples )
+
+def main():
+	parser = argparse.ArgumentParser( description='Decode lib/tlog.py telemetry to CSV' )
+	parser.add_argument( 'source', help='REPL capture (text) or raw frames (binary)' )
+	args = parser.parse_args()
+	with open( args.source, 'rb' ) as f:
+		_decoder = FrameDecoder()
+		_samples = _decoder.feed( f.read() )
+	to_csv( _samples, sys.stdout )
+	print( '%i frames, %i samples, %i lost, %i bad frames, %i dropped by the board' % (_decoder.frames, _decoder.samples, _decoder.lost, _decoder.bad, _decoder.dropped), file=sys.stderr )
+
+if __name__ == '__main__':
+	main()
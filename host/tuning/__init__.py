@@ -0,0 +1,16 @@
+""" Host-side system identification and PID gain sweep (NumPy)
+
+	logs   : load the CSV logs of test_ramp.py / test_pid.py / tlog_decode.py
+	plant  : batched plate models (3 nodes PlateModel, FOPDT) and their fit
+	sweep  : simulate thousands of (Kp, Ki, Kd, dt) on a profile, ranked table
+
+	See host/sim_sweep.py for the command line.
+"""
+import os
+import sys
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) ) # host/: thermal
+
+from .logs import load_log, load_logs
+from .plant import PlateBatch, FOPDTBatch, fit_fopdt, fit_plate
+from .sweep import Profile, simulate, sweep, grid, ranked
@@ -0,0 +1,99 @@
+""" Load the regulation / ramp logs as NumPy arrays
+
+	Every log of the project shares the first columns of examples/test_ramp.py:
+
+		elapsed (sec) , ratio (%) , temp (C) [, setpoint (C)]
+
+	(test_pid.py prints the same columns, host/tlog_decode.py adds the
+	setpoint). Lines which are not numbers (header, REPL messages, a 'None'
+	temperature) are skipped. The .ods spreadsheets of docs/test-ramp.zip
+	have the same 3 columns on their first sheet.
+
+	The fits (see plant.py) use the part of a log where the heater works
+	(see Log.driven), open loop or closed loop: the logs do not record the
+	fans, the cool-down tail is left out.
+"""
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+import numpy as np
+
+RAMP_ZIP = os.path.join( os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ), '..', 'docs', 'test-ramp.zip' )
+_NS_TABLE = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+_NS_OFFICE = '{urn:oasis:names:tc:opendocument:xmlns:office:1.0}'
+
+class Log:
+	""" elapsed (s), ratio (%), temp (C) and setpoint (C, NaN when not logged) """
+	def __init__( self, name, elapsed, ratio, temp, setpoint ):
+		self.name = name
+		self.elapsed = elapsed
+		self.ratio = ratio
+		self.temp = temp
+		self.setpoint = setpoint
+
+	def __len__( self ):
+		return len( self.elapsed )
+
+	def driven( self ):
+		""" Samples from the start until the heater stops for good (the first sample at 0%
+		    after its last active one), time from 0. Ramp: the heating until the cutoff """
+		_on = np.flatnonzero( self.ratio > 0 )
+		_end = min( _on[-1]+2, len(self) ) if len(_on) else 0
+		return Log( self.name, self.elapsed[:_end]-self.elapsed[0], self.ratio[:_end], self.temp[:_end], self.setpoint[:_end] )
+
+def read_ods( data ):
+	""" Rows of floats (elapsed, ratio, temp) of the first sheet of an .ods """
+	_root = ET.fromstring( zipfile.ZipFile( io.BytesIO(data) ).read( 'content.xml' ) )
+	rows = []
+	for _row in _root.iter( _NS_TABLE+'table-row' ):
+		_values = []
+		for _cell in _row.iter( _NS_TABLE+'table-cell' ):
+			_v = _cell.get( _NS_OFFICE+'value' )
+			if _v == None:
+				break
+			_values.append( float(_v) )
+		if len(_values) >= 3:
+			rows.append( tuple(_values[:3]) )
+	return rows
+
+def _parse( name, text ):
+	_rows = []
+	for _line in text.splitlines():
+		_cols = _line.split( ',' )
+		try:
+			_values = [ float(v) for v in _cols[:4] ]
+		except ValueError:
+			continue
+		if len(_values) < 3:
+			continue
+		if len(_values) == 3:
+			_values.append( np.nan )
+		_rows.append( _values )
+	_a = np.array( _rows, dtype=float ).reshape( -1, 4 )
+	return Log( name, _a[:,0], _a[:,1], _a[:,2], _a[:,3] )
+
+def load_log( filename, data=None ):
+	""" Load one CSV (or .ods) log """
+	if data == None:
+		with open( filename, 'rb' ) as f:
+			data = f.read()
+	_name = os.path.basename( filename )
+	if filename.endswith( '.ods' ):
+		_a = np.array( read_ods( data ), dtype=float ).reshape( -1, 3 )
+		return Log( _name, _a[:,0], _a[:,1], _a[:,2], np.full( len(_a), np.nan ) )
+	return _parse( _name, data.decode('utf8', 'replace') )
+
+def load_logs( files=None ):
+	""" Load several logs. Zip archives are expanded; default: docs/test-ramp.zip """
+	files = files or [ RAMP_ZIP ]
+	logs = []
+	for _name in files:
+		if _name.endswith( '.zip' ):
+			_zip = zipfile.ZipFile( _name )
+			for _member in sorted( _zip.namelist() ):
+				if _member.endswith( ('.ods', '.csv') ):
+					logs.append( load_log( _member, _zip.read(_member) ) )
+		else:
+			logs.append( load_log( _name ) )
+	return [ l for l in logs if len(l) >= 10 ]
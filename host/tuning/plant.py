@@ -0,0 +1,125 @@
+""" Batched plate models: n plates integrated at once on NumPy arrays
+
+	PlateBatch is host/thermal.PlateModel (element, sole, body + thermocouple
+	lag) where every parameter may be a scalar or an array of n values.
+	FOPDTBatch is the first-order-plus-dead-time model of lib/feedforward.py.
+
+	Both expose reset( temp ), step( dt, heater, fan ) with heater/fan ratios
+	(0..1, scalar or array) and `sensor`, the temperature seen by the
+	thermocouple.
+"""
+import numpy as np
+
+from thermal import PlateModel
+
+_PLATE_PARAMS = ('a', 'ge', 'gb', 'rb', 'ks', 'kr', 'kf', 'tau')
+
+class PlateBatch:
+	def __init__( self, n, ambient=24.0, **params ):
+		self.n = n
+		self.ambient = ambient
+		_defaults = PlateModel( ambient )
+		for _name in _PLATE_PARAMS:
+			setattr( self, _name, np.asarray( params.get( _name, getattr( _defaults, _name ) ), dtype=float ) )
+		self.reset()
+
+	def reset( self, temp=None ):
+		_t = np.full( self.n, self.ambient if temp is None else temp, dtype=float )
+		self.element = _t.copy()
+		self.sole = _t.copy()
+		self.body = _t.copy()
+		self.sensor = _t.copy()
+
+	@staticmethod
+	def _rad( t ):
+		return ((t+273.15)/100)**4
+
+	def step( self, dt, heater, fan=0.0 ):
+		e, s, b = self.element, self.sole, self.body
+		_es = self.ge*(e-s)
+		_sb = self.gb*(s-b)
+		d_s = _es - _sb - (self.ks+self.kf*fan)*(s-self.ambient) - self.kr*(self._rad(s)-self._rad(self.ambient))
+		self.element = e + (self.a*heater - _es)*dt
+		self.sole = s + d_s*dt
+		self.body = b + self.rb*_sb*dt
+		self.sensor = self.sensor + (s-self.sensor)*dt/self.tau
+
+class FOPDTBatch:
+	""" tau * dT/dt = K*u(t-theta) - (T - ambient), u in % """
+	def __init__( self, n, K, tau, theta, step_s, ambient=24.0 ):
+		self.n = n
+		self.K = np.asarray( K, dtype=float )
+		self.tau = np.asarray( tau, dtype=float )
+		self.ambient = ambient
+		self._delay = np.zeros( (max( 1, int(round(theta/step_s)) ), n) ) # heater history (ratio)
+		self._pos = 0
+		self.reset()
+
+	def reset( self, temp=None ):
+		self.sensor = np.full( self.n, self.ambient if temp is None else temp, dtype=float )
+		self._delay[:] = 0
+
+	def step( self, dt, heater, fan=0.0 ):
+		_u = self._delay[self._pos].copy()
+		self._delay[self._pos] = heater
+		self._pos = (self._pos+1) % len(self._delay)
+		self.sensor = self.sensor + (self.K*_u*100 - (self.sensor-self.ambient))*dt/self.tau
+
+def _first_order( t, u, taus ):
+	""" Response from 0 of 1/(1+tau*s) to the duty u held from one sample to the next
+	    (zero-order hold), for every tau: array (taus, samples) """
+	_x = np.zeros( (len(taus), len(t)) )
+	_decay = np.exp( -np.diff( t )[None,:]/taus[:,None] )
+	for k in range( len(t)-1 ):
+		_x[:,k+1] = _x[:,k]*_decay[:,k] + u[k]*(1-_decay[:,k])
+	return _x
+
+def fit_fopdt( logs, taus=None, thetas=None ):
+	""" Least squares FOPDT on the driven part of the logs (see logs.Log.driven), each
+	    simulated with its recorded duty: open-loop ramps and closed-loop runs alike.
+	    The plate is assumed at ambient temperature at the start of a log.
+	    Returns dict( K, tau, theta, rms ) """
+	taus = np.arange( 50, 2000, 10.0 ) if taus is None else np.asarray( taus, dtype=float )
+	thetas = np.arange( 0, 41, 1.0 ) if thetas is None else np.asarray( thetas, dtype=float )
+	_xy = _xx = _yy = 0
+	_n = 0
+	for _log in logs:
+		_run = _log.driven()
+		_x0 = _first_order( _run.elapsed, _run.ratio, taus )
+		_dy = _run.temp - _run.temp[0]
+		# dead time: the response to the delayed duty is the response delayed
+		_x = np.array( [ [ np.interp( _run.elapsed-_theta, _run.elapsed, _x0[i], left=0 ) for _theta in thetas ] for i in range( len(taus) ) ])
+		_xy = _xy + (_x*_dy).sum( axis=2 )
+		_xx = _xx + (_x*_x).sum( axis=2 )
+		_yy = _yy + (_dy*_dy).sum()
+		_n += len(_run)
+	# (taus, thetas): T - T0 = K*x is linear in K
+	_k = _xy / _xx
+	_sse = _yy - 2*_k*_xy + _k*_k*_xx
+	i, j = np.unravel_index( np.argmin(_sse), _sse.shape )
+	return { 'K':_k[i,j], 'tau':taus[i], 'theta':thetas[j], 'rms':(max( _sse[i,j], 0 )/_n)**0.5 }
+
+def fit_plate( logs, a=None, tau=None, step_s=0.25 ):
+	""" Grid fit of the element heating rate `a` and thermocouple lag `tau` of
+	    PlateModel on the driven part of the logs, simulated with their recorded
+	    duty: every (a, tau) pair is one plate of the batch. Returns dict( a, tau, rms ) """
+	a = np.linspace( 8, 20, 25 ) if a is None else np.asarray( a, dtype=float )
+	tau = np.linspace( 0.5, 10, 20 ) if tau is None else np.asarray( tau, dtype=float )
+	_a, _tau = [ g.ravel() for g in np.meshgrid( a, tau, indexing='ij' ) ]
+	_sse = np.zeros( len(_a) )
+	_n = 0
+	for _log in logs:
+		_run = _log.driven()
+		_plate = PlateBatch( len(_a), ambient=_run.temp[0], a=_a, tau=_tau )
+		_steps = int( round( _run.elapsed[-1]/step_s ) ) + 1
+		_at = np.round( _run.elapsed/step_s ).astype( int )
+		# duty of the last sample at or before each step
+		_duty = _run.ratio[ np.maximum( np.searchsorted( _run.elapsed, np.arange( _steps )*step_s, side='right' )-1, 0 ) ]/100
+		_sim = np.empty( (_steps, len(_a)) )
+		for i in range( _steps ):
+			_sim[i] = _plate.sensor
+			_plate.step( step_s, _duty[i] )
+		_sse += ((_sim[_at] - _run.temp[:,None])**2).sum( axis=0 )
+		_n += len(_run)
+	i = int( np.argmin(_sse) )
+	return { 'a':_a[i], 'tau':_tau[i], 'rms':(_sse[i]/_n)**0.5 }
@@ -0,0 +1,205 @@
+""" Batched closed-loop simulation of the reflow regulation and gain sweep
+
+	simulate() runs n regulations at once, one per row of `gains`
+	(Kp, Ki, Kd, dt_ms): the NumPy arrays hold one value per gain set.
+	The loop reproduces the firmware:
+
+	  * TempSampler: thermocouple read every SAMPLE_MS, quantized to 0.25 C
+	  * PID.control (float mode, lib/pid.py) every dt ms, setpoint of the
+	    Trajectory looking lead_ms ahead (main.PROFILE_LEAD_MS)
+	  * LowFreqPWM: duty latched at the start of each 1.5 sec period, pulses
+	    shorter than ton_ms skipped
+	  * after the profile: heater off and fans on (App.cooling) for tail_s
+
+	Metrics (one per gain set):
+	  overshoot : max temperature - peak of the profile (C)
+	  settle    : sec after reaching the peak phase until the temperature
+	              stays within +/-band of the profile (inf: never)
+	  tal_error : time above liquidus - the one of the ideal profile (sec)
+	  rms       : tracking error against the ideal profile (C)
+	  score     : overshoot + |tal_error|/5 + settle/30 + rms (lower is better)
+
+	sweep() splits the gain grid into chunks simulated by a process pool.
+"""
+import ast
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+
+from .plant import PlateBatch, FOPDTBatch
+
+STEP_MS = 250 # integration step = sampler period (dt and the PWM period are multiples)
+SAMPLE_MS = 250
+PWM_MS = 1500
+TON_MS = 9
+MAIN_PY = os.path.join( os.path.dirname( os.path.abspath(__file__) ), '..', '..', 'main.py' )
+PROFILE_DIR = os.path.join( os.path.dirname( os.path.abspath(__file__) ), '..', '..', 'profiles' )
+COLUMNS = ('overshoot', 'settle', 'tal_error', 'rms', 'score')
+
+class Profile:
+	""" Profile phases (temp, sec[, period ms]) as breakpoints, like lib/trajectory.Trajectory """
+	def __init__( self, name, phases, start_temp=24.0, liquidus=227.0, lead_ms=8000 ):
+		# The descending end of a profile is its cool-down ramp (fans, lib/cooldown.py): the tail_s cooling replaces it
+		while (len(phases) > 1) and (phases[-1][0] < phases[-2][0]):
+			phases = phases[:-1]
+		self.name = name
+		self.phases = phases
+		self.start_temp = start_temp
+		self.liquidus = liquidus
+		self.lead_ms = lead_ms
+		self.t = np.concatenate( ([0.0], np.cumsum( [ p[1] for p in phases ] )) ) # sec
+		self.temp = np.array( [start_temp] + [ p[0] for p in phases ], dtype=float )
+		self.peak = self.temp.max()
+		self.peak_t = self.t[ int( np.argmax( self.temp ) ) ] # sec: start of the peak hold
+
+	@property
+	def duration( self ):
+		return self.t[-1]
+
+	def at( self, sec ):
+		return np.interp( sec, self.t, self.temp )
+
+	def time_above_liquidus( self, step_s=STEP_MS/1000 ):
+		return (self.at( np.arange( 0, self.duration, step_s ) ) > self.liquidus).sum()*step_s
+
+def main_profiles( filename=MAIN_PY ):
+	""" {'sncu': [(150,90), ...]} from the PROFILE_xxx constants of main.py (not imported: MicroPython code) """
+	with open( filename ) as f:
+		_tree = ast.parse( f.read() )
+	profiles = {}
+	for _node in _tree.body:
+		if isinstance( _node, ast.Assign ) and isinstance( _node.value, ast.List ):
+			for _target in _node.targets:
+				if isinstance( _target, ast.Name ) and _target.id.startswith( 'PROFILE_' ):
+					profiles[ _target.id[8:].lower() ] = ast.literal_eval( _node.value )
+	return profiles
+
+def library_profiles( path=PROFILE_DIR ):
+	""" {'sac305': ([(150,60), ...], liquidus or None)} from the profile library copied on the flash (profiles/index.json) """
+	try:
+		with open( os.path.join( path, 'index.json' ) ) as f:
+			_index = json.load( f )
+	except FileNotFoundError:
+		return {}
+	profiles = {}
+	for _entry in _index:
+		with open( os.path.join( path, _entry[1] ) ) as f:
+			profiles[ _entry[0].lower() ] = ([ tuple( _phase ) for _phase in json.load( f ) ], _entry[2] if len( _entry ) > 2 else None)
+	return profiles
+
+def all_profiles( filename=MAIN_PY, path=PROFILE_DIR ):
+	""" {name: (phases, liquidus or None)}: the PROFILE_xxx of main.py, replaced by the library ones of the same name """
+	profiles = { _name: (_phases, None) for _name, _phases in main_profiles( filename ).items() }
+	profiles.update( library_profiles( path ) )
+	return profiles
+
+def make_plant( plant, n, ambient ):
+	""" plant is ('plate', {PlateModel params}) or ('fopdt', {K, tau, theta}) """
+	_kind, _params = plant
+	if _kind == 'plate':
+		return PlateBatch( n, ambient=ambient, **_params )
+	if _kind == 'fopdt':
+		return FOPDTBatch( n, _params['K'], _params['tau'], _params['theta'], STEP_MS/1000, ambient=ambient )
+	raise ValueError( 'unknown plant %s' % _kind )
+
+def grid( kp, ki, kd, dt=(1000,) ):
+	""" Every combination of the values as a (n, 4) array: Kp, Ki, Kd, dt_ms """
+	_g = np.meshgrid( np.asarray(kp, float), np.asarray(ki, float), np.asarray(kd, float), np.asarray(dt, float), indexing='ij' )
+	_gains = np.stack( [ g.ravel() for g in _g ], axis=1 )
+	if np.any( _gains[:,3] % STEP_MS ):
+		raise ValueError( 'dt must be a multiple of %i ms' % STEP_MS )
+	return _gains
+
+def simulate( gains, profile, plant=('plate', {}), tail_s=120, band=2.0 ):
+	""" Simulate every gain set of `gains` (n, 4) on the profile. Returns {metric: array(n)} """
+	gains = np.atleast_2d( gains )
+	n = len( gains )
+	kp, ki, kd, dt_ms = gains.T
+	dt_s = dt_ms/1000
+	ki_dt = ki*dt_s
+	kd_dt = kd/dt_s
+	tick_every = (dt_ms // STEP_MS).astype( int )
+	step_s = STEP_MS/1000
+
+	_plate = make_plant( plant, n, profile.start_temp )
+	measure = np.floor( _plate.sensor*4 )/4
+	error = 0 - measure # the PID idles at setpoint 0 before follow()
+	i_term = np.zeros( n )
+	duty = np.zeros( n )
+	on_ms = np.zeros( n )
+
+	_max = measure.copy()
+	_sq = np.zeros( n )
+	_count = 0
+	_tal = np.zeros( n )
+	_last_out = np.full( n, -1.0 ) # last time out of the band after the peak
+
+	_profile_steps = int( profile.duration*1000 ) // STEP_MS
+	for k in range( _profile_steps + int( tail_s*1000 ) // STEP_MS ):
+		t_ms = k*STEP_MS
+		_in_profile = k < _profile_steps
+		if t_ms % SAMPLE_MS == 0:
+			measure = np.floor( _plate.sensor*4 )/4
+		if _in_profile and (k > 0):
+			_tick = (k % tick_every) == 0
+			if _tick.any():
+				_sp = profile.at( (t_ms+profile.lead_ms)/1000 )
+				_e = _sp - measure
+				_p = kp*_e
+				_i = np.where( (_p > 100) | (_p < 0), 0, np.clip( i_term + ki_dt*_e, 0, 100 ) )
+				_out = np.clip( _p + _i + kd_dt*(_e - error), 0, 100 )
+				i_term = np.where( _tick, _i, i_term )
+				error = np.where( _tick, _e, error )
+				duty = np.where( _tick, np.floor(_out), duty )
+		elif not _in_profile:
+			duty[:] = 0 # App: temperature = 1 then cooling()
+		if t_ms % PWM_MS == 0:
+			on_ms = PWM_MS*duty//100
+			on_ms[on_ms < TON_MS] = 0
+		_phase = t_ms % PWM_MS
+		_heater = np.where( duty > 0, np.clip( (on_ms-_phase)/STEP_MS, 0, 1 ), 0 )
+		_plate.step( step_s, _heater, 0.0 if _in_profile else 1.0 )
+
+		# metrics on the measured temperature
+		np.maximum( _max, measure, out=_max )
+		_tal += (measure > profile.liquidus)*step_s
+		if _in_profile:
+			_err = measure - profile.at( t_ms/1000 )
+			_sq += _err*_err
+			_count += 1
+			if t_ms >= profile.peak_t*1000:
+				_last_out = np.where( np.abs(_err) > band, t_ms/1000, _last_out )
+
+	settle = np.where( _last_out < 0, 0.0, _last_out + step_s - profile.peak_t )
+	settle[ _last_out >= profile.duration - step_s ] = np.inf
+	result = {
+		'overshoot': _max - profile.peak,
+		'settle': settle,
+		'tal_error': _tal - profile.time_above_liquidus(),
+		'rms': np.sqrt( _sq/_count ) }
+	result['score'] = np.maximum( result['overshoot'], 0 ) + np.abs( result['tal_error'] )/5 + settle/30 + result['rms']
+	return result
+
+def sweep( gains, profile, plant=('plate', {}), workers=None, chunk=256, **kw ):
+	""" simulate() the gains by chunks over a process pool. Returns {metric: array(n)} """
+	_chunks = [ gains[i:i+chunk] for i in range( 0, len(gains), chunk ) ]
+	_run = partial( simulate, profile=profile, plant=plant, **kw )
+	if workers == 1:
+		_results = list( map( _run, _chunks ) )
+	else:
+		with ProcessPoolExecutor( max_workers=workers ) as pool:
+			_results = list( pool.map( _run, _chunks ) )
+	return { c: np.concatenate( [ r[c] for r in _results ] ) for c in COLUMNS }
+
+def ranked( gains, result, sort='score', top=20 ):
+	""" Table (str) of the `top` gain sets sorted by a metric (absolute value for tal_error) """
+	_key = np.abs( result[sort] ) if sort == 'tal_error' else result[sort]
+	_order = np.argsort( _key, kind='stable' )[:top]
+	lines = [ '%4s %7s %8s %7s %6s  %9s %8s %9s %6s %7s' % ('rank', 'Kp', 'Ki', 'Kd', 'dt', 'overshoot', 'settle', 'tal_error', 'rms', 'score') ]
+	for _rank, i in enumerate( _order ):
+		kp, ki, kd, dt = gains[i]
+		lines.append( '%4i %7.3f %8.5f %7.2f %6i  %9.2f %8.1f %9.1f %6.2f %7.2f' % (_rank+1, kp, ki, kd, dt,
+			result['overshoot'][i], result['settle'][i], result['tal_error'][i], result['rms'][i], result['score'][i]) )
+	return '\n'.join( lines )
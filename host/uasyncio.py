@@ -0,0 +1,292 @@
+""" Host stand-in for MicroPython uasyncio, scheduled on the virtual clock
+
+	Subset used by Plancha-CMS: run, create_task, sleep, sleep_ms, gather,
+	wait_for, wait_for_ms, Event, ThreadSafeFlag, Lock, Task.cancel and
+	StreamReader.readline.
+	When every task sleeps, the virtual clock jumps to the next wake up (firing
+	the Timer callbacks in between) like the Pico would idle in WFE.
+"""
+import heapq
+import errno
+import os
+from collections import deque
+
+import hostsim
+
+class CancelledError( BaseException ):
+	pass
+
+class TimeoutError( Exception ):
+	pass
+
+class _Sleep:
+	__slots__ = ('us',)
+	def __init__( self, us ):
+		self.us = us
+	def __await__( self ):
+		yield self
+
+class _Park:
+	""" Park the current task in a wait queue until someone reschedules it """
+	__slots__ = ('queue',)
+	def __init__( self, queue ):
+		self.queue = queue
+	def __await__( self ):
+		yield self
+
+class _Loop:
+	def __init__( self ):
+		self.ready = deque() # (task, exception to throw or None)
+		self.sleeping = [] # heap of (wake_us, seq, task)
+		self.seq = 0
+		self.current = None
+
+	def schedule( self, task, exc=None ):
+		task.parked = None
+		self.ready.append( (task, exc) )
+
+	def step( self, task, exc ):
+		self.current = task
+		try:
+			if exc != None:
+				_yield = task.coro.throw( exc )
+			else:
+				_yield = task.coro.send( None )
+		except StopIteration as e:
+			task._finish( e.value, None )
+		except hostsim.HostReset:
+			raise
+		except BaseException as e:
+			task._finish( None, e )
+		else:
+			if isinstance( _yield, _Sleep ):
+				self.seq += 1
+				task.wake_seq = self.seq
+				heapq.heappush( self.sleeping, (hostsim.board.clock.us + _yield.us, self.seq, task) )
+			elif isinstance( _yield, _Park ):
+				task.parked = _yield.queue
+				_yield.queue.append( task )
+			else:
+				self.schedule( task )
+		finally:
+			self.current = None
+
+	def run_until( self, main ):
+		while not main.done:
+			if self.ready:
+				task, exc = self.ready.popleft()
+				if not task.done:
+					self.step( task, exc )
+				continue
+			# drop cancelled/stale sleepers
+			while self.sleeping and (self.sleeping[0][2].done or self.sleeping[0][2].wake_seq != self.sleeping[0][1]):
+				heapq.heappop( self.sleeping )
+			if not self.sleeping:
+				raise RuntimeError( 'deadlock: no task can run' )
+			_wake, _seq, task = heapq.heappop( self.sleeping )
+			_now = hostsim.board.clock.us
+			if _wake > _now:
+				hostsim.board.clock.advance_us( _wake-_now )
+			task.wake_seq = None
+			self.schedule( task )
+
+_loop = _Loop()
+
+class Task:
+	def __init__( self, coro ):
+		self.coro = coro
+		self.done = False
+		self.result = None
+		self.exception = None
+		self.waiters = []
+		self.parked = None
+		self.wake_seq = None
+
+	def _finish( self, result, exc ):
+		self.done = True
+		self.result = result
+		self.exception = exc
+		if (exc != None) and not self.waiters and not isinstance( exc, CancelledError ):
+			print( 'Task exception wasn\'t retrieved: %r' % exc )
+		for t in self.waiters:
+			_loop.schedule( t )
+		self.waiters = []
+
+	def cancel( self ):
+		if self.done:
+			return False
+		if self.parked != None:
+			self.parked.remove( self )
+			self.parked = None
+		self.wake_seq = None
+		_loop.schedule( self, CancelledError() )
+		return True
+
+	def __await__( self ):
+		if not self.done:
+			yield _Park( self.waiters )
+		if self.exception != None:
+			raise self.exception
+		return self.result
+
+def create_task( coro ):
+	t = Task( coro )
+	_loop.schedule( t )
+	return t
+
+def current_task():
+	return _loop.current
+
+def sleep_ms( ms ):
+	return _Sleep( int(ms*1000) )
+
+def sleep( sec ):
+	return _Sleep( int(sec*1000000) )
+
+async def wait_for_ms( aw, timeout ):
+	_task = aw if isinstance( aw, Task ) else create_task( aw )
+	_expired = [False]
+	async def _timer():
+		await sleep_ms( timeout )
+		if not _task.done:
+			_expired[0] = True
+			_task.cancel()
+	_t = create_task( _timer() )
+	try:
+		return await _task
+	except CancelledError:
+		if _expired[0]:
+			raise TimeoutError()
+		raise
+	finally:
+		_t.cancel()
+
+async def wait_for( aw, timeout ):
+	return await wait_for_ms( aw, int(timeout*1000) )
+
+async def gather( *aws, return_exceptions=False ):
+	_tasks = [ aw if isinstance(aw, Task) else create_task(aw) for aw in aws ]
+	_results = []
+	for t in _tasks:
+		try:
+			_results.append( await t )
+		except Exception as e:
+			if not return_exceptions:
+				raise
+			_results.append( e )
+	return _results
+
+class Event:
+	def __init__( self ):
+		self.state = False
+		self.waiting = []
+
+	def is_set( self ):
+		return self.state
+
+	def set( self ):
+		self.state = True
+		for t in self.waiting:
+			_loop.schedule( t )
+		self.waiting = []
+
+	def clear( self ):
+		self.state = False
+
+	async def wait( self ):
+		if not self.state:
+			await _Park( self.waiting )
+		return True
+
+class ThreadSafeFlag( Event ):
+	""" Can be set from a Timer/IRQ. wait() clears the flag """
+	async def wait( self ):
+		await super().wait()
+		self.state = False
+
+class Lock:
+	def __init__( self ):
+		self.state = False
+		self.waiting = []
+
+	def locked( self ):
+		return self.state
+
+	async def acquire( self ):
+		while self.state:
+			await _Park( self.waiting )
+		self.state = True
+		return True
+
+	def release( self ):
+		self.state = False
+		if self.waiting:
+			_loop.schedule( self.waiting.pop(0) )
+
+	async def __aenter__( self ):
+		return await self.acquire()
+
+	async def __aexit__( self, *args ):
+		self.release()
+
+class StreamReader:
+	""" Reads a file descriptor (sys.stdin, a pty) without blocking the loop: polled every POLL_MS of virtual time """
+	POLL_MS = 20
+
+	def __init__( self, stream ):
+		self.fd = stream.fileno()
+		os.set_blocking( self.fd, False )
+		self._buf = b''
+
+	def _read( self ):
+		try:
+			return os.read( self.fd, 4096 )
+		except BlockingIOError:
+			return None
+		except OSError as e:
+			if e.errno != errno.EIO:
+				raise
+			return b'' # pty closed
+
+	async def readline( self ):
+		""" A line with its newline (the rest of the stream at its end, b'' then) """
+		while b'\n' not in self._buf:
+			_data = self._read()
+			if _data == b'':
+				_line, self._buf = self._buf, b''
+				return _line
+			if _data:
+				self._buf += _data
+			else:
+				await sleep_ms( self.POLL_MS )
+		_line, _sep, self._buf = self._buf.partition( b'\n' )
+		return _line + _sep
+
+def run( coro ):
+	global _loop
+	_loop = _Loop()
+	_main = create_task( coro )
+	_loop.run_until( _main )
+	if _main.exception != None:
+		raise _main.exception
+	return _main.result
+
+def new_event_loop():
+	global _loop
+	_loop = _Loop()
+	return get_event_loop()
+
+class _LoopFacade:
+	def create_task( self, coro ):
+		return create_task( coro )
+	def run_until_complete( self, aw ):
+		_t = aw if isinstance( aw, Task ) else create_task( aw )
+		_loop.run_until( _t )
+		if _t.exception != None:
+			raise _t.exception
+		return _t.result
+	def run_forever( self ):
+		_loop.run_until( Task(None) )
+
+def get_event_loop():
+	return _LoopFacade()
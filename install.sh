@@ -3,7 +3,7 @@
 # Install the files on a pico
 if [ -z "$1" ]
   then
-    echo "/dev/ttyACMx parameter missing!"
+    echo "/dev/ttyACMx parameter missing! (install.sh /dev/ttyACMx [--mpy])"
                 exit 0
 fi
 
@@ -23,12 +23,40 @@ mpremote connect $1 mip install github:mchobby/esp8266-upy/max31855
 
 
 # --- Local library ---
-mpremote connect $1 fs cp lib/*.py :lib/
+# --mpy: lib/*.py and main.py precompiled by mpy-cross (nothing left to compile at boot).
+# mpy-cross must emit the .mpy version of the firmware: pip install mpy-cross==<MicroPython version>
+MAIN=main.py
+if [ "$2" = "--mpy" ]
+  then
+    MPY_CROSS=${MPY_CROSS:-mpy-cross}
+    rm -rf build
+    mkdir -p build/lib
+    for f in lib/*.py
+    do
+      $MPY_CROSS -march=armv6m -o build/lib/`basename $f .py`.mpy $f || exit 1
+    done
+    # the application becomes lib/plancha_app.mpy, main.py only starts it
+    $MPY_CROSS -march=armv6m -o build/lib/plancha_app.mpy main.py || exit 1
+    printf 'import plancha_app\nplancha_app.start()\n' > build/main.py
+    MAIN=build/main.py
+    # a .py left on the board is imported instead of the .mpy of the same name
+    for f in lib/*.py
+    do
+      mpremote connect $1 fs rm :lib/`basename $f` 2>/dev/null
+    done
+    mpremote connect $1 fs cp build/lib/*.mpy :lib/
+  else
+    mpremote connect $1 fs cp lib/*.py :lib/
+fi
+
+# --- Profile library (lib/profiles.py) ---
+mpremote connect $1 fs mkdir profiles
+mpremote connect $1 fs cp profiles/*.json :profiles/
 
 
 #mpremote connect $1 fs cp main.py :
 mpremote connect $1 fs cp boot.py :
-mpremote connect $1 fs cp main.py :
+mpremote connect $1 fs cp $MAIN :main.py
 
 # Set the MCU datetime
 mpremote connect $1 rtc --set
@@ -0,0 +1,85 @@
+""" PID autotune by relay feedback (Astrom-Hagglund), the gains are stored by gains.py
+
+	The heater is driven like a thermostat around the setpoint: `high` duty
+	below setpoint-hysteresis, `low` duty above setpoint+hysteresis. The plate
+	then oscillates; from the amplitude `a` and period Pu of the oscillation:
+
+		Ku = 4*d / (pi * sqrt(a^2 - hysteresis^2))     with d = (high-low)/2
+
+	The gains are computed with the Tyreus-Luyben rule (less overshoot than
+	Ziegler-Nichols, which suits a reflow plate):
+
+		Kp = Ku/2.2    Ti = 2.2*Pu    Td = Pu/6.3    (Ki = Kp/Ti, Kd = Kp*Td)
+"""
+from math import pi, sqrt
+import uasyncio as asyncio
+import time
+
+class TuneError( Exception ):
+	""" Relay test not completed, the message is 'aborted' or 'timeout' """
+	pass
+
+class RelayTuner:
+	def __init__( self, setpoint=150, high=40, low=0, hysteresis=1.0, cycles=4, skip=1, period_ms=250, timeout_s=1800 ):
+		self.setpoint = setpoint
+		self.high = high
+		self.low = low
+		self.hysteresis = hysteresis
+		self.cycles = cycles # cycles measured
+		self.skip = skip # first cycles ignored (initial heating)
+		self.period_ms = period_ms
+		self.timeout_s = timeout_s
+		self.result = None
+
+	def gains( self, amplitude, period_s ):
+		""" Tyreus-Luyben gains from the oscillation amplitude (C) and period (s) """
+		_a = sqrt( max( amplitude*amplitude - self.hysteresis*self.hysteresis, 0.01 ) )
+		ku = 4*((self.high-self.low)/2) / (pi*_a)
+		kp = ku/2.2
+		ti = 2.2*period_s
+		td = period_s/6.3
+		return { 'Kp':kp, 'Ki':kp/ti, 'Kd':kp*td, 'Ku':ku, 'Pu':period_s, 'amplitude':amplitude, 'setpoint':self.setpoint }
+
+	async def run( self, read_temp, set_duty, progress_cb=None, abort_func=None ):
+		""" Run the relay test. read_temp() returns the temperature, set_duty(%) drives the heater.
+		    abort_func() returning True stops the test (checked every period_ms).
+		    Returns the gains dict (see gains()). Raises TuneError when aborted or on timeout. """
+		_start = time.ticks_ms()
+		heating = True
+		set_duty( self.high )
+		_ups = [] # ticks_ms of the switches to low (temperature rising through setpoint)
+		_peaks = []
+		_troughs = []
+		_max = -1000
+		_min = 1000
+		try:
+			while len(_ups) < self.skip+self.cycles+1:
+				if (abort_func != None) and abort_func():
+					raise TuneError( 'aborted' )
+				if time.ticks_diff( time.ticks_ms(), _start ) > self.timeout_s*1000:
+					raise TuneError( 'timeout' )
+				_t = read_temp()
+				_max = max( _max, _t )
+				_min = min( _min, _t )
+				if heating and (_t > self.setpoint+self.hysteresis):
+					heating = False
+					set_duty( self.low )
+					_ups.append( time.ticks_ms() )
+					if len(_ups) > self.skip+1:
+						_troughs.append( _min )
+					_max = _t
+					if progress_cb != None:
+						progress_cb( 'Tune cycle %i/%i' % (len(_ups)-1, self.skip+self.cycles) )
+				elif (not heating) and (_t < self.setpoint-self.hysteresis):
+					heating = True
+					set_duty( self.high )
+					if len(_ups) > self.skip:
+						_peaks.append( _max )
+					_min = _t
+				await asyncio.sleep_ms( self.period_ms )
+		finally:
+			set_duty( 0 )
+		_periods = [ time.ticks_diff( _ups[i], _ups[i-1] ) for i in range( self.skip+1, len(_ups) ) ]
+		_amplitude = (sum(_peaks)/len(_peaks) - sum(_troughs)/len(_troughs)) / 2
+		self.result = self.gains( _amplitude, sum(_periods)/len(_periods)/1000 )
+		return self.result
@@ -0,0 +1,77 @@
+""" Closed-loop cool-down: the fans follow the cool-down ramp of a profile
+
+	The ramp is the descending end of the profile (see trajectory.py), its
+	slope is the maximum cooling rate allowed for the components. CoolDown
+	runs a PI on (temperature - ramp) from its own Timer and modulates the
+	fans on/off (any driver with duty_ratio(), eg: ssr.SigmaDelta on the
+	cooling pin). The fans only cool: when the plate cools faster than the
+	ramp their output falls to 0 and the heater PID, following the same
+	trajectory, puts heat back.
+
+	The cooling power of the fans drops with the temperature of the plate.
+	Once the fans stay at 100% while the plate is above the ramp for
+	handover_ms, the plate can no longer cool faster than the maximum rate:
+	the ramp is abandoned (free = True) and the fans are left full on
+	(free cooling), which is the shortest cool-down the profile allows.
+"""
+from machine import Timer
+
+class CoolDown:
+	def __init__( self, fan, measure_func, Kp=10, Ki=0.2, dt=1000, handover_ms=10000 ):
+		self.fan = fan
+		self.measure_func = measure_func
+		self.Kp = Kp
+		self.Ki = Ki
+		self.period_ms = dt
+		self._ki_dt = Ki * dt / 1000
+		self.handover_ms = handover_ms
+		self.trajectory = None
+		self.setpoint = 0
+		self.i_term = 0
+		self.output = 0
+		self.free = False # ramp abandoned, fans full on
+		self._saturated_ms = 0
+		self.timer = Timer(-1)
+		self.timer.init( mode=Timer.PERIODIC, period=dt, callback=self.control )
+
+	def follow( self, trajectory ):
+		""" Follow the (started) trajectory from now """
+		self.i_term = 0
+		self.free = False
+		self._saturated_ms = 0
+		self.setpoint = trajectory.at( trajectory.elapsed_ms() )
+		self.trajectory = trajectory
+
+	def release( self ):
+		""" Abandon the ramp: fans full on """
+		self.trajectory = None
+		self.free = True
+		self.output = 100
+		self.fan.duty_ratio( 100 )
+
+	def deinit( self ):
+		self.trajectory = None
+		self.timer.deinit()
+		self.fan.deinit()
+
+	def control( self, timer ):
+		if self.trajectory == None:
+			return
+		self.setpoint = self.trajectory.at( self.trajectory.elapsed_ms() )
+		error = self.measure_func() - self.setpoint # > 0: too hot, more fan
+		proportional = self.Kp * error
+		# Prevent integral windup (and no fan when cooling too fast)
+		if (proportional > 100) or (proportional < 0):
+			self.i_term = 0
+		else:
+			self.i_term = max( 0, min( 100, self.i_term + self._ki_dt * error ) )
+		output = max( 0, min( 100, proportional + self.i_term ) )
+		if (output >= 100) and (error > 0):
+			self._saturated_ms += self.period_ms
+		else:
+			self._saturated_ms = 0
+		if self._saturated_ms >= self.handover_ms:
+			self.release()
+			return
+		self.output = output
+		self.fan.duty_ratio( output )
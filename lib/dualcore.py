@@ -0,0 +1,178 @@
+""" Control loop on the second core of the RP2040 (_thread)
+
+	ControlCore runs on core 1: thermocouple sampling (TempSampler), the
+	critical temperature check (sampler.on_sample), the PID control law and
+	the heater PWM. Core 0 keeps uasyncio, the LCD / encoder I2C traffic and
+	the telemetry, so a slow LCD write no longer delays a control tick.
+
+	The cores share:
+	  * a state block (array 'f', see ST_xxx) written by core 1 after each
+	    sample and each tick. No lock on the reading side: core 0 reads it
+	    from its Timer callbacks too (Plancha.temperature, .duty), which
+	    would deadlock on a lock held by the main code of core 0. read()
+	    returns a single float (one 32 bit load), snapshot() retries while
+	    the sequence counter shows a write in progress.
+	  * a mailbox of commands (function, args) posted by core 0 with post()
+	    and executed by core 1 between two ticks: core 0 never touches the
+	    PID while core 1 is computing it.
+	  * the failure of the loop: an exception on core 1 turns the heater off,
+	    keeps the exception in fault and sets ST_FAULT. Core 0 checks it
+	    with failed() (see Plancha), post() raises.
+
+	The PWM is done by the loop itself (duty latched at the start of each
+	period, pulses shorter than ton_ms skipped), the soft Timers of core 0
+	are not used anymore by the PID, the sampler and the PWM.
+"""
+import _thread
+from array import array
+import time
+
+ST_TEMP = 0 # last thermocouple sample (C)
+ST_SETPOINT = 1 # PID setpoint (C)
+ST_DUTY = 2 # heater duty (%)
+ST_TICKS = 3 # PID ticks done
+ST_LATE_MAX = 4 # max lateness of a PID tick (us)
+ST_FAULT = 5 # 1 once the loop ended on an exception (see fault)
+ST_SIZE = 6
+
+MAILBOX_SIZE = 8
+
+class ControlCore:
+	def __init__( self, sampler, pid, heater, pwm_period_ms=1500, ton_ms=9, toff_ms=10 ):
+		self.sampler = sampler
+		self.pid = pid
+		self.heater = heater
+		self.pwm_period_us = pwm_period_ms*1000
+		self.ton_us = ton_ms*1000
+		self.toff_us = toff_ms*1000
+		self.ratio = 0 # heater duty (%), latched at the start of each PWM period
+		self.lock = _thread.allocate_lock() # mailbox only
+		self.state = array( 'f', [0]*ST_SIZE )
+		self.seq = 0 # odd while core 1 writes the state block
+		self.fault = None # exception that ended the loop
+		self._mail = [None]*MAILBOX_SIZE
+		self._posted = 0 # written by core 0
+		self._done = 0 # written by core 1
+		self.running = False
+
+	# --- core 0 side ---
+	def start( self ):
+		self.sampler.detach()
+		self.pid.detach()
+		self.running = True
+		_thread.start_new_thread( self._run, () )
+
+	def stop( self ):
+		""" Ends the loop (heater off) at its next wake up """
+		self.running = False
+
+	def post( self, func, *args ):
+		""" Ask core 1 to call func(*args) before its next tick. Waits while the mailbox is full """
+		while self._posted - self._done >= MAILBOX_SIZE:
+			if self.failed():
+				raise Exception( "core 1 stopped: %r" % (self.fault,) )
+			time.sleep_ms( 1 )
+		with self.lock:
+			self._mail[self._posted % MAILBOX_SIZE] = (func, args)
+			self._posted += 1
+
+	def read( self, index ):
+		""" One value of the state block, lock free (safe in a Timer callback) """
+		return self.state[index]
+
+	def snapshot( self, buf ):
+		""" Copy the state block into buf (array 'f' of ST_SIZE), consistent: copied
+		    again when core 1 wrote it meanwhile """
+		while True:
+			_seq = self.seq
+			if _seq & 1:
+				continue
+			for i in range( ST_SIZE ):
+				buf[i] = self.state[i]
+			if self.seq == _seq:
+				return buf
+
+	def failed( self ):
+		""" True once the loop of core 1 ended on an exception (heater off) """
+		return self.state[ST_FAULT] != 0
+
+	def duty_ratio( self, ratio ):
+		""" LowFreqPWM API: ratio from 0 to 100% (applied at the next PWM period, 0 at once) """
+		self.ratio = max( 0, min( 100, int(ratio) ) )
+		if self.ratio == 0:
+			self.heater.off()
+
+	def deinit( self ):
+		self.stop()
+
+	# --- core 1 side ---
+	def _mailbox( self ):
+		while self._done != self._posted:
+			with self.lock:
+				_func, _args = self._mail[self._done % MAILBOX_SIZE]
+				self._mail[self._done % MAILBOX_SIZE] = None
+			_func( *_args )
+			self._done += 1
+
+	def _run( self ):
+		_now = time.ticks_us()
+		_next_sample = _now
+		_next_pid = time.ticks_add( _now, self.pid.period_ms*1000 )
+		_next_pwm = _now
+		_pwm_off = None
+		_late_max = 0
+		_ticks = 0
+		try:
+			while self.running:
+				self._mailbox()
+				_now = time.ticks_us()
+				# heater PWM
+				if (_pwm_off != None) and (time.ticks_diff( _now, _pwm_off ) >= 0):
+					self.heater.off()
+					_pwm_off = None
+				if time.ticks_diff( _now, _next_pwm ) >= 0:
+					_on_us = self.pwm_period_us*self.ratio//100
+					if _on_us < self.ton_us:
+						self.heater.off()
+					else:
+						self.heater.on()
+						if _on_us < self.pwm_period_us - self.toff_us:
+							_pwm_off = time.ticks_add( _next_pwm, _on_us )
+					_next_pwm = time.ticks_add( _next_pwm, self.pwm_period_us )
+				# thermocouple (+ critical temperature check)
+				if time.ticks_diff( _now, _next_sample ) >= 0:
+					self.sampler.sample()
+					self.seq += 1
+					self.state[ST_TEMP] = self.sampler.value
+					self.seq += 1
+					_next_sample = time.ticks_add( _next_sample, self.sampler.period_ms*1000 )
+				# control law
+				_late = time.ticks_diff( _now, _next_pid )
+				if _late >= 0:
+					self.pid.control( None )
+					_ticks += 1
+					if _late > _late_max:
+						_late_max = _late
+					self.seq += 1
+					self.state[ST_SETPOINT] = self.pid.setpoint
+					self.state[ST_DUTY] = self.ratio
+					self.state[ST_TICKS] = _ticks
+					self.state[ST_LATE_MAX] = _late_max
+					self.seq += 1
+					_next_pid = time.ticks_add( _next_pid, self.pid.period_ms*1000 )
+				# sleep until the next deadline
+				_next = _next_pid
+				if time.ticks_diff( _next_sample, _next ) < 0:
+					_next = _next_sample
+				if time.ticks_diff( _next_pwm, _next ) < 0:
+					_next = _next_pwm
+				if (_pwm_off != None) and (time.ticks_diff( _pwm_off, _next ) < 0):
+					_next = _pwm_off
+				_wait = time.ticks_diff( _next, time.ticks_us() )
+				if _wait > 0:
+					time.sleep_us( _wait )
+		except Exception as e:
+			self.fault = e
+			self.state[ST_FAULT] = 1
+		finally:
+			self.heater.off()
@@ -0,0 +1,159 @@
+""" Encoder input service: one I2C snapshot per cycle + queue of events
+
+	poll() reads the encoder position and button once (2 I2C transactions),
+	updates the snapshot (position, button) and queues the rotation deltas and
+	press/release edges. The UI consumes the queue with get() (sync code) or
+	await next() (uasyncio) without any extra bus traffic. Turns made while
+	the UI is busy are accumulated in the queue and never lost.
+
+	The run() task polls every FAST_MS while the encoder is used and slows down
+	to IDLE_MS after ACTIVE_MS without activity. With an interrupt line
+	(irq_pin), the task sleeps until the pin falls (IDLE_MS as safety poll).
+
+		await ev.wait_release()
+		if await ev.wait_press_ms( 500 ): ...   # True when pressed within 500 ms
+		kind, value = await ev.next()             # EV_TURN (value=delta), EV_PRESS, EV_RELEASE
+"""
+from micropython import const
+from machine import Pin
+from array import array
+import uasyncio as asyncio
+import time
+
+EV_TURN    = const(1)
+EV_PRESS   = const(2)
+EV_RELEASE = const(3)
+
+QUEUE_SIZE = const(16)
+
+class EncoderEvents:
+	FAST_MS = 20
+	IDLE_MS = 100
+	ACTIVE_MS = 2000
+
+	def __init__( self, enc, irq_pin=None ):
+		self.enc = enc
+		self.position = 0
+		self.button = False
+		self.presses = 0 # press edges counter
+		self.polls = 0
+		self._changed = asyncio.Event()
+		self._kind = bytearray( QUEUE_SIZE )
+		self._value = array( 'h', [0]*QUEUE_SIZE )
+		self._head = 0 # next event to read
+		self._count = 0
+		self._last_activity = time.ticks_add( time.ticks_ms(), -self.ACTIVE_MS )
+		self._started = False
+		self._irq_flag = None
+		if irq_pin != None:
+			self._irq_flag = asyncio.ThreadSafeFlag()
+			irq_pin.irq( trigger=Pin.IRQ_FALLING, handler=lambda p: self._irq_flag.set() )
+
+	# --- queue ---
+	def _push( self, kind, value ):
+		if self._count:
+			_last = (self._head+self._count-1) % QUEUE_SIZE
+			if (kind == EV_TURN) and (self._kind[_last] == EV_TURN):
+				self._value[_last] += value # merge consecutive rotations
+				return
+		if self._count == QUEUE_SIZE: # full: drop the oldest
+			self._head = (self._head+1) % QUEUE_SIZE
+			self._count -= 1
+		_idx = (self._head+self._count) % QUEUE_SIZE
+		self._kind[_idx] = kind
+		self._value[_idx] = value
+		self._count += 1
+
+	def get( self ):
+		""" Next queued event as (kind, value) or None """
+		if not self._count:
+			return None
+		_idx = self._head
+		self._head = (self._head+1) % QUEUE_SIZE
+		self._count -= 1
+		return (self._kind[_idx], self._value[_idx])
+
+	def flush( self ):
+		""" Forget the pending events (eg: when a new screen is displayed) """
+		self._head = 0
+		self._count = 0
+
+	# --- acquisition ---
+	def poll( self ):
+		""" Read the encoder once, update the snapshot and queue the events """
+		_pos = self.enc.position
+		_btn = self.enc.button
+		self.polls += 1
+		if not self._started: # first snapshot: no event
+			self._started = True
+			self.position = _pos
+			self.button = _btn
+			return False
+		_delta = _pos - self.position
+		if _delta > 32767: # 16 bits counter wrap
+			_delta -= 65536
+		elif _delta < -32768:
+			_delta += 65536
+		if _delta:
+			self._push( EV_TURN, _delta )
+		if _btn != self.button:
+			if _btn:
+				self.presses += 1
+			self._push( EV_PRESS if _btn else EV_RELEASE, 0 )
+		if _delta or (_btn != self.button):
+			self.position = _pos
+			self.button = _btn
+			self._last_activity = time.ticks_ms()
+			self._changed.set()
+			return True
+		return False
+
+	@property
+	def poll_ms( self ):
+		""" Polling period: fast while the encoder is in use """
+		if self.button or (time.ticks_diff( time.ticks_ms(), self._last_activity ) < self.ACTIVE_MS):
+			return self.FAST_MS
+		return self.IDLE_MS
+
+	async def run( self ):
+		""" Polling task, to be started with asyncio.create_task() """
+		while True:
+			self.poll()
+			if self._irq_flag != None:
+				try:
+					await asyncio.wait_for_ms( self._irq_flag.wait(), self.IDLE_MS )
+				except asyncio.TimeoutError:
+					pass
+			else:
+				await asyncio.sleep_ms( self.poll_ms )
+
+	# --- awaitables ---
+	async def changed( self ):
+		""" Wait for the next change of position or button """
+		self._changed.clear()
+		await self._changed.wait()
+
+	async def next( self ):
+		""" Wait for the next queued event, returns (kind, value) """
+		while not self._count:
+			await self.changed()
+		return self.get()
+
+	async def wait_press( self ):
+		_presses = self.presses
+		while (not self.button) and (self.presses == _presses):
+			await self.changed()
+
+	async def wait_release( self ):
+		while self.button:
+			await self.changed()
+
+	async def wait_press_ms( self, ms ):
+		""" Wait at most ms for a press. Returns True when pressed """
+		if self.button:
+			return True
+		try:
+			await asyncio.wait_for_ms( self.wait_press(), ms )
+			return True
+		except asyncio.TimeoutError:
+			return False
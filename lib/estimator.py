@@ -0,0 +1,39 @@
+""" Plate temperature estimator: alpha-beta filter on the thermocouple samples
+
+	update() is called on every MAX31855 sample (oversampled, eg: 10 Hz for a
+	1 Hz PID). It filters the 0.25 C quantization and noise and tracks the
+	rate of change (C/s), which the PID uses as derivative instead of a
+	finite difference of raw readings.
+
+	The thermocouple lags the plate surface (first order, tau). The estimated
+	plate temperature is the filtered value + tau * rate.
+
+	The gains are prepared once in the constructor; update() only does a few
+	multiplications and additions.
+"""
+
+class AlphaBeta:
+	def __init__( self, period_ms, alpha=0.2, beta=None, tau_ms=0 ):
+		self.h = period_ms / 1000 # sampling period (s)
+		self.alpha = alpha
+		self.beta = alpha*alpha/(2-alpha) if beta == None else beta # Benedict-Bordner relation by default
+		self._beta_h = self.beta / self.h
+		self.tau = tau_ms / 1000
+		self.filtered = None # filtered thermocouple temperature
+		self.rate = 0.0 # C per second
+		self.value = None # estimated plate temperature
+
+	def reset( self, temp ):
+		self.filtered = temp
+		self.rate = 0.0
+		self.value = temp
+
+	def update( self, temp ):
+		if self.filtered == None:
+			self.reset( temp )
+			return
+		_pred = self.filtered + self.rate*self.h
+		_res = temp - _pred
+		self.filtered = _pred + self.alpha*_res
+		self.rate += self._beta_h*_res
+		self.value = self.filtered + self.tau*self.rate
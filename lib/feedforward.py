@@ -0,0 +1,34 @@
+""" Feed-forward of the heater duty from a plate model (first order plus dead time)
+
+	The model is fitted on the ramps of examples/test_ramp.py (or regulation
+	logs) with host/fit_fopdt.py:
+
+		tau * dT/dt = K*u - (T - ambient)      (output seen theta sec later)
+
+	Inverted, it gives the duty u (%) needed to follow a temperature T with a
+	rate dT/dt. output() evaluates it theta sec ahead on the trajectory followed
+	by the PID, which then only corrects the residual (PID ff_func).
+"""
+
+class FOPDT:
+	def __init__( self, K, tau, theta=0, ambient=25 ):
+		self.K = K # C per % of duty (steady state)
+		self.tau = tau # sec
+		self.theta_ms = int( theta*1000 )
+		self.ambient = ambient
+		self._inv_k = 1 / K
+		self.trajectory = None # followed Trajectory, None: hold the PID setpoint
+		self.setpoint = 0 # used when no trajectory
+
+	def duty( self, temp, rate=0 ):
+		""" Duty (%) to be at temp with a rate (C/s) """
+		return (temp - self.ambient + self.tau*rate) * self._inv_k
+
+	def output( self ):
+		""" Feed-forward duty now (PID ff_func) """
+		if self.trajectory == None:
+			if self.setpoint <= self.ambient:
+				return 0
+			return self.duty( self.setpoint )
+		_elapsed = self.trajectory.elapsed_ms() + self.theta_ms
+		return self.duty( self.trajectory.at( _elapsed ), self.trajectory.slope_at( _elapsed )*1000 )
@@ -0,0 +1,21 @@
+""" PID gains stored on the flash (pid.json), written by the autotune
+
+	Kept apart from autotune.py: main.py loads the gains at every boot, the
+	relay test module is only imported when [Tune] is selected.
+"""
+import json
+
+GAINS_FILE = 'pid.json'
+
+def save_gains( gains, filename=GAINS_FILE ):
+	with open( filename, 'w' ) as f:
+		json.dump( gains, f )
+
+def load_gains( default, filename=GAINS_FILE ):
+	""" Returns (Kp, Ki, Kd) from the flash or default when not tuned yet """
+	try:
+		with open( filename ) as f:
+			_g = json.load( f )
+		return (_g['Kp'], _g['Ki'], _g['Kd'])
+	except (OSError, ValueError, KeyError):
+		return default
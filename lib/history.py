@@ -0,0 +1,202 @@
+""" Run history on the flash: a summary record per reflow, append only
+
+	RunRecorder samples the plate every second while a profile runs (own
+	Timer, temperature and duty through Plancha, so the PID may run on
+	either core) and computes the quality metrics of the run. RunHistory
+	appends the summary to the flash:
+
+	  history/runs.bin   fixed size records (RECORD_SIZE bytes), oldest first
+	  history/runs.idx   INDEX_FMT: format version, committed records, next run number
+
+	The index is rewritten after each record: a record torn by a power cut
+	is not counted and is overwritten by the next run. The last N runs are
+	read with a single seek. Once max_runs records are stored, runs.bin is
+	renamed runs.old (the previous runs.old is lost) and a new file starts.
+	The index is checked against the size of runs.bin when read, so a power
+	cut between the rename and the index rewrite keeps runs.old.
+
+	Record (little endian, RECORD_SIZE bytes):
+	  uint32 run number, uint32 time.time() at start, 14s profile name,
+	  int16 start temperature*16, int16 peak*16, int16 overshoot*16 (peak -
+	  highest target of the profile), uint16 seconds above the liquidus,
+	  uint16 max heating rate*100 (C/s over 5 sec), uint16 max cooling
+	  rate*100, uint16 heater energy (seconds at 100%), uint16 duration (sec),
+	  uint16 max tick lateness (us: PID ticks when instrumented, else the
+	  recorder Timer), uint8 flags (FLAG_ABORTED)
+"""
+from machine import Timer
+from array import array
+import struct
+import time
+import os
+
+RECORD_FMT = '<II14shhhHHHHHHB'
+RECORD_SIZE = struct.calcsize( RECORD_FMT )
+INDEX_FMT = '<HII'
+VERSION = 1
+FIELDS = ('run', 'time', 'profile', 'start', 'peak', 'overshoot', 'tal_s', 'up', 'down', 'heater_s', 'duration_s', 'late_us', 'flags')
+TEMP_SCALE = 16
+RATE_SCALE = 100
+RATE_SEC = 5 # window of the ramp rates
+FLAG_ABORTED = 1
+
+def _u16( value ):
+	return 0 if value < 0 else (65535 if value > 65535 else int( value ))
+
+def decode( data ):
+	""" Record bytes -> dict of FIELDS (temperatures and rates in C, C/s) """
+	_v = list( struct.unpack( RECORD_FMT, data ) )
+	_v[2] = _v[2].rstrip( b'\x00' ).decode()
+	for i in (3, 4, 5):
+		_v[i] /= TEMP_SCALE
+	for i in (7, 8):
+		_v[i] /= RATE_SCALE
+	return dict( zip( FIELDS, _v ) )
+
+class RunRecorder:
+	def __init__( self, temp_func, duty_func, period_ms=1000 ):
+		self.temp_func = temp_func
+		self.duty_func = duty_func
+		self.period_ms = period_ms
+		self.running = False
+		self._temps = array( 'f', [0]*(RATE_SEC*1000//period_ms) ) # ring of the last samples for the rates
+		self._timer = None
+
+	def start( self, profile_name, profile, liquidus=None, stats=None ):
+		""" Start the metrics of a run. liquidus None: highest target - 20 C. stats: TickStats of the PID or None """
+		self.profile = profile_name
+		self.target = max( _phase[0] for _phase in profile )
+		self.liquidus = liquidus if liquidus != None else self.target - 20
+		self.stats = stats
+		self.time = time.time()
+		self.start_temp = self.peak = self.temp_func()
+		self.above = 0 # samples above the liquidus
+		self.up = 0
+		self.down = 0
+		self.heater = 0 # sum of the duty (%) per sample
+		self.late_us = 0
+		self.samples = 0
+		for i in range( len( self._temps ) ):
+			self._temps[i] = self.start_temp
+		self._start = time.ticks_ms()
+		self._next = time.ticks_add( time.ticks_us(), self.period_ms*1000 )
+		self.running = True
+		self._timer = Timer(-1)
+		self._timer.init( mode=Timer.PERIODIC, period=self.period_ms, callback=self._sample )
+
+	def _sample( self, timer ):
+		_now = time.ticks_us()
+		_late = time.ticks_diff( _now, self._next )
+		self._next = time.ticks_add( self._next, self.period_ms*1000 )
+		if self.stats != None:
+			_late = self.stats.last_late
+		if _late > self.late_us:
+			self.late_us = _late
+		_t = self.temp_func()
+		if _t > self.peak:
+			self.peak = _t
+		if _t >= self.liquidus:
+			self.above += 1
+		self.heater += self.duty_func()
+		_n = len( self._temps )
+		_i = self.samples % _n
+		_rate = (_t - self._temps[_i]) * 1000 / (self.period_ms*_n) # against the sample RATE_SEC ago
+		self._temps[_i] = _t
+		self.samples += 1
+		if _rate > self.up:
+			self.up = _rate
+		elif -_rate > self.down:
+			self.down = -_rate
+
+	def finish( self, aborted=False ):
+		""" Stop the run, returns its record values (without the run number) """
+		self._timer.deinit()
+		self._timer = None
+		self.running = False
+		_sec = self.period_ms/1000
+		return (self.time, self.profile.encode()[:14], int( self.start_temp*TEMP_SCALE ), int( self.peak*TEMP_SCALE ),
+			int( (self.peak-self.target)*TEMP_SCALE ), _u16( self.above*_sec ), _u16( self.up*RATE_SCALE ), _u16( self.down*RATE_SCALE ),
+			_u16( self.heater*_sec/100 ), _u16( time.ticks_diff( time.ticks_ms(), self._start )/1000 ), _u16( self.late_us ),
+			FLAG_ABORTED if aborted else 0)
+
+class RunHistory:
+	def __init__( self, path='history', max_runs=500 ):
+		self.path = path
+		self.max_runs = max_runs
+		self._index = None # (count, next run number)
+
+	def _file( self, name ):
+		return self.path + '/' + name
+
+	def index( self ):
+		""" (records in runs.bin, next run number) """
+		if self._index == None:
+			try:
+				with open( self._file( 'runs.idx' ), 'rb' ) as f:
+					_version, _count, _next = struct.unpack( INDEX_FMT, f.read() )
+				if _version != VERSION:
+					raise ValueError( 'history version %i' % _version )
+			except (OSError, ValueError):
+				_count, _next = 0, 1
+			# never more records than runs.bin holds: a power cut during the rotation
+			# leaves the index of the renamed file (then runs.bin does not exist)
+			try:
+				_stored = os.stat( self._file( 'runs.bin' ) )[6] // RECORD_SIZE
+			except OSError:
+				_stored = 0
+			self._index = (min( _count, _stored ), _next)
+		return self._index
+
+	@property
+	def count( self ):
+		return self.index()[0]
+
+	def append( self, values ):
+		""" Store the record values of RunRecorder.finish(). Returns the run number """
+		_count, _run = self.index()
+		try:
+			os.mkdir( self.path )
+		except OSError:
+			pass # exists
+		if _count >= self.max_runs:
+			try:
+				os.remove( self._file( 'runs.old' ) )
+			except OSError:
+				pass
+			os.rename( self._file( 'runs.bin' ), self._file( 'runs.old' ) )
+			_count = 0
+		_record = struct.pack( RECORD_FMT, _run, *values )
+		try:
+			f = open( self._file( 'runs.bin' ), 'r+b' )
+		except OSError:
+			f = open( self._file( 'runs.bin' ), 'wb' )
+		with f:
+			f.seek( _count*RECORD_SIZE ) # after the committed records (drops a torn one)
+			f.write( _record )
+		self._write_index( _count+1, _run+1 )
+		return _run
+
+	def _write_index( self, count, next_run ):
+		with open( self._file( 'runs.idx' ), 'wb' ) as f:
+			f.write( struct.pack( INDEX_FMT, VERSION, count, next_run ) )
+		self._index = (count, next_run)
+
+	def _tail( self, name, count, n ):
+		""" The n last of the count records of the file, newest first """
+		with open( self._file( name ), 'rb' ) as f:
+			f.seek( (count-n)*RECORD_SIZE )
+			_data = f.read( n*RECORD_SIZE )
+		return [ decode( _data[i*RECORD_SIZE:(i+1)*RECORD_SIZE] ) for i in range( n-1, -1, -1 ) ]
+
+	def last( self, n=10 ):
+		""" The n last runs (dict, see decode), newest first. Reaches runs.old after a rotation """
+		_count = self.count
+		_runs = self._tail( 'runs.bin', _count, min( n, _count ) ) if _count else []
+		if n > _count:
+			try:
+				_old = os.stat( self._file( 'runs.old' ) )[6] // RECORD_SIZE
+			except OSError:
+				_old = 0
+			if _old:
+				_runs += self._tail( 'runs.old', _old, min( n-_count, _old ) )
+		return _runs
@@ -0,0 +1,106 @@
+""" Shadow framebuffer in front of LCDI2C: only the changed characters go on the I2C bus
+
+	ShadowLCD offers the same print()/clear()/backlight() API as LCDI2C. Texts
+	are written in a cols x rows buffer, then flush() compares it with what is
+	currently displayed and sends the dirty cells only. Adjacent dirty cells
+	are sent with a single cursor move (the HD44780 auto-increments the cursor)
+	and small clean gaps are rewritten rather than paying a new cursor move.
+
+	clear() is applied on the next print()/flush(): "clear then print" only
+	sends the cells which really change. The hardware clear command is used
+	when it is cheaper than erasing the cells one by one.
+"""
+from micropython import const
+
+MERGE_GAP = const(1) # clean cells rewritten to avoid a cursor move
+CLEAR_COST = const(5) # clear command + its 1.6ms delay, counted in character writes
+
+class ShadowLCD:
+	def __init__( self, lcd, cols=16, rows=2 ):
+		self.lcd = lcd
+		self.cols = cols
+		self.rows = rows
+		self._want = bytearray( b' '*(cols*rows) )
+		self._shown = bytearray( b' '*(cols*rows) )
+		self._cursor = None # Hardware cursor position (x,y), None when unknown
+		self._unknown = True # Display content unknown: hardware clear on next flush
+		self._pos = (0,0) # Logical cursor for print() without position
+		self.sent = 0 # characters sent to the LCD (statistics)
+
+	def backlight( self, *args ):
+		self.lcd.backlight( *args )
+
+	def invalidate( self ):
+		""" Display content unknown (eg: LCD reset): next flush rewrites everything """
+		self._unknown = True
+
+	def clear( self ):
+		for i in range( len(self._want) ):
+			self._want[i] = 32
+		self._pos = (0,0)
+
+	def print( self, s, pos=None ):
+		x, y = self._pos if pos == None else pos
+		if 0 <= y < self.rows:
+			_base = y*self.cols
+			for ch in s:
+				if x >= self.cols:
+					break
+				if x >= 0:
+					self._want[_base+x] = ord(ch) & 0xFF
+				x += 1
+		self._pos = (x, y)
+		self.flush()
+
+	def _dirty( self ):
+		""" returns (dirty cells, non blank cells in the buffer) """
+		_dirty = 0
+		_filled = 0
+		for i in range( len(self._want) ):
+			if self._want[i] != self._shown[i]:
+				_dirty += 1
+			if self._want[i] != 32:
+				_filled += 1
+		return _dirty, _filled
+
+	def flush( self ):
+		""" Send the differences between the buffer and the display """
+		_want, _shown, cols = self._want, self._shown, self.cols
+		_dirty, _filled = self._dirty()
+		if not( _dirty or self._unknown ):
+			return
+		if self._unknown or (_dirty > CLEAR_COST + _filled):
+			self._unknown = False
+			self.lcd.clear()
+			for i in range( len(_shown) ):
+				_shown[i] = 32
+			self._cursor = (0,0)
+		for y in range( self.rows ):
+			_base = y*cols
+			x = 0
+			while x < cols:
+				if _want[_base+x] == _shown[_base+x]:
+					x += 1
+					continue
+				# dirty run [x, end[ with small clean gaps merged
+				end = x+1
+				gap = 0
+				i = x+1
+				while i < cols:
+					if _want[_base+i] != _shown[_base+i]:
+						end = i+1
+						gap = 0
+					else:
+						gap += 1
+						if gap > MERGE_GAP:
+							break
+					i += 1
+				_chunk = ''.join( chr( c ) for c in _want[_base+x:_base+end] ) # one char per HD44780 code, >= 0x80 included (0xDF: degree)
+				if self._cursor == (x, y):
+					self.lcd.print( _chunk )
+				else:
+					self.lcd.print( _chunk, (x, y) )
+				_shown[_base+x:_base+end] = _want[_base+x:_base+end]
+				self.sent += end-x
+				self._cursor = (end, y)
+				x = end
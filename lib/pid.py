@@ -2,52 +2,228 @@
 
 	Domeu - Aug 8, 2021 - sourced from https://forum.mchobby.be/viewtopic.php?f=23&t=728
 	Domeu - Aug 8, 2021 - deinit doesn't release the Timer & Callback. Set the temperature to 0 to halt the PID regulation.
+
+	dt is the control period in milliseconds (any value, eg: 100 for 10 Hz).
+	setpoint_func (optional) is called at the beginning of each tick to
+	get the setpoint (eg: a profile trajectory). set_period() changes it at runtime; the integral is kept as an output
+	contribution so it stays valid when the rate changes.
+
+	control() runs from a Timer callback. It only works with values prepared
+	by update_gains() (Kp, Ki*dt, Kd/dt) and stores the integral directly as
+	its contribution to the output, so a tick does not recompute the gains
+	nor create attributes. In float mode it still allocates: every float
+	result is a heap object on MicroPython (see examples/bench_pid.py).
+
+	rate_func (optional) returns the rate of change of the measure (unit per
+	second, eg: from estimator.AlphaBeta). The derivative term then uses the
+	setpoint change minus this rate rather than a finite difference of the
+	(noisy) measures. In fixed mode the rate may be a float: its derivative
+	term is rounded to a Q16 int.
+
+	With fixed=True, the control law runs on small integers: measure_func()
+	must return an int and setpoint is expressed in the same unit (eg: quarter
+	of degree). Gains are stored as Q16 fixed point and output_func() receives
+	an int. Nothing is allocated on the heap during the tick, as long as
+	measure_func, ff_func and output_func do not allocate themselves (a
+	float rate_func does, for its rounding).
+
+	ff_func (optional) returns a feed-forward output (eg: feedforward.FOPDT,
+	same unit as the output) added to the PID terms: the PID only corrects the
+	residual of the model.
+
+	set_schedule() takes a table of gains per setpoint band
+	[ (upper setpoint, Kp, Ki, Kd), ... ] (sorted, the last band has no upper
+	limit). The band is checked on each tick and the gains are switched with
+	set_gains(): bumpless, the integral absorbs the step of the proportional
+	term so the output does not jump (the windup guard keeps that share).
+
+	stats (optional tickstats.TickStats) records the lateness of each tick
+	and the duration of measure / law / output. None (default) costs a single
+	test per tick.
 """
 from machine import Timer
 import time
 
+FIX_SHIFT = 16 # Q16 fixed point for gains in fixed mode
+
 class PID:
+	__slots__ = ('Kp', 'Ki', 'Kd', 'dt', 'setpoint', 'measure_func', 'output_func', 'output_min', 'output_max',
+		'period_ms', 'setpoint_func', 'rate_func', 'ff_func', 'schedule', '_band', 'stats', 'fixed', 'last_measure', 'last_setpoint', 'error', 'i_term', 'output',
+		'_share', '_kp', '_ki_dt', '_kd', '_kd_dt', '_i_min', '_i_max', 'timer')
 
-	def __init__(self, Kp, Ki, Kd, dt, setpoint, measure_func, output_func, output_min, output_max):
-		self.Kp = Kp
-		self.Ki = Ki
-		self.Kd = Kd
-		self.dt = int(round(dt / 1000)) # Convert from ms
+	def __init__(self, Kp, Ki, Kd, dt, setpoint, measure_func, output_func, output_min, output_max, fixed=False, setpoint_func=None, rate_func=None, ff_func=None):
+		self.fixed = fixed
+		self.ff_func = ff_func
+		self.schedule = None
+		self._band = -1
+		self.stats = None
+		self.setpoint_func = setpoint_func
+		self.rate_func = rate_func
+		self.period_ms = dt
+		self.dt = dt / 1000 # Convert from ms
 		self.setpoint = setpoint
 		self.measure_func = measure_func
 		self.output_func = output_func
 		self.output_min = output_min
 		self.output_max = output_max
+		self.update_gains( Kp, Ki, Kd )
 
 		self.last_measure = measure_func() # Store last measure for external access
 		self.error = setpoint - self.last_measure
-		self.integral = 0
+		self.last_setpoint = setpoint
+		self.i_term = 0 # Integral contribution to the output (Ki * sum(error*dt))
+		self._share = False # i_term holds the share of a gain switch, still unwinding (see set_gains)
+		self.output = 0
 
 		self.timer = Timer(-1) # Virtual timer
 		self.timer.init(mode=Timer.PERIODIC, period=dt, callback=self.control)
 
+	def update_gains(self, Kp, Ki, Kd):
+		""" Change the gains. Prepare the per-tick constants (outside of the Timer callback) """
+		self.Kp = Kp
+		self.Ki = Ki
+		self.Kd = Kd
+		if self.fixed:
+			self._kp = int( Kp * (1 << FIX_SHIFT) )
+			self._kd = int( Kd * (1 << FIX_SHIFT) )
+			self._ki_dt = int( Ki * self.dt * (1 << FIX_SHIFT) )
+			self._kd_dt = int( Kd / self.dt * (1 << FIX_SHIFT) )
+			self._i_min = self.output_min << FIX_SHIFT
+			self._i_max = self.output_max << FIX_SHIFT
+		else:
+			self._kp = Kp
+			self._kd = Kd
+			self._ki_dt = Ki * self.dt
+			self._kd_dt = Kd / self.dt
+			self._i_min = self.output_min
+			self._i_max = self.output_max
+
+	def set_gains(self, Kp, Ki, Kd, error=None):
+		""" Bumpless change of the gains while regulating. The integral takes the step
+		    of the proportional term, even beyond the output limits (bounded by their span).
+		    error: the one of the current tick (default: the last one).
+		    Stopped (last tick without setpoint): no output to keep, the gains only """
+		if self.last_setpoint <= 0:
+			self.update_gains( Kp, Ki, Kd )
+			return
+		if error == None:
+			error = self.error
+		if self.fixed:
+			self.i_term += (self._kp - int( Kp * (1 << FIX_SHIFT) )) * error
+		else:
+			self.i_term += (self.Kp - Kp) * error
+		self.update_gains( Kp, Ki, Kd )
+		_span = self._i_max - self._i_min
+		if self.i_term > self._i_max + _span:
+			self.i_term = self._i_max + _span
+		elif self.i_term < self._i_min - _span:
+			self.i_term = self._i_min - _span
+		self._share = True
+
+	def set_schedule(self, table):
+		""" Gains per setpoint band [ (upper setpoint, Kp, Ki, Kd), ... ]. None keeps the current gains """
+		self.schedule = table
+		self._band = -1
+
+	def _select_band(self, error):
+		_table = self.schedule
+		i = 0
+		_last = len( _table ) - 1
+		while (i < _last) and (self.setpoint >= _table[i][0]):
+			i += 1
+		if i != self._band:
+			self._band = i
+			self.set_gains( _table[i][1], _table[i][2], _table[i][3], error )
+
+	def set_period(self, dt):
+		""" Change the control period (in ms) while the PID is running """
+		if dt == self.period_ms:
+			return
+		self.period_ms = dt
+		self.dt = dt / 1000
+		self.update_gains( self.Kp, self.Ki, self.Kd )
+		if self.timer != None:
+			self.timer.init(mode=Timer.PERIODIC, period=dt, callback=self.control)
+
+	def detach(self):
+		""" Release the Timer: control() is then called by the owner every period_ms (eg: dualcore.ControlCore) """
+		self.timer.deinit()
+		self.timer = None
+
 	def control(self, timer):
-		self.last_measure = self.measure_func()
-		error = self.setpoint - self.last_measure
-		proportional = self.Kp * error
-		self.integral = self.integral + error * self.dt
+		stats = self.stats
+		if stats != None:
+			t0 = time.ticks_us()
+		if self.setpoint_func != None:
+			self.setpoint = self.setpoint_func()
+		measure = self.measure_func()
+		self.last_measure = measure
+		if stats != None:
+			t1 = time.ticks_us()
+		error = self.setpoint - measure
+		if self.schedule != None:
+			self._select_band( error )
+		proportional = self._kp * error
+		if self.fixed:
+			proportional >>= FIX_SHIFT
+		feedforward = 0
+		if self.ff_func != None:
+			feedforward = self.ff_func()
 
-		# Prevent integral windup
-		if (proportional > self.output_max) or (proportional < self.output_min):
-			self.integral = 0
+		# Prevent integral windup: reset while P (+ff) alone saturates, clamped to the
+		# output limits. The share of a gain switch (set_gains) may lie beyond them or
+		# oppose the saturation: it is kept and unwinds with the integration
+		if (proportional+feedforward > self.output_max) or (proportional+feedforward < self.output_min):
+			if self._share and ((self.i_term < 0) == (proportional+feedforward > self.output_max)):
+				i_term = self.i_term + self._ki_dt * error
+				if (i_term < 0) != (self.i_term < 0):
+					i_term = 0
+				self.i_term = i_term
+			else:
+				self.i_term = 0
+			if self.i_term == 0:
+				self._share = False
+		else:
+			i_term = self.i_term + self._ki_dt * error
+			if (i_term > self._i_max) and (i_term > self.i_term):
+				i_term = self.i_term if self.i_term > self._i_max else self._i_max
+			elif (i_term < self._i_min) and (i_term < self.i_term):
+				i_term = self.i_term if self.i_term < self._i_min else self._i_min
+			self.i_term = i_term
+			if self._share and (self._i_min <= i_term <= self._i_max):
+				self._share = False
 
-		self.derivative = (error - self.error) / self.dt
-		output = proportional + self.Ki * self.integral + self.Kd * self.derivative
+		if self.rate_func != None: # d(error)/dt = d(setpoint)/dt - d(measure)/dt
+			if self.fixed: # the rate (float, measure unit per second) back to a Q16 int
+				derivative = self._kd_dt * (self.setpoint - self.last_setpoint) - int( self._kd * self.rate_func() )
+			else:
+				derivative = self._kd_dt * (self.setpoint - self.last_setpoint) - self._kd * self.rate_func()
+		else:
+			derivative = self._kd_dt * (error - self.error)
+		if self.fixed:
+			output = ((self._kp * error + self.i_term + derivative) >> FIX_SHIFT) + feedforward
+		else:
+			output = proportional + self.i_term + derivative + feedforward
 		self.error = error
+		self.last_setpoint = self.setpoint
 
-		output = max(self.output_min, output)
-		output = min(self.output_max, output)
+		if output > self.output_max:
+			output = self.output_max
+		elif output < self.output_min:
+			output = self.output_min
+		self.output = output
+		if stats != None:
+			t2 = time.ticks_us()
 		self.output_func(output)
+		if stats != None:
+			stats.tick( t0, t1, t2, time.ticks_us(), self.period_ms )
 
 	def set(self, value):
+		self.setpoint_func = None
 		self.setpoint = value
 
 	def stop(self):
 		# self.timer.deinit() THAT's DOESN'T WORK!!!
 		# self.timer.callback( None )
 		self.set(0)
+		self.last_setpoint = 0
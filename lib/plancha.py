@@ -1,11 +1,21 @@
 # Access to all the components
 #
+# The optional ones (estimator, feed-forward, tick stats, second core, zones,
+# sigma-delta SSR, cool-down) are imported when first enabled: they are not
+# compiled nor allocated at boot.
+#
 from machine import Pin, SPI, I2C, reset
 from lcdi2c import LCDI2C
+from lcdbuf import ShadowLCD
 from lfpwm import LowFreqPWM
 from pid import PID
 from max31855 import MAX31855
 from i2cenc import I2CEncoder
+from encevent import EncoderEvents, EV_TURN, EV_PRESS
+from tlog import TempLog
+from sampler import TempSampler
+from gains import save_gains, GAINS_FILE
+import uasyncio as asyncio
 import time
 
 class Plancha():
@@ -14,52 +24,292 @@ class Plancha():
 		self._run_app = Pin( Pin.board.GP3, Pin.IN, Pin.PULL_UP )
 		self.heater   = Pin( Pin.board.GP13, Pin.OUT, value=False )
 		self.cooling  = Pin( Pin.board.GP19, Pin.OUT, value=False )
-		self.critical_temp = 270 # will stop PID and reset board if reached!
+		self.zones = None # ZoneBank of a multi-zone plate (see setup_zones)
+		self._critical_temp = 270 # will stop PID and reset board if reached! (see critical_temp)
+
+		# --- First frame: I2C and LCD only ---
+		# I2C(0)
+		self._i2c = I2C( 0, sda=Pin.board.GP8, scl=Pin.board.GP9 )
+		self.lcd = ShadowLCD( LCDI2C( self._i2c, cols=16, rows=2 ), cols=16, rows=2 ) # only sends the changed characters
+		self.lcd.backlight()
+		self.lcd.clear()
+		self.lcd.print( "Plancha CMS", (2,0) )
+		self.first_frame_ms = time.ticks_ms() # since the reset (boot report, see main.py)
 
 		# --- Buses ---
 		# SPI(0)
 		self._spi_cs  = Pin( Pin.board.GP5, Pin.OUT, value=True ) # SPI CSn
 		self._spi = SPI(0, mosi=Pin.board.GP7, miso=Pin.board.GP4, sck=Pin.board.GP6, baudrate=5000000, polarity=0, phase=0)
-		# I2C(0)
-		self._i2c = I2C( 0, sda=Pin.board.GP8, scl=Pin.board.GP9 )
 
 		# --- Components ---
 		# Thermocouple
 		self.tmc = MAX31855( spi=self._spi, cs_pin=self._spi_cs )
-		# LCD & encoder
-		self.lcd = LCDI2C( self._i2c, cols=16, rows=2 )
+		# Encoder
 		self.enc = I2CEncoder(self._i2c)
+		self.ev  = EncoderEvents(self.enc) # awaitable encoder events (uasyncio)
 		# Low Frequency PWM for SSR relay
 		self._pwm = LowFreqPWM( pin=self.heater, period=1.5, ton_ms=9, toff_ms=10 ) # period=1.5s, needs 9ms to get activated, 10ms to get it off
+		self._duty = 0 # last duty given to _pwm (%)
+		self._fine = False # _pwm takes a float ratio (sigma-delta)
 		self._pid = None
+		self.gains = None # (Kp, Ki, Kd) given to setup_pid()
+		self.schedule = None # Gains per setpoint band (see set_schedule)
 		self._pid_start = time.time() # Last change of PID setpoint()
+		self._manual = False # True while autotune drives the heater (PID output ignored)
+		self.tick_stats = None # TickStats of the PID (see instrument)
+		self.spi_stats = None
+		self.core1 = None # ControlCore when the regulation runs on the second core (see start_core1)
+		self.cooldown = None # CoolDown driving the fans on a profile ramp (see cool_down)
+		self.log = TempLog() # regulation samples, drained by a uasyncio task
+		self.phase = 0 # profile phase sent with the samples (0: none)
+		self.estimator = None # Optional AlphaBeta between the sampler and the PID (see enable_estimator)
+		self.feedforward = None # Optional FOPDT plate model added to the PID output (see enable_feedforward)
+		# Thermocouple sampling: its Timer calls _on_sample / _critical, so it starts once
+		# everything they use (_pwm, _pid, estimator) exists
+		self.sampler = TempSampler( self.tmc, period_ms=250 ) # The only one reading the MAX31855
+		self.sampler.on_sample = self._on_sample
+		self.sampler.on_fault = self._critical
 
 
 		# --- Initialize ---
 		# lcd
-		self.lcd.backlight()
-		self.lcd.clear()
-		self.lcd.print( "Plancha CMS", (2,0) )
-		self.lcd.print( "temp: %3i C" % self.tmc.temperature(), (0,1) )
+		self.lcd.print( "temp: %3i C" % self.sampler.value, (0,1) )
 		# encoder
 		self.enc.color = (0,255,0) # Rouge
 
 
-	def setup_pid( self, Kp, Ki, Kd ):
+	def setup_pid( self, Kp, Ki, Kd, dt=1000 ):
+		""" Create the PID regulating the heater. dt is the control period (ms) """
+		self.gains = (Kp, Ki, Kd)
 		def measure_temp(): # PID callbacks
-			_t = self.tmc.temperature()
-			if (self._pid != None) and (self._pid.setpoint>0):
-				print( "%i, %i, %i" % (time.time()-self._pid_start, self._pid.setpoint, _t) ) # DeltaTime_since_temps_set, temp_setpoint, current_temps
-			if _t >= self.critical_temp:
-				self._pid.stop()  # Make it rebooting!
-				self.heater.off()
-				print( 'Reset board now!' )
-				reset()
-			return _t
+			if self.estimator != None:
+				return self.estimator.value
+			return self.sampler.value
 		def output_pwm(value):
-			return self._pwm.duty_ratio( int(value) )
-		self._pid = PID(Kp=Kp, Ki=Ki, Kd=Kd, dt=1000, setpoint=100, measure_func=measure_temp, output_func=output_pwm, output_min=0, output_max=100)
+			if self._manual:
+				return
+			if self._pid.setpoint > 0:
+				_stats = self._pid.stats
+				if _stats != None:
+					self.log.add( time.ticks_ms(), self._pid.setpoint, self.sampler.value, self._pid.last_measure, value, self.phase, _stats.last_late, _stats.last_us )
+				else:
+					self.log.add( time.ticks_ms(), self._pid.setpoint, self.sampler.value, self._pid.last_measure, value, self.phase )
+			return self._set_duty( value )
+		self._pid = PID(Kp=Kp, Ki=Ki, Kd=Kd, dt=dt, setpoint=100, measure_func=measure_temp, output_func=output_pwm, output_min=0, output_max=100)
 		self._pid.stop()
+		self._sample_for( dt )
+		if self.estimator != None:
+			self._pid.rate_func = self._estimated_rate
+		if self.feedforward != None:
+			self._pid.ff_func = self.feedforward.output
+
+	def setup_zones( self, zones, Kp, Ki, Kd, dt=1000, coupling=None ):
+		""" Several heating zones [ (thermocouple CS pin, heater pin), ... ], eg: [(5, 13), (20, 14)],
+		    regulated by a single ZoneBank (see zones.py). The thermocouples share the SPI bus.
+		    Replaces the single zone sampler and PWM: the zones are then driven with self.zones """
+		from zones import ZoneBank, MAX31855Bank
+		self.sampler.stop()
+		self._pwm.deinit()
+		if self._pid != None:
+			self._pid.detach()
+		_cs = [ Pin( _c, Pin.OUT, value=True ) for _c, _h in zones ]
+		_pwms = [ LowFreqPWM( pin=Pin( _h, Pin.OUT, value=False ), period=1.5, ton_ms=9, toff_ms=10 ) for _c, _h in zones ]
+		self.zones = ZoneBank( MAX31855Bank( self._spi, _cs ), _pwms, Kp, Ki, Kd, dt=dt, coupling=coupling )
+		self.zones.critical_temp = self.critical_temp
+		self.zones.on_critical = self._zone_critical
+		self.zones.on_fault = self._zone_critical
+		return self.zones
+
+	def _zone_critical( self, zone ):
+		self._critical()
+
+	def use_sigma_delta( self, slot_ms=10, pio=False ):
+		""" Drive the SSR by mains half-cycle slots (sigma-delta, see ssr.py) instead of the 1.5 s LowFreqPWM.
+		    pio=True: the slots are output by a PIO state machine (RP2040) """
+		import ssr
+		if self.core1 != None:
+			raise Exception( "the heater is driven by core 1 (start_core1).")
+		self._pwm.deinit()
+		if pio:
+			self._pwm = ssr.PioSigmaDelta( self.heater, slot_ms=slot_ms )
+		else:
+			self._pwm = ssr.SigmaDelta( self.heater, slot_ms=slot_ms )
+		self._fine = True
+		self._pwm.duty_ratio( self._duty )
+
+	def cool_down( self, trajectory, Kp=10, Ki=0.2, handover_ms=10000, slot_ms=500 ):
+		""" Fans regulated on the cool-down ramp of the trajectory (see cooldown.py), modulated
+		    by slots of slot_ms on the cooling pin. Returns the CoolDown """
+		import ssr
+		from cooldown import CoolDown
+		self.end_cool_down()
+		self.cooldown = CoolDown( ssr.SigmaDelta( self.cooling, slot_ms=slot_ms ), lambda: self.temperature, Kp=Kp, Ki=Ki, handover_ms=handover_ms )
+		self.cooldown.follow( trajectory )
+		return self.cooldown
+
+	def end_cool_down( self ):
+		""" Release the fans regulation, the fans are off """
+		if self.cooldown != None:
+			self.cooldown.deinit()
+			self.cooldown = None
+		self.cooling.off()
+
+	def set_schedule( self, table ):
+		""" Gains per setpoint band [ (upper setpoint, Kp, Ki, Kd factors), ... ]: the factors
+		    apply to the gains of setup_pid() (or of the autotune). None: a single gain set """
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		self.schedule = table
+		self.use_gains( None )
+
+	def start_core1( self ):
+		""" Move sampling, PID, critical check and heater PWM to the second core (see dualcore.py).
+		    Must be called once the PID is configured. """
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		from dualcore import ControlCore, ST_TEMP, ST_SETPOINT, ST_DUTY
+		self._st_temp = ST_TEMP # shared state indices, read by the properties without an import
+		self._st_setpoint = ST_SETPOINT
+		self._st_duty = ST_DUTY
+		self.core1 = ControlCore( self.sampler, self._pid, self.heater, pwm_period_ms=1500, ton_ms=9, toff_ms=10 )
+		self._pwm.deinit()
+		self._pwm = self.core1 # same duty_ratio() API
+		self._fine = False
+		self.core1.start()
+
+	def instrument( self, on=True, bin_us=50 ):
+		""" Record the PID tick lateness / stage durations and the thermocouple read
+		    duration (see tickstats.py). Off again: the histograms are kept for tick_report() """
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		if on:
+			if self.tick_stats == None:
+				from tickstats import TickStats, Histogram
+				self.tick_stats = TickStats( bin_us=bin_us )
+				self.spi_stats = Histogram( 'spi', bin_us=bin_us )
+			self.tick_stats.rebase()
+			self._pid.stats = self.tick_stats
+			self.sampler.stats = self.spi_stats
+		else:
+			self._pid.stats = None
+			self.sampler.stats = None
+
+	def tick_report( self, reset=False ):
+		""" Print the tick statistics (REPL: app.p.tick_report()) """
+		if self.tick_stats == None:
+			print( 'tick stats: off (see instrument())' )
+			return
+		for _line in self.tick_stats.report():
+			print( '#TS', _line )
+		print( '#TS', self.spi_stats.report() )
+		if reset:
+			self.tick_stats.reset()
+			self.spi_stats.reset()
+
+	def _do( self, func, *args ):
+		# Changes of the regulation: executed by core 1 between two ticks when it owns the PID
+		if self.core1 != None:
+			self._check_core1()
+			self.core1.post( func, *args )
+		else:
+			func( *args )
+
+	def use_gains( self, gains ):
+		""" Override the gains (Kp, Ki, Kd) bumplessly, eg: for a profile phase.
+		    None goes back to the schedule (or the setup_pid() gains) """
+		self._do( self._use_gains, gains )
+
+	def _use_gains( self, gains ):
+		if gains != None:
+			self._pid.set_schedule( None )
+			self._pid.set_gains( gains[0], gains[1], gains[2] )
+		elif self.schedule != None:
+			Kp, Ki, Kd = self.gains
+			self._pid.set_schedule( [ (t, Kp*kp, Ki*ki, Kd*kd) for t, kp, ki, kd in self.schedule ] )
+		else:
+			self._pid.set_schedule( None )
+			self._pid.set_gains( self.gains[0], self.gains[1], self.gains[2] )
+
+	def enable_feedforward( self, K, tau, theta=0, ambient=25 ):
+		""" Add the duty predicted by a FOPDT plate model (see host/fit_fopdt.py) to the PID output """
+		from feedforward import FOPDT
+		self.feedforward = FOPDT( K, tau, theta, ambient=ambient )
+		if self._pid != None:
+			self._pid.ff_func = self.feedforward.output
+
+	def enable_estimator( self, period_ms=100, alpha=0.2, tau_ms=0 ):
+		""" Oversample the thermocouple and feed the PID with the AlphaBeta estimate and its rate """
+		from estimator import AlphaBeta
+		self.estimator = AlphaBeta( period_ms, alpha=alpha, tau_ms=tau_ms )
+		self.estimator.reset( self.sampler.value )
+		self.sampler.set_period( period_ms )
+		if self._pid != None:
+			self._pid.rate_func = self._estimated_rate
+
+	def _estimated_rate( self ):
+		return self.estimator.rate
+
+	def _on_sample( self, value ):
+		# Called by the sampler on every fresh sample
+		if value >= self.critical_temp:
+			self._critical()
+		if self.estimator != None:
+			self.estimator.update( value )
+
+	def _critical( self ):
+		""" Critical temperature reached (or thermocouple failure) """
+		if self.zones != None:
+			self.zones.stop() # the single zone PWM is released by setup_zones()
+		else:
+			if self._pid != None:
+				self._pid.stop()  # Make it rebooting!
+			self._pwm.duty_ratio( 0 )
+		self.heater.off()
+		print( 'Reset board now!' )
+		reset()
+
+	@property
+	def critical_temp( self ):
+		""" Temperature resetting the board. Also checked on every zone of setup_zones() """
+		return self._critical_temp
+
+	@critical_temp.setter
+	def critical_temp( self, value ):
+		self._critical_temp = value
+		if self.zones != None:
+			self.zones.critical_temp = value
+
+	@property
+	def regulating( self ):
+		""" True when the PID has a setpoint (heating regulation active) """
+		return (self._pid != None) and (self._pid.setpoint > 0)
+
+	@property
+	def control_period( self ):
+		""" PID control period (in ms) """
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		return self._pid.period_ms
+
+	@control_period.setter
+	def control_period( self, ms ):
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		self._do( self._pid.set_period, ms )
+		self._sample_for( ms )
+
+	def _sample_for( self, ms ):
+		# The PID reads the sampler cache: a fresh sample for every tick, or the
+		# finite difference derivative sees the same sample several times then a jump.
+		# The estimator (own oversampling period, rate as derivative) is left alone
+		if (self.estimator == None) and (ms < self.sampler.period_ms):
+			self._do( self.sampler.set_period, ms )
+
+	def _check_core1( self ):
+		# The loop of core 1 ended on an exception: heater off, the board resets like on a critical temperature
+		if self.core1.failed():
+			print( 'core 1 stopped:', repr( self.core1.fault ) )
+			self._critical()
 
 	@property
 	def run_app(self):
@@ -68,26 +318,130 @@ class Plancha():
 
 	@property
 	def temperature( self ):
-		return self.tmc.temperature()
+		""" Last thermocouple sample (at most sampler.period_ms old) """
+		if self.core1 != None:
+			self._check_core1()
+			return self.core1.read( self._st_temp )
+		return self.sampler.value
+
+	@property
+	def setpoint( self ):
+		""" Current PID setpoint (0 when stopped) """
+		if self.core1 != None:
+			self._check_core1()
+			return self.core1.read( self._st_setpoint )
+		return self._pid.setpoint
+
+	@property
+	def duty( self ):
+		""" Current heater duty (%) """
+		if self.core1 != None:
+			self._check_core1()
+			return self.core1.read( self._st_duty )
+		return self._duty
+
+	def _set_duty( self, ratio ):
+		self._duty = ratio
+		if self._fine:
+			self._pwm.duty_ratio( ratio )
+		else:
+			self._pwm.duty_ratio( int(ratio) )
 
 	@temperature.setter
 	def temperature( self, value ):
 		# Initialize the PID destination
 		if self._pid == None:
 			raise Exception( "setup_pid() must be called first.")
+		self._do( self._set_temperature, value )
+		self._pid_start = time.time()
+
+	def _set_temperature( self, value ):
 		self._pid.set( value )# A Zero value will stop the PID
+		if self.feedforward != None:
+			self.feedforward.trajectory = None
+			self.feedforward.setpoint = value
+
+	def follow( self, trajectory ):
+		""" Start the PID on a Trajectory: the setpoint is sampled on every PID tick """
+		if self._pid == None:
+			raise Exception( "setup_pid() must be called first.")
+		trajectory.start()
+		self._do( self._follow, trajectory )
 		self._pid_start = time.time()
 
-	def stop( self ):
-		""" Stop Any PID running and controling the Heater """
+	def _follow( self, trajectory ):
+		self._pid.set( trajectory.at(0) )
+		self._pid.setpoint_func = trajectory.setpoint
+		if self.feedforward != None:
+			self.feedforward.trajectory = trajectory
+
+	async def autotune( self, setpoint=150, high=40, progress_cb=None, abort_func=None ):
+		""" Relay feedback test around setpoint (see autotune.py). Returns the gains dict:
+		    the PID keeps its gains until apply_gains() (once the user accepted them).
+		    abort_func() returning True stops the test: raises autotune.TuneError """
 		if self._pid == None:
 			raise Exception( "setup_pid() must be called first.")
-		self._pid.stop() # Will set PID the setpoint to 0
+		from autotune import RelayTuner
+		self.stop()
+		tuner = RelayTuner( setpoint=setpoint, high=high, period_ms=self.sampler.period_ms )
+		def read_temp():
+			if self.estimator != None:
+				return self.estimator.value
+			return self.sampler.value
+		self._manual = True
+		try:
+			gains = await tuner.run( read_temp, self._set_duty, progress_cb=progress_cb, abort_func=abort_func )
+		finally:
+			self._manual = False
+			self.stop()
+		return gains
+
+	def apply_gains( self, gains, filename=GAINS_FILE ):
+		""" Use the gains dict of autotune() and save it on the flash (loaded at boot by gains.load_gains).
+		    The gain schedule is dropped: its factors were tuned for the previous gains """
+		self.gains = (gains['Kp'], gains['Ki'], gains['Kd'])
+		self.schedule = None
+		self.use_gains( None )
+		save_gains( gains, filename )
+
+	def stop( self ):
+		""" Stop Any PID running and controling the Heater (every zone of setup_zones()) """
+		if self.zones != None:
+			self.zones.stop()
+		else:
+			if self._pid == None:
+				raise Exception( "setup_pid() must be called first.")
+			self._manual = False
+			self._do( self._stop )
 		self._pid_start = time.time()
 		self.heater.off() # Be sure we did stop it!
+		if self.cooldown != None:
+			self.end_cool_down()
 
-	def menu_select( self, options, clear=True ):
-		""" options are [ (code,label,(x,y)) ]	"""
+	def _stop( self ):
+		self._pid.stop() # Will set PID the setpoint to 0
+		self._set_duty( 0 )
+		if self.feedforward != None:
+			self.feedforward.trajectory = None
+			self.feedforward.setpoint = 0
+
+	def wait_release( self ):
+		""" Wait the release of the encoder button (sync) """
+		self.ev.poll()
+		while self.ev.button:
+			time.sleep_ms( self.ev.FAST_MS )
+			self.ev.poll()
+
+	def next_event( self ):
+		""" Wait the next encoder event (sync), returns (kind, value) """
+		while True:
+			_ev = self.ev.get()
+			if _ev != None:
+				return _ev
+			time.sleep_ms( self.ev.poll_ms )
+			self.ev.poll()
+
+	def _menu_draw( self, options, clear ):
 		if clear:
 			self.lcd.clear()
 		iPos = 0
@@ -96,64 +450,92 @@ class Plancha():
 				label = label.replace('[',' ').replace(']',' ')
 			self.lcd.print( label, xy_pos )
 			iPos += 1
+		self.ev.flush()
 
-		idx = 0 # Current position in the menu
-		curr_enc = self.enc.position
-		while True:
-			if self.enc.button:
-				return options[idx][0] # return the Key
-			if self.enc.position == curr_enc:
-				continue
-			_dir = 1 if self.enc.position > curr_enc else -1 
-			# clear current label
-			self.lcd.print( options[idx][1].replace('[',' ').replace(']',' '), options[idx][2] )
-			idx = idx + _dir 
-			# limit the new value
-			if idx > len(options)-1:
-				idx = 0
-			elif idx < 0:
-				idx = len(options)-1
-			# select new label
-			self.lcd.print( options[idx][1], options[idx][2] )
-			time.sleep_ms( 100 )
-			curr_enc = self.enc.position
-
+	def _menu_move( self, options, idx, delta ):
+		""" Move the selection by delta entries, returns the new index """
+		# clear current label
+		self.lcd.print( options[idx][1].replace('[',' ').replace(']',' '), options[idx][2] )
+		idx = (idx + delta) % len(options)
+		# select new label
+		self.lcd.print( options[idx][1], options[idx][2] )
+		return idx
 
-	def int_select( self, label, format_str, value, imin=0, imax=250, istep=5 ):
-		""" options are [ (code,label,(x,y)) ]	"""
+	def _int_show( self, label, format_str, value ):
 		self.lcd.clear()
 		self.lcd.print( label, (0,0) )
 		self.lcd.print( format_str % value, (0,1) )
 
-		# Wait release of the button
-		while self.enc.button:
-			pass
+	def menu_select( self, options, clear=True ):
+		""" options are [ (code,label,(x,y)) ]	"""
+		self._menu_draw( options, clear )
+		idx = 0 # Current position in the menu
+		while True:
+			kind, value = self.next_event()
+			if kind == EV_PRESS:
+				return options[idx][0] # return the Key
+			if kind == EV_TURN:
+				idx = self._menu_move( options, idx, value )
 
-		curr_enc = self.enc.position
+	def int_select( self, label, format_str, value, imin=0, imax=250, istep=5 ):
+		""" Select an integer value with the encoder """
+		self._int_show( label, format_str, value )
+		self.wait_release()
+		self.ev.flush()
 		while True:
-			if self.enc.button:
-				return value # return the Key
-			if self.enc.position == curr_enc:
-				continue
-			_dir = 1 if self.enc.position > curr_enc else -1 
-			# Write the new value
-			value = value + _dir*istep
-			# limit the new value
-			if value >= imax:
-				value = imax
-			if value <= imin:
-				value = imin
-			# Print the new value
-			self.lcd.print( format_str % value, (0,1) )
-			time.sleep_ms( 100 )
-			curr_enc = self.enc.position
+			kind, delta = self.next_event()
+			if kind == EV_PRESS:
+				return value
+			if kind == EV_TURN:
+				value = min( imax, max( imin, value + delta*istep ) )
+				self.lcd.print( format_str % value, (0,1) )
 
 	def confirm_select( self, label ):
 		""" Response True/False """
 		self.lcd.clear()
 		self.lcd.print( label[:15], (0,0) )
-		# Wait release of the button
-		while self.enc.button:
-			pass
+		self.wait_release()
 		# Request confirmation
-		return self.menu_select( [(True,'[Yes]',(0,1)), (False,'[No]',(12,1)) ], clear=False )
\ No newline at end of file
+		return self.menu_select( [(True,'[Yes]',(0,1)), (False,'[No]',(12,1)) ], clear=False )
+
+	# --- uasyncio versions: the CPU sleeps until the encoder changes ---
+	async def amenu_select( self, options, clear=True, idle_cb=None, idle_ms=500 ):
+		""" options are [ (code,label,(x,y)) ]
+		    idle_cb() is called every idle_ms without encoder event, a value other than None is returned as the choice """
+		self._menu_draw( options, clear )
+		idx = 0 # Current position in the menu
+		while True:
+			if idle_cb == None:
+				kind, value = await self.ev.next()
+			else:
+				try:
+					kind, value = await asyncio.wait_for_ms( self.ev.next(), idle_ms )
+				except asyncio.TimeoutError:
+					_choice = idle_cb()
+					if _choice != None:
+						return _choice
+					continue
+			if kind == EV_PRESS:
+				return options[idx][0] # return the Key
+			if kind == EV_TURN:
+				idx = self._menu_move( options, idx, value )
+
+	async def aint_select( self, label, format_str, value, imin=0, imax=250, istep=5 ):
+		""" Select an integer value with the encoder """
+		self._int_show( label, format_str, value )
+		await self.ev.wait_release()
+		self.ev.flush()
+		while True:
+			kind, delta = await self.ev.next()
+			if kind == EV_PRESS:
+				return value
+			if kind == EV_TURN:
+				value = min( imax, max( imin, value + delta*istep ) )
+				self.lcd.print( format_str % value, (0,1) )
+
+	async def aconfirm_select( self, label ):
+		""" Response True/False """
+		self.lcd.clear()
+		self.lcd.print( label[:15], (0,0) )
+		await self.ev.wait_release()
+		return await self.amenu_select( [(True,'[Yes]',(0,1)), (False,'[No]',(12,1)) ], clear=False )
@@ -0,0 +1,132 @@
+""" Reflow profiles stored on the flash, loaded one at a time
+
+	profiles/index.json      [["SnCu", "sncu.json", 227], ["SAC305", "sac305.json", 217], ...] (menu order)
+	profiles/<file>.json     [[150, 90], [180, 90], [245, 45], [245, 30], [200, 45]]
+
+	A phase is (target Temp, seconds to reach it [, PID period in ms or null
+	[, [Kp, Ki, Kd]]]), see PROFILE_SNCU in main.py. The descending end of a
+	profile is its cool-down ramp (see trajectory.py). The third (optional)
+	field of an index entry is the liquidus of the alloy, used by the run
+	history (see history.py).
+
+	The menu only reads the index (the names). The phases of a profile are
+	read and validated when it is selected, then compiled by the follower
+	into the preallocated arrays of a Trajectory (Trajectory.load): the
+	library does not use RAM until a profile is used.
+"""
+import json
+import os
+
+INDEX = 'index.json'
+MAX_PHASES = 12
+NAME_LEN = 6 # the [Reflow] menu shows 2 names per row of the 16 columns LCD: '[SAC305]'
+
+def _number( value ):
+	return isinstance( value, (int, float) ) and not isinstance( value, bool )
+
+def validate( phases, max_temp ):
+	""" Phases read from JSON as a list of tuples. Raises ValueError (with the phase index) when a phase is wrong """
+	if not isinstance( phases, (list, tuple) ):
+		raise ValueError( 'not a list of phases' )
+	if not phases:
+		raise ValueError( 'empty profile' )
+	if len( phases ) > MAX_PHASES:
+		raise ValueError( 'more than %i phases' % MAX_PHASES )
+	_profile = []
+	for _i, _phase in enumerate( phases ):
+		if not isinstance( _phase, (list, tuple) ) or not( 2 <= len(_phase) <= 4 ):
+			raise ValueError( 'phase %i: bad phase %r' % (_i, _phase) )
+		_phase = tuple( _phase )
+		if not _number( _phase[0] ) or not( 0 < _phase[0] < max_temp ) or not _number( _phase[1] ) or not( _phase[1] > 0 ):
+			raise ValueError( 'phase %i: bad phase %r' % (_i, _phase) )
+		if (len(_phase) > 2) and (_phase[2] != None) and not( _number( _phase[2] ) and (50 <= _phase[2] <= 10000) ):
+			raise ValueError( 'phase %i: bad period %r' % (_i, _phase) )
+		if len(_phase) > 3:
+			if not isinstance( _phase[3], (list, tuple) ) or (len( _phase[3] ) != 3) or not all( _number( _k ) for _k in _phase[3] ):
+				raise ValueError( 'phase %i: bad gains %r' % (_i, _phase) )
+			_phase = _phase[:3] + (tuple( _phase[3] ),)
+		_profile.append( _phase )
+	return _profile
+
+class ProfileStore:
+	def __init__( self, path='profiles', max_temp=380 ):
+		self.path = path
+		self.max_temp = max_temp
+		self._index = None # [[name, file]] read on the first use
+
+	def _file( self, name ):
+		return self.path + '/' + name
+
+	def index( self ):
+		""" [[name, file], ...] of the flash (empty without index) """
+		if self._index == None:
+			try:
+				with open( self._file( INDEX ) ) as f:
+					self._index = json.load( f )
+			except (OSError, ValueError):
+				self._index = []
+		return self._index
+
+	def names( self ):
+		return [ _entry[0] for _entry in self.index() ]
+
+	def liquidus( self, name ):
+		""" Liquidus (C) given by the index for the profile name, None when unknown """
+		for _entry in self.index():
+			if (_entry[0] == name) and (len( _entry ) > 2):
+				return _entry[2]
+		return None
+
+	def load( self, name ):
+		""" Validated phases of the profile name, None when not on the flash. Raises ValueError on a bad file """
+		for _entry in self.index():
+			if _entry[0] == name:
+				_file = _entry[1]
+				try:
+					with open( self._file( _file ) ) as f:
+						return validate( json.load( f ), self.max_temp )
+				except OSError:
+					raise ValueError( 'missing %s' % _file )
+		return None
+
+	def save( self, name, phases, liquidus=None ):
+		""" Write (or replace) a profile and add it to the index. Returns the validated phases.
+		    liquidus None: the one of the replaced profile is kept """
+		if not( 0 < len( name ) <= NAME_LEN ):
+			raise ValueError( 'profile name longer than %i' % NAME_LEN )
+		_profile = validate( phases, self.max_temp )
+		if liquidus == None:
+			liquidus = self.liquidus( name )
+		_names = self.names()
+		_pos = _names.index( name ) if name in _names else len( _names ) # a replaced profile keeps its menu place
+		_index = [ _entry for _entry in self.index() if _entry[0] != name ]
+		_file = (''.join( c for c in name.lower() if c.isalpha() or c.isdigit() ) or 'profile') + '.json'
+		while _file in [ _entry[1] for _entry in _index ]:
+			_file = '_' + _file
+		try:
+			os.mkdir( self.path )
+		except OSError:
+			pass # exists
+		with open( self._file( _file ), 'w' ) as f:
+			json.dump( _profile, f )
+		_index.insert( _pos, [name, _file] if liquidus == None else [name, _file, liquidus] )
+		self._write_index( _index )
+		return _profile
+
+	def remove( self, name ):
+		_index = self.index()
+		for _entry in _index:
+			if _entry[0] == name:
+				_index.remove( _entry )
+				self._write_index( _index )
+				try:
+					os.remove( self._file( _entry[1] ) )
+				except OSError:
+					pass
+				return True
+		return False
+
+	def _write_index( self, index ):
+		with open( self._file( INDEX ), 'w' ) as f:
+			json.dump( index, f )
+		self._index = index
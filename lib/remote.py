@@ -0,0 +1,54 @@
+""" Remote control over the USB serial: one request per line, one reply per request
+
+	Request : <id> <command> [arguments]     (id: integer chosen by the client)
+	Reply   : #RC <id> OK <json>   or   #RC <id> ERR <message>
+
+	The replies share the serial line with the telemetry ("#TL" lines or raw
+	frames, see tlog.py) and the other prints: the client only keeps the #RC
+	lines. Lines which do not start with an id are ignored.
+
+	A command is a method cmd_<command>( args ) of the handler (main.App)
+	receiving the rest of the line (str). It returns a JSON value or raises
+	ValueError with the message sent back. A command must not block: long
+	operations (reflow, preheat, cooling) are started as uasyncio tasks.
+"""
+import sys
+import json
+import uasyncio as asyncio
+
+REPLY_TAG = '#RC'
+
+class RemoteControl:
+	def __init__( self, handler, stream=None ):
+		self.handler = handler
+		self.stream = stream if stream != None else sys.stdin
+
+	def handle( self, line ):
+		""" Execute a request line, returns the reply line (None: not a request) """
+		if isinstance( line, bytes ):
+			line = line.decode()
+		_words = line.strip().split( None, 2 )
+		if len(_words) < 2:
+			return None
+		try:
+			_id = int( _words[0] )
+		except ValueError:
+			return None
+		_func = getattr( self.handler, 'cmd_' + _words[1].lower(), None )
+		if _func == None:
+			return '%s %i ERR unknown command %s' % (REPLY_TAG, _id, _words[1])
+		try:
+			return '%s %i OK %s' % (REPLY_TAG, _id, json.dumps( _func( _words[2] if len(_words) > 2 else '' ) ))
+		except (ValueError, TypeError, KeyError, IndexError) as e:
+			return '%s %i ERR %s' % (REPLY_TAG, _id, e)
+
+	async def run( self ):
+		""" Serve the requests until the end of the stream (never on the Pico) """
+		_reader = asyncio.StreamReader( self.stream )
+		while True:
+			_line = await _reader.readline()
+			if not _line:
+				return
+			_reply = self.handle( _line )
+			if _reply != None:
+				print( _reply )
@@ -0,0 +1,71 @@
+""" Single owner of the MAX31855: timestamped samples at fixed rate, shared by every reader
+
+	A Timer reads the thermocouple every period_ms. The PID, the LCD loops and
+	the profile follower read the cached `value` (and its `age_ms`) instead of
+	doing their own SPI transaction, so the SPI bus is never used from two
+	contexts at the same time.
+
+	on_sample( value ) is called from the Timer on each fresh sample (eg: to
+	check the critical temperature). When the MAX31855 reports a fault (None),
+	the last good value is kept; after max_faults consecutive faults on_fault()
+	is called.
+"""
+from machine import Timer
+import time
+
+class TempSampler:
+	def __init__( self, tmc, period_ms=250, max_faults=4 ):
+		self.tmc = tmc
+		self.period_ms = period_ms
+		self.max_faults = max_faults
+		self.on_sample = None
+		self.on_fault = None
+		self.faults = 0 # consecutive faults
+		self.stats = None # optional tickstats.Histogram of the MAX31855 read duration (us)
+		self.samples = 0
+		self.value = tmc.temperature() or 0
+		self.ticks = time.ticks_ms()
+		self.timer = Timer(-1)
+		self.timer.init( mode=Timer.PERIODIC, period=period_ms, callback=self._sample )
+
+	def _sample( self, timer ):
+		if self.stats != None:
+			_start = time.ticks_us()
+			_t = self.tmc.temperature()
+			self.stats.add( time.ticks_diff( time.ticks_us(), _start ) )
+		else:
+			_t = self.tmc.temperature()
+		if _t == None:
+			self.faults += 1
+			if (self.faults >= self.max_faults) and (self.on_fault != None):
+				self.on_fault()
+			return
+		self.faults = 0
+		self.value = _t
+		self.ticks = time.ticks_ms()
+		self.samples += 1
+		if self.on_sample != None:
+			self.on_sample( _t )
+
+	def set_period( self, period_ms ):
+		""" Change the sampling rate (eg: oversampling for an estimator) """
+		self.period_ms = period_ms
+		if self.timer != None:
+			self.timer.init( mode=Timer.PERIODIC, period=period_ms, callback=self._sample )
+
+	def detach( self ):
+		""" Release the Timer: sample() is then called by the owner every period_ms (eg: dualcore.ControlCore) """
+		self.timer.deinit()
+		self.timer = None
+
+	def sample( self ):
+		self._sample( None )
+
+	@property
+	def age_ms( self ):
+		""" Age of the cached value """
+		return time.ticks_diff( time.ticks_ms(), self.ticks )
+
+	def stop( self ):
+		if self.timer != None:
+			self.timer.deinit()
@@ -0,0 +1,119 @@
+""" Heater drivers for a zero-cross SSR: sigma-delta modulation on mains half-cycle slots
+
+	Same API as LowFreqPWM ( duty_ratio( ratio ), deinit() ), so Plancha can
+	use one or the other (see Plancha.use_sigma_delta).
+
+	LowFreqPWM switches the SSR once per 1.5 s window: 1% steps of 15 ms,
+	a new duty waits for the next window and the energy comes in one block.
+	A zero-cross SSR can only switch on whole mains half-cycles (10 ms at
+	50 Hz) anyway, so SigmaDelta decides at every half-cycle slot:
+
+	  acc += duty ; if acc >= 100%: slot ON, acc -= 100%  else: slot OFF
+
+	The ON slots are spread as evenly as possible (error diffusion: 50% is
+	ON/OFF/ON/OFF), the duty resolution is 0.01% on average and a new duty
+	applies at the next slot (<= slot_ms; from OFF, the first slot is ON).
+	The accumulator is an int in 1/100 % so the Timer callback does not
+	allocate.
+
+	PioSigmaDelta (RP2040 only) computes the same bits but a PIO state
+	machine outputs them (20 PIO cycles per slot, slot_ms <= 10): the slots
+	are exactly slot_ms long whatever the load of the CPU. The bits are
+	pushed by groups of PIO_BITS, so a new duty applies within 2*PIO_BITS
+	slots. When the FIFO runs empty the PIO outputs OFF slots.
+"""
+from machine import Timer
+
+try:
+	import rp2
+except ImportError:
+	rp2 = None
+
+FULL = 10000 # 100% in 1/100 %
+PIO_BITS = 8
+
+class SigmaDelta:
+	def __init__( self, pin, slot_ms=10 ):
+		self.pin = pin
+		self.slot_ms = slot_ms
+		self.ratio = 0
+		self._duty = 0 # 1/100 %
+		self._acc = 0
+		self.pin.off()
+		self._timer = Timer(-1)
+		self._timer.init( mode=Timer.PERIODIC, period=slot_ms, callback=self._slot )
+
+	def _next_bit( self ):
+		self._acc += self._duty
+		if self._acc >= FULL:
+			self._acc -= FULL
+			return 1
+		return 0
+
+	def _slot( self, timer ):
+		if self._next_bit():
+			self.pin.on()
+		else:
+			self.pin.off()
+
+	def duty_ratio( self, ratio ):
+		""" ratio from 0 to 100%, applied at the next slot """
+		self.ratio = max( 0, min( 100, ratio ) )
+		_duty = int( self.ratio*100 )
+		if _duty == 0:
+			self._acc = 0
+			self.pin.off()
+		elif self._duty == 0:
+			self._acc = FULL - _duty # from OFF: the first slot is ON
+		self._duty = _duty
+
+	def deinit( self ):
+		self._timer.deinit()
+		self.pin.off()
+
+if rp2 != None:
+	@rp2.asm_pio( out_init=rp2.PIO.OUT_LOW, out_shiftdir=rp2.PIO.SHIFT_RIGHT )
+	def _slots():
+		mov( x, null )          # FIFO empty: OFF slots
+		wrap_target()
+		pull( noblock )
+		set( y, 7 )             # PIO_BITS-1
+		label( 'bit' )
+		out( pins, 1 )  [18]
+		jmp( y_dec, 'bit' )     # 20 cycles per slot
+		wrap()
+
+	class PioSigmaDelta( SigmaDelta ):
+		def __init__( self, pin, slot_ms=10, sm_id=0 ):
+			self.pin = pin
+			self.slot_ms = slot_ms
+			self.ratio = 0
+			self._duty = 0
+			self._acc = 0
+			self._sm = rp2.StateMachine( sm_id, _slots, freq=20000//slot_ms, out_base=pin )
+			self._sm.active( 1 )
+			self._timer = Timer(-1)
+			self._timer.init( mode=Timer.PERIODIC, period=slot_ms*PIO_BITS//2, callback=self._feed )
+
+		def _feed( self, timer ):
+			# Keep a single word ahead of the PIO: latency <= 2*PIO_BITS slots
+			if self._sm.tx_fifo() == 0:
+				_word = 0
+				for i in range( PIO_BITS ):
+					_word |= self._next_bit() << i
+				self._sm.put( _word )
+
+		def duty_ratio( self, ratio ):
+			self.ratio = max( 0, min( 100, ratio ) )
+			_duty = int( self.ratio*100 )
+			if _duty == 0:
+				self._acc = 0
+			elif self._duty == 0:
+				self._acc = FULL - _duty
+			self._duty = _duty
+
+		def deinit( self ):
+			self._timer.deinit()
+			self._sm.active( 0 )
+			self.pin.init( self.pin.OUT )
+			self.pin.off()
@@ -0,0 +1,108 @@
+""" Control tick instrumentation: lateness and stage durations in preallocated histograms
+
+	PID.control() calls TickStats.tick() with four ticks_us() stamps when
+	PID.stats is set (one `!= None` test per tick otherwise):
+
+	  late    : actual start of the tick - scheduled time (previous schedule + period)
+	  measure : measure_func() (and setpoint_func())
+	  law     : the PID computation
+	  output  : output_func() (logging + PWM)
+
+	Each Histogram counts microseconds in `bins` bins of `bin_us` (plus one
+	overflow bin) and tracks min/max: add() only does small int operations on
+	a preallocated array. Percentiles are computed on report().
+"""
+from array import array
+import time
+
+class Histogram:
+	def __init__( self, name, bin_us=50, bins=64 ):
+		self.name = name
+		self.bin_us = bin_us
+		self.bins = bins
+		self.counts = array( 'L', [0]*(bins+1) ) # last one: overflow
+		self.reset()
+
+	def reset( self ):
+		for i in range( self.bins+1 ):
+			self.counts[i] = 0
+		self.n = 0
+		self.min = 0
+		self.max = 0
+
+	def add( self, us ):
+		i = us // self.bin_us
+		if i < 0:
+			i = 0
+		elif i > self.bins:
+			i = self.bins
+		self.counts[i] += 1
+		if (self.n == 0) or (us < self.min):
+			self.min = us
+		if (self.n == 0) or (us > self.max):
+			self.max = us
+		self.n += 1
+
+	def percentile( self, p ):
+		""" Upper bound (us) of the bin holding the p percentile (0..100) """
+		_goal = self.n * p / 100
+		_sum = 0
+		for i in range( self.bins ):
+			_sum += self.counts[i]
+			if _sum >= _goal:
+				return min( (i+1) * self.bin_us, self.max )
+		return self.max
+
+	def mean( self ):
+		""" Approximated from the bins (middle of each bin, max for the overflow), within min..max """
+		if self.n == 0:
+			return 0
+		_sum = self.counts[self.bins] * self.max
+		for i in range( self.bins ):
+			_sum += self.counts[i] * (i*self.bin_us + self.bin_us//2)
+		return max( self.min, min( self.max, _sum / self.n ) )
+
+	def report( self ):
+		return '%-8s n=%6i min=%6i mean=%7.0f p99<=%6i max=%6i us' % (self.name, self.n, self.min, self.mean(), self.percentile(99), self.max)
+
+class TickStats:
+	def __init__( self, bin_us=50, bins=64 ):
+		self.late = Histogram( 'late', bin_us, bins )
+		self.measure = Histogram( 'measure', bin_us, bins )
+		self.law = Histogram( 'law', bin_us, bins )
+		self.output = Histogram( 'output', bin_us, bins )
+		self.histograms = (self.late, self.measure, self.law, self.output)
+		self.rebase()
+
+	def rebase( self ):
+		""" The next tick becomes the schedule reference (start, period change) """
+		self._period_us = 0
+		self._next = 0
+		self.last_late = 0 # last tick (us), also sent by the telemetry (tlog.py)
+		self.last_us = 0
+
+	def reset( self ):
+		for _h in self.histograms:
+			_h.reset()
+		self.rebase()
+
+	def tick( self, t0, t1, t2, t3, period_ms ):
+		_period = period_ms * 1000
+		if _period != self._period_us:
+			self._period_us = _period
+			self._next = t0
+		_late = time.ticks_diff( t0, self._next )
+		if _late < -(_period >> 1):
+			# restarted timer: new schedule
+			self._next = t0
+			_late = 0
+		self.late.add( _late )
+		self.last_late = _late
+		self.last_us = time.ticks_diff( t3, t0 )
+		self.measure.add( time.ticks_diff( t1, t0 ) )
+		self.law.add( time.ticks_diff( t2, t1 ) )
+		self.output.add( time.ticks_diff( t3, t2 ) )
+		self._next = time.ticks_add( self._next, _period )
+
+	def report( self ):
+		return [ _h.report() for _h in self.histograms ]
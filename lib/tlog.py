@@ -0,0 +1,116 @@
+""" Preallocated ring buffer of the regulation samples, sent as framed binary telemetry
+
+	add() is called from the PID tick: it only stores values into
+	preallocated arrays (no string formatting, no print, no allocation).
+	A low priority uasyncio task drains the buffer by frames:
+	  * to the serial line as "#TL <base64 frame>" lines (REPL friendly)
+	  * or raw to a binary stream: sys.stdout.buffer (USB serial) or a file
+	    on the flash.
+	host/telemetry.py reads the live stream, host/tlog_decode.py a capture.
+
+	Record (little endian, RECORD_SIZE bytes):
+	  uint16 seq, uint32 ticks_ms, int16 setpoint*16, int16 temperature*16,
+	  int16 estimate*16 (PID measure), uint16 duty*100 (%), uint8 phase,
+	  int16 lateness (us), uint16 duration (us) of the previous PID tick
+	  (0 when the tick instrumentation is off, see tickstats.py)
+
+	Frame: FRAME_HEAD (sync 0xA5 0x5A, version, number of records, uint16
+	dropped counter) + records + uint32 crc32 of head and records. The
+	sequence numbers reveal the frames lost on the link, `dropped` the
+	samples overwritten in the ring before being sent.
+
+	The writer (PID tick) and the reader (task) own their own counter so no
+	lock is needed. When the reader is too slow, the oldest samples are lost
+	and counted in `dropped`.
+"""
+from array import array
+import struct
+import ubinascii
+import uasyncio as asyncio
+
+RECORD_FMT = '<HIhhhHBhH'
+RECORD_SIZE = struct.calcsize( RECORD_FMT )
+FRAME_HEAD = '<2sBBH'
+FRAME_HEAD_SIZE = struct.calcsize( FRAME_HEAD )
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_VERSION = 2
+TEMP_SCALE = 16 # 1/16 C
+DUTY_SCALE = 100 # 1/100 %
+SERIAL_TAG = '#TL '
+
+def _clamp( value, low, high ):
+	return low if value < low else (high if value > high else value)
+
+class TempLog:
+	def __init__( self, size=128 ):
+		self.size = size
+		self.ticks = array( 'L', [0]*size )
+		self.setpoint = array( 'f', [0]*size )
+		self.temp = array( 'f', [0]*size )
+		self.estimate = array( 'f', [0]*size )
+		self.duty = array( 'f', [0]*size )
+		self.phase = array( 'B', [0]*size )
+		self.late = array( 'l', [0]*size )
+		self.tick_us = array( 'L', [0]*size )
+		self.written = 0 # Writer counter (PID tick)
+		self.read = 0 # Reader counter (drain task)
+		self.dropped = 0
+
+	def add( self, ticks, setpoint, temp, estimate, duty, phase=0, late=0, tick_us=0 ):
+		""" Store a sample. Called from the PID tick """
+		i = self.written % self.size
+		self.ticks[i] = ticks
+		self.setpoint[i] = setpoint
+		self.temp[i] = temp
+		self.estimate[i] = estimate
+		self.duty[i] = duty
+		self.phase[i] = phase
+		self.late[i] = late
+		self.tick_us[i] = tick_us
+		self.written += 1
+
+	def __len__( self ):
+		return self.written - self.read
+
+	def pop_into( self, buf, offset=0 ):
+		""" Pack the oldest samples into buf (bytearray) from offset. Returns the number of records """
+		_written = self.written
+		if _written - self.read > self.size: # overwritten by the writer
+			self.dropped += _written - self.read - self.size
+			self.read = _written - self.size
+		_n = min( _written - self.read, (len(buf)-offset) // RECORD_SIZE )
+		for k in range( _n ):
+			_seq = self.read+k
+			i = _seq % self.size
+			struct.pack_into( RECORD_FMT, buf, offset+k*RECORD_SIZE, _seq & 0xFFFF, self.ticks[i],
+				_clamp( int(self.setpoint[i]*TEMP_SCALE), -32768, 32767 ), _clamp( int(self.temp[i]*TEMP_SCALE), -32768, 32767 ),
+				_clamp( int(self.estimate[i]*TEMP_SCALE), -32768, 32767 ), _clamp( int(self.duty[i]*DUTY_SCALE), 0, 65535 ),
+				self.phase[i], _clamp( self.late[i], -32768, 32767 ), _clamp( self.tick_us[i], 0, 65535 ) )
+		self.read += _n
+		return _n
+
+	def pop_frame( self, buf ):
+		""" Build a frame of the oldest samples into buf. Returns its size in bytes (0: nothing to send) """
+		_n = self.pop_into( memoryview(buf)[:len(buf)-4], FRAME_HEAD_SIZE )
+		if _n == 0:
+			return 0
+		_end = FRAME_HEAD_SIZE + _n*RECORD_SIZE
+		struct.pack_into( FRAME_HEAD, buf, 0, FRAME_SYNC, FRAME_VERSION, _n, self.dropped & 0xFFFF )
+		struct.pack_into( '<I', buf, _end, ubinascii.crc32( memoryview(buf)[:_end] ) & 0xFFFFFFFF )
+		return _end + 4
+
+	async def drain( self, stream=None, batch=32, period_ms=500 ):
+		""" Low priority task: every period_ms, flush the samples to stream by frames of batch records (255 max).
+		    stream=None: serial line (base64 text). Otherwise a binary stream (sys.stdout.buffer, file opened in 'ab' mode) """
+		_buf = bytearray( FRAME_HEAD_SIZE + min(batch, 255)*RECORD_SIZE + 4 )
+		while True:
+			await asyncio.sleep_ms( period_ms )
+			while len(self):
+				_bytes = self.pop_frame( _buf )
+				if stream == None:
+					print( SERIAL_TAG + ubinascii.b2a_base64( memoryview(_buf)[:_bytes] ).decode().strip() )
+				else:
+					stream.write( memoryview(_buf)[:_bytes] )
+					if hasattr( stream, 'flush' ):
+						stream.flush()
+				await asyncio.sleep_ms( 0 ) # let the other tasks run between frames
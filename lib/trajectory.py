@@ -0,0 +1,122 @@
+""" Reflow profile compiled into a piecewise-linear setpoint trajectory
+
+	A profile is a list of phases (target Temp, seconds to reach it [, PID period in ms [, (Kp, Ki, Kd)]]).
+	A period of None keeps the default one; the gains override the PID gains during the phase.
+	Trajectory() compiles it once, from the current plate temperature, into
+	arrays of breakpoints (ms from start, temperature) with the slope of each
+	segment; load() compiles another profile into the same (preallocated,
+	see max_phases) arrays. setpoint() is then called by the PID on every tick: it only finds
+	the current segment (cached index) and applies temp + slope*(t - t0), so
+	the setpoint follows a smooth ramp instead of stairs.
+
+	The time base is time.ticks_ms(), phase boundaries are exact to the ms.
+
+	The trailing phases with descending targets are the cool-down ramp
+	(cool_down_start()): their slope is the maximum cooling rate, followed
+	by the fans (see cooldown.py) and, when the plate cools faster, by the
+	heater PID.
+
+	A profile is written for a cold plate. from_start() shortens its first
+	phase when the plate is already hot (batch mode standby): the ramp rate
+	of the first phase is kept instead of its duration.
+"""
+from array import array
+import time
+
+def cool_down_start( profile ):
+	""" Index of the first phase of the cool-down ramp (len( profile ): no ramp) """
+	i = len( profile )
+	while (i > 1) and (profile[i-1][0] < profile[i-2][0]):
+		i -= 1
+	return i
+
+def from_start( profile, start_temp, cold_temp=25, min_sec=5 ):
+	""" The profile started from start_temp instead of cold_temp. The first phase keeps
+	    its ramp rate (from cold_temp): its duration is scaled, min_sec at least """
+	_phase = profile[0]
+	if _phase[0] <= cold_temp:
+		return profile
+	_rate = (_phase[0]-cold_temp) / _phase[1] # C per sec
+	_sec = max( min_sec, min( _phase[1], abs( _phase[0]-start_temp ) / _rate ) )
+	return [ (_phase[0], _sec) + tuple( _phase[2:] ) ] + list( profile[1:] )
+
+class Trajectory:
+	def __init__( self, profile, start_temp, default_period=1000, lead_ms=0, max_phases=0 ):
+		""" max_phases > len( profile ): room to load() longer profiles later without allocation """
+		_n = max( len( profile ), max_phases )
+		self.lead_ms = lead_ms # setpoint() looks ahead to compensate the plate lag
+		self.default_period = default_period
+		self.t = array( 'l', [0]*(_n+1) ) # breakpoints: ms since start
+		self.temp = array( 'f', [0]*(_n+1) ) # temperature at breakpoints
+		self.slope = array( 'f', [0]*(_n+1) ) # C per ms for each segment (0 after the end)
+		self.period = array( 'H', [default_period]*_n ) # PID period per phase
+		self.gains = [None]*_n # PID gains per phase (None: the gains of the Plancha)
+		self.load( profile, start_temp )
+
+	def load( self, profile, start_temp ):
+		""" Compile profile into the arrays (no allocation), from start_temp """
+		_n = len( profile )
+		if _n > len( self.period ):
+			raise ValueError( 'more than %i phases' % len( self.period ) )
+		self.phases = _n
+		self.cool_from = cool_down_start( profile ) # first phase of the cool-down ramp
+		self.temp[0] = start_temp
+		for i in range( _n ):
+			_phase = profile[i]
+			if _phase[1] <= 0:
+				raise ValueError( 'phase %i: duration must be > 0' % i )
+			self.t[i+1] = self.t[i] + int( _phase[1]*1000 )
+			self.temp[i+1] = _phase[0]
+			self.slope[i] = (self.temp[i+1]-self.temp[i]) / (self.t[i+1]-self.t[i])
+			self.period[i] = _phase[2] if (len(_phase) > 2) and (_phase[2] != None) else self.default_period
+			self.gains[i] = _phase[3] if len(_phase) > 3 else None
+		self.slope[_n] = 0
+		self._start = None
+		self._idx = 0 # cached phase index
+		self._sidx = 0 # cached segment index for the setpoint sampling
+
+	@property
+	def duration_ms( self ):
+		return self.t[self.phases]
+
+	def start( self, ticks=None ):
+		self._start = time.ticks_ms() if ticks == None else ticks
+		self._idx = 0
+		self._sidx = 0
+
+	def elapsed_ms( self ):
+		return time.ticks_diff( time.ticks_ms(), self._start )
+
+	def _find( self, elapsed, i ):
+		# Segment containing elapsed, searching forward from i (time only moves forward)
+		if (i > 0) and (elapsed < self.t[i]):
+			i = 0
+		while (i < self.phases) and (elapsed >= self.t[i+1]):
+			i += 1
+		return i
+
+	def phase( self, elapsed=None ):
+		""" Index of the current phase, self.phases when the profile is over """
+		if elapsed == None:
+			elapsed = self.elapsed_ms()
+		self._idx = self._find( elapsed, self._idx )
+		return self._idx
+
+	def at( self, elapsed ):
+		""" Setpoint at elapsed ms since start """
+		self._sidx = i = self._find( elapsed, self._sidx )
+		if i >= self.phases:
+			return self.temp[self.phases]
+		return self.temp[i] + self.slope[i]*(elapsed - self.t[i])
+
+	def slope_at( self, elapsed ):
+		""" Slope of the setpoint (C per ms) at elapsed ms since start """
+		return self.slope[ self._find( elapsed, self._sidx ) ]
+
+	def setpoint( self ):
+		""" Setpoint now (PID setpoint_func) """
+		return self.at( self.elapsed_ms() + self.lead_ms )
+
+	@property
+	def finished( self ):
+		return self.phase() >= self.phases
@@ -0,0 +1,262 @@
+""" Several heating zones: one thermocouple, one SSR and one PID state per zone
+
+	ZoneBank regulates every zone from a single Timer callback:
+	  1. MAX31855Bank reads all the thermocouples back to back (one SPI
+	     burst into a preallocated buffer, one chip select per zone),
+	  2. the PID law of pid.py (float mode) runs for every zone on
+	     array-backed state (array 'f', index = zone): no PID object and
+	     no Timer per zone,
+	  3. optional cross-zone coupling compensation: a zone also heats its
+	     neighbours, coupling[i][j] is the share of the duty of zone j seen
+	     by zone i. The PID outputs go through the static decoupler
+	     (I + coupling)^-1 so that the power received by each zone is the
+	     one asked by its PID: out = D * pid (n x n, array 'f'). The
+	     anti-windup then works on the applied (decoupled, clamped) output:
+	     a zone does not integrate while its output is saturated in the
+	     direction of its error (eg: a cool zone heated by its neighbours
+	     with its SSR already off)
+	  4. each zone drives its own LowFreqPWM.
+
+	A zone with a setpoint <= 0 is off (output 0, integral cleared). The
+	critical temperature is checked on every zone at each tick.
+"""
+from machine import Timer
+from array import array
+
+class MAX31855Bank:
+	""" Several MAX31855 on the same SPI bus, read in one burst """
+	def __init__( self, spi, cs_pins ):
+		self.spi = spi
+		self.cs = cs_pins
+		self.count = len( cs_pins )
+		self._buf = bytearray( 4*self.count )
+		_mv = memoryview( self._buf )
+		self._frames = [ _mv[4*i:4*i+4] for i in range(self.count) ]
+		self.values = array( 'f', [0]*self.count ) # last good value per zone (C)
+		self.faults = array( 'B', [0]*self.count ) # consecutive faults per zone
+		for _cs in cs_pins:
+			_cs.on()
+
+	def read_all( self ):
+		""" Read every chip then decode. A fault keeps the last good value """
+		for i in range( self.count ):
+			self.cs[i].off()
+			self.spi.readinto( self._frames[i] )
+			self.cs[i].on()
+		_buf = self._buf
+		for i in range( self.count ):
+			_hi = (_buf[4*i] << 8) | _buf[4*i+1] # D31..D16: 14 bits temperature, D16 fault
+			if _hi & 1:
+				if self.faults[i] < 255:
+					self.faults[i] += 1
+				continue
+			self.faults[i] = 0
+			_t = _hi >> 2
+			if _t & 0x2000:
+				_t -= 0x4000
+			self.values[i] = _t * 0.25
+
+class ZoneBank:
+	def __init__( self, sensors, pwms, Kp, Ki, Kd, dt=1000, output_min=0, output_max=100, coupling=None ):
+		self.sensors = sensors # MAX31855Bank
+		self.pwms = pwms
+		self.n = len( pwms )
+		self.output_min = output_min
+		self.output_max = output_max
+		self.period_ms = dt
+		self.dt = dt / 1000
+		self.critical_temp = None
+		self.on_critical = None # function( zone ) called when a zone reaches critical_temp
+		self.max_faults = 4
+		self.on_fault = None # function( zone ) after max_faults consecutive thermocouple faults
+		self.setpoint_func = None # common setpoint (eg: Trajectory.setpoint), plus offset[zone]
+		_n = self.n
+		self.setpoint = array( 'f', [0]*_n )
+		self.offset = array( 'f', [0]*_n )
+		self.measure = self.sensors.values
+		self.error = array( 'f', [0]*_n )
+		self._off = bytearray( [1]*_n ) # zone off on the previous tick: no derivative on its first tick
+		self._share = bytearray( _n ) # i_term holds the share of a gain switch, still unwinding (see set_gains)
+		self.i_term = array( 'f', [0]*_n )
+		self.output = array( 'f', [0]*_n )
+		self._pid = array( 'f', [0]*_n ) # PID outputs before the coupling compensation
+		self._i_max = array( 'f', [output_max]*_n ) # integral limit: power asked to a zone, its own and the one of its neighbours
+		self.Kp = array( 'f', [0]*_n )
+		self.Ki = array( 'f', [0]*_n )
+		self.Kd = array( 'f', [0]*_n )
+		self._ki_dt = array( 'f', [0]*_n )
+		self._kd_dt = array( 'f', [0]*_n )
+		self.coupling = None
+		self.set_coupling( coupling )
+		for i in range( _n ):
+			self.update_gains( i, Kp, Ki, Kd )
+		self.sensors.read_all()
+		self.timer = Timer(-1)
+		self.timer.init( mode=Timer.PERIODIC, period=dt, callback=self.control )
+
+	def update_gains( self, zone, Kp, Ki, Kd ):
+		""" Change the gains of a zone. Prepare the per-tick constants """
+		self.Kp[zone] = Kp
+		self.Ki[zone] = Ki
+		self.Kd[zone] = Kd
+		self._ki_dt[zone] = Ki * self.dt
+		self._kd_dt[zone] = Kd / self.dt
+
+	def set_gains( self, zone, Kp, Ki, Kd ):
+		""" Bumpless change of the gains of a zone while regulating (see PID.set_gains) """
+		if not self._off[zone]:
+			_i = self.i_term[zone] + (self.Kp[zone] - Kp) * self.error[zone]
+			_span = self.output_max - self.output_min
+			self.i_term[zone] = max( self.output_min - _span, min( self.output_max + _span, _i ) )
+			self._share[zone] = 1
+		self.update_gains( zone, Kp, Ki, Kd )
+
+	def set_coupling( self, coupling ):
+		""" coupling: n x n matrix (list of rows) or None. The diagonal is ignored.
+		    The decoupler (I + coupling)^-1 is computed here, out of the tick """
+		_n = self.n
+		if coupling == None:
+			self.coupling = None
+			for i in range( _n ):
+				self._i_max[i] = self.output_max
+			return
+		for i in range( _n ):
+			self._i_max[i] = self.output_max * (1 + sum( coupling[i][j] for j in range(_n) if j != i ))
+		# Gauss-Jordan on [ I + coupling | I ]
+		_m = [ [ (1 if i == j else coupling[i][j]) for j in range(_n) ] + [ (1 if i == j else 0) for j in range(_n) ] for i in range(_n) ]
+		for k in range( _n ):
+			_pivot = max( range(k, _n), key=lambda r: abs(_m[r][k]) )
+			if abs( _m[_pivot][k] ) < 1e-6:
+				raise ValueError( 'coupling matrix not invertible' )
+			_m[k], _m[_pivot] = _m[_pivot], _m[k]
+			_d = _m[k][k]
+			_m[k] = [ v/_d for v in _m[k] ]
+			for r in range( _n ):
+				if r != k:
+					_f = _m[r][k]
+					_m[r] = [ a - _f*b for a, b in zip( _m[r], _m[k] ) ]
+		_c = array( 'f', [0]*(_n*_n) )
+		for i in range( _n ):
+			for j in range( _n ):
+				_c[i*_n+j] = _m[i][_n+j]
+		self.coupling = _c
+
+	def set_period( self, dt ):
+		""" Change the control period (in ms) while regulating """
+		self.period_ms = dt
+		self.dt = dt / 1000
+		for i in range( self.n ):
+			self.update_gains( i, self.Kp[i], self.Ki[i], self.Kd[i] )
+		if self.timer != None:
+			self.timer.init( mode=Timer.PERIODIC, period=dt, callback=self.control )
+
+	def set( self, zone, value ):
+		""" Fixed setpoint of a zone (0: zone off) """
+		self.setpoint_func = None
+		self.setpoint[zone] = value
+
+	def set_all( self, value ):
+		self.setpoint_func = None
+		for i in range( self.n ):
+			self.setpoint[i] = value
+
+	def follow( self, setpoint_func, offsets=None ):
+		""" Every zone follows setpoint_func() (eg: Trajectory.setpoint) plus its offset (C) """
+		for i in range( self.n ):
+			self.offset[i] = offsets[i] if offsets != None else 0
+		self.setpoint_func = setpoint_func
+
+	def stop( self ):
+		self.setpoint_func = None
+		for i in range( self.n ):
+			self.setpoint[i] = 0
+			self.i_term[i] = 0
+			self.output[i] = 0
+			self.pwms[i].duty_ratio( 0 )
+
+	def deinit( self ):
+		self.stop()
+		if self.timer != None:
+			self.timer.deinit()
+			self.timer = None
+
+	def control( self, timer ):
+		self.sensors.read_all()
+		_n = self.n
+		_setpoint = self.setpoint
+		_measure = self.measure
+		_faults = self.sensors.faults
+		if self.setpoint_func != None:
+			_common = self.setpoint_func()
+			for i in range( _n ):
+				_setpoint[i] = _common + self.offset[i]
+		_c = self.coupling
+		for i in range( _n ):
+			if (self.critical_temp != None) and (_measure[i] >= self.critical_temp) and (self.on_critical != None):
+				self.on_critical( i )
+			if (_faults[i] >= self.max_faults) and (self.on_fault != None):
+				self.on_fault( i )
+			if _setpoint[i] <= 0:
+				self.i_term[i] = 0
+				self._pid[i] = 0
+				self._off[i] = 1
+				continue
+			error = _setpoint[i] - _measure[i]
+			if self._off[i]:
+				# back on: error[i] is the one of its last tick on (or 0), the derivative would kick
+				self.error[i] = error
+				self._off[i] = 0
+			proportional = self.Kp[i] * error
+			if _c != None:
+				# Decoupled: the integral is updated below, from the applied output
+				self._pid[i] = proportional + self.i_term[i] + self._kd_dt[i] * (error - self.error[i])
+				self.error[i] = error
+				continue
+			# Prevent integral windup, the share of a bumpless set_gains unwinds (see PID.control)
+			_i = self.i_term[i]
+			if (proportional > self.output_max) or (proportional < self.output_min):
+				if self._share[i] and ((_i < 0) == (proportional > self.output_max)):
+					_new = _i + self._ki_dt[i] * error
+					_i = 0 if (_new < 0) != (_i < 0) else _new
+				else:
+					_i = 0
+				if _i == 0:
+					self._share[i] = 0
+			else:
+				_new = _i + self._ki_dt[i] * error
+				if (_new > self.output_max) and (_new > _i):
+					_new = max( _i, self.output_max )
+				elif (_new < self.output_min) and (_new < _i):
+					_new = min( _i, self.output_min )
+				_i = _new
+				if self.output_min <= _i <= self.output_max:
+					self._share[i] = 0
+			self.i_term[i] = _i
+			output = proportional + self.i_term[i] + self._kd_dt[i] * (error - self.error[i])
+			if output > self.output_max:
+				output = self.output_max
+			elif output < self.output_min:
+				output = self.output_min
+			self._pid[i] = output
+			self.error[i] = error
+		for i in range( _n ):
+			output = self._pid[i]
+			if (_c != None) and (_setpoint[i] > 0):
+				output = 0
+				for j in range( _n ):
+					output += _c[i*_n+j] * self._pid[j]
+				# Prevent integral windup on the applied output
+				error = self.error[i]
+				if not( ((output >= self.output_max) and (error > 0)) or ((output <= self.output_min) and (error < 0)) ):
+					_i = self.i_term[i] + self._ki_dt[i] * error
+					if _i > self._i_max[i]:
+						_i = self._i_max[i]
+					elif _i < self.output_min:
+						_i = self.output_min
+					self.i_term[i] = _i
+			if output > self.output_max:
+				output = self.output_max
+			elif output < self.output_min:
+				output = self.output_min
+			self.output[i] = output
+			self.pwms[i].duty_ratio( int(output) )
@@ -1,203 +1,540 @@
+import time
+_main_ms = time.ticks_ms() # main.py started (boot report, see App.boot_report)
 from plancha import Plancha
+from trajectory import Trajectory, from_start
+from gains import load_gains
+from profiles import ProfileStore, MAX_PHASES, NAME_LEN
+from history import RunRecorder, RunHistory
 from machine import reset
 from micropython import alloc_emergency_exception_buf
-import time
+import uasyncio as asyncio
+import sys
+import json
+import gc
+_imported_ms = time.ticks_ms()
 
 alloc_emergency_exception_buf( 100 )
 
 COOLING_MIN_T = 35 # Cooling stops under 35°C
+STANDBY_T = 100 # Batch mode: the plate is cooled to and held at this temperature between two boards
+PROFILE_COLD_T = 25 # Start temperature the profiles are written for (batch mode shortens the first phase of a hot plate)
 CRITICAL_T = 380 # Heating MUST STOP & booard resets
 
-PROFILE_SUBSTEP_SEC = 5 # We make a temperature update every x second
-PROFILE_SNCU = [(150,90),(180,90),(245,45),(245,30)] # (target Temp, time (in sec) to reach the temperature)
+PROFILE_SUBSTEP_SEC = 5 # Progress message every x second
+PROFILE_LEAD_MS = 8000 # The PID setpoint looks ahead on the profile to compensate the plate lag
+PID_DT = 1000 # Default PID control period (ms)
+USE_ESTIMATOR = False # Feed the PID with the AlphaBeta estimate (10 Hz oversampling) and its rate as derivative
+PID_GAINS = (1.95, 0.0125, 4.5) # (Kp, Ki, Kd) used until an autotune stored the plate gains in pid.json
+USE_FEEDFORWARD = False # Add the duty predicted by the plate model FF_MODEL to the PID output
+FF_MODEL = (23.546, 440, 3) # (K C per %, tau sec, theta sec) fitted on docs/test-ramp.zip by host/fit_fopdt.py
+TELEMETRY_BINARY = False # Regulation samples as raw binary frames on the USB serial (host/telemetry.py) instead of "#TL" text lines
+TICK_STATS = False # PID tick lateness & durations histograms, dump with app.p.tick_report() at the REPL
+REMOTE_CONTROL = False # Accept the commands of host/fleet.py on the USB serial (see lib/remote.py)
+SSR_SIGMA_DELTA = False # Drive the SSR by 10 ms mains half-cycles (lib/ssr.py) instead of the 1.5 s LowFreqPWM window
+USE_CORE1 = False # Sampling, PID, critical check and heater PWM on the second core (see lib/dualcore.py)
+PID_SCHEDULE = [(170, 1.2, 0.6, 2.2), (CRITICAL_T, 1.0, 1.0, 2.5)] # (upper setpoint, factors of Kp, Ki, Kd) tuned around PID_GAINS only (autotuned gains run unscheduled). None: a single gain set
+AUTOTUNE_T = 150 # Relay oscillation around this temperature
+PROFILE_SNCU = [(150,90),(180,90),(245,45),(245,30),(200,45)] # (target Temp, time (in sec) to reach the temperature [, PID period in ms or None [, (Kp, Ki, Kd)]]), descending end: cool-down ramp
+COOL_GAINS = (10, 0.2) # (Kp, Ki) of the fans on the cool-down ramp (% per C)
+COOL_HANDOVER_MS = 10000 # Fans saturated that long: the ramp is left for free cooling (fans full on)
+PROFILES = [('SnCu', PROFILE_SNCU)] # Built-in reflow profiles, used when the flash has no profile of this name
+PROFILE_DIR = 'profiles' # Profile library on the flash: index.json + one JSON file per profile (see lib/profiles.py)
+HISTORY_DIR = 'history' # Summary of every profile run on the flash (see lib/history.py)
 
 
 class App:
 	def __init__( self ):
 		self.p = Plancha()
-		self.p.setup_pid( Kp=1.95, Ki=0.0125, Kd=4.5 )
+		Kp, Ki, Kd = load_gains( PID_GAINS )
+		self.p.setup_pid( Kp=Kp, Ki=Ki, Kd=Kd, dt=PID_DT )
+		if (PID_SCHEDULE != None) and ((Kp, Ki, Kd) == tuple( PID_GAINS )):
+			self.p.set_schedule( PID_SCHEDULE ) # the factors were tuned for PID_GAINS, not for the gains of pid.json
 		self.p.critical_temp = CRITICAL_T # PID will raise exception at 270°
+		if USE_ESTIMATOR:
+			self.p.enable_estimator()
+		if USE_FEEDFORWARD:
+			self.p.enable_feedforward( *FF_MODEL )
+		if TICK_STATS:
+			self.p.instrument()
+		if SSR_SIGMA_DELTA and not USE_CORE1:
+			self.p.use_sigma_delta()
+		if USE_CORE1:
+			self.p.start_core1()
+		self.store = ProfileStore( PROFILE_DIR, max_temp=CRITICAL_T ) # remote uploads are saved there
+		self.traj = Trajectory( (), 0, default_period=PID_DT, max_phases=MAX_PHASES ) # the selected profile is compiled into it
+		self.history = RunHistory( HISTORY_DIR )
+		self.recorder = RunRecorder( lambda: self.p.temperature, lambda: self.p.duty ) # metrics of the profile in progress
+		self.state = 'menu' # operation in progress, reported to the remote control
+		self.profile = None # name of the reflow profile in progress
+		self._job = None # task of the menu or of a remote operation
+		self._next = None # operation requested by the remote control
+		self.cycles = 0 # boards done by the current (or last) batch
+		self.cycle_ms = 0 # duration of the last batch cycle: start -> back at STANDBY_T
+		self._batch_start = 0 # ticks_ms of the first board of the batch
+		self._trigger = False # remote [Next] in standby
+		self.boot = None # boot timing & heap (see boot_report)
 
-	def smart_sleep_ms( self, ms ):
-		""" Wait for given time or the encoder button pressed """
-		_start = time.ticks_ms()
-		while time.ticks_diff( time.ticks_ms(), _start )<ms:
-			if self.p.enc.button:
-				break
-			time.sleep_ms( 50 )
+	def boot_report( self ):
+		""" Times since the reset (ms): main.py started, imports done, first LCD frame, ready.
+		    Printed as a "#BT" line with the free heap, also returned by the remote "boot" command """
+		gc.collect()
+		self.boot = { 'main_ms': _main_ms, 'imported_ms': _imported_ms, 'first_frame_ms': self.p.first_frame_ms,
+			'ready_ms': time.ticks_ms(), 'mem_free': gc.mem_free(), 'mem_alloc': gc.mem_alloc() }
+		print( '#BT main %i ms, imports %i ms, first frame %i ms, ready %i ms, heap free %i alloc %i' % (self.boot['main_ms'],
+			self.boot['imported_ms'], self.boot['first_frame_ms'], self.boot['ready_ms'], self.boot['mem_free'], self.boot['mem_alloc']) )
+		return self.boot
+
+	def profile_names( self ):
+		""" Profiles of the flash then the built-in ones (PROFILES) """
+		_names = self.store.names()
+		return _names + [ _name for _name, _profile in PROFILES if _name not in _names ]
+
+	def find_profile( self, name ):
+		""" Phases of the profile (loaded from the flash), None when unknown. Raises ValueError on a bad file """
+		_profile = self.store.load( name )
+		if _profile != None:
+			return _profile
+		for _name, _profile in PROFILES:
+			if _name == name:
+				return _profile
+		return None
 
-	def cooling( self, cooling_stop_t=-1 ):
+	async def cooling( self, cooling_stop_t=-1 ):
 		# Cooling stop when:
 		#   1. temperature falls under cooling_stop_t
-        #   2. the button is pressed
+		#   2. the button is pressed
 		#
 		# Cooling (NO automatic stop)
+		self.state = 'cooling'
 		self.p.lcd.clear()
 		self.p.lcd.print( "Cooling...", (0,0) )
 		self.p.enc.color = (0,0,255)
 		self.p.cooling.on()
-		# wait release
-		while self.p.enc.button:
-			pass
+		await self.p.ev.wait_release()
 		while True:
 			_t = self.p.temperature
 			self.p.lcd.print( "temp: %3i C" % _t, (0,1) )
-			if self.p.enc.button or (_t<cooling_stop_t ):
-				while self.p.enc.button:
-					pass
-				self.p.cooling.off()
-				break;
-			self.smart_sleep_ms( 500 )
-
-
-
-	def profile_heating( self, profile, progress_cb=None ):
-		""" Follow a profile heating. See PROFILE_SN0 for info. 
-		    progess_cb is called every PROFILE_SUBSTEP_SEC. Must be a function(str) to capture profile follower debug message. """
-		current_temp = self.p.temperature
-		phase_start_sec = time.time()
-		phase_start_ms  = time.ticks_ms()
-		previous_temp = None
-		for target_temp, target_seconds in profile:
-			if progress_cb!=None:
-				#progress_cb( 'Profile Stage to %3i C in %i seconds' % (target_temp, target_seconds) )
-				progress_cb( 'Phs %3i C..%3is' % (target_temp, target_seconds) )
-			temp_delta_per_second = (target_temp-current_temp)/target_seconds
-			# calculate temps to reach @ next_target_ms
-			sub_target_temp = current_temp + temp_delta_per_second*PROFILE_SUBSTEP_SEC
-			next_target_ms = time.ticks_add( phase_start_ms, PROFILE_SUBSTEP_SEC*1000 )
-			# activate PID
-			if progress_cb!=None:
-				progress_cb( '%4is, set %3i' % (time.time()-phase_start_sec, int(sub_target_temp)) )
-			# IF the phase maintains the temperature THEN set the Final temperature
-			if target_temp==previous_temp:
-				self.p.temperature = target_temp
-			else:  # we apply a sub-step temperature
-				self.p.temperature = int(sub_target_temp)
-
-
-			while  True:
-				if not(self.p.run_app):
-					self.p.stop()
-					return 
-
-				if time.ticks_diff( next_target_ms, time.ticks_ms() ) < 0:
-					# It is time to calculate the next iteration value
-					sub_target_temp  += temp_delta_per_second*PROFILE_SUBSTEP_SEC
-					next_target_ms = time.ticks_add( next_target_ms, PROFILE_SUBSTEP_SEC*1000 )
-					# apply to PID
-					if progress_cb!=None:
-						progress_cb( '%3isec - %3i C' % (time.time()-phase_start_sec, int(sub_target_temp)) )
-					# IF the phase maintains the temperature THEN skip sub-temps assignation
-					if target_temp!=previous_temp:
-						self.p.temperature = int(sub_target_temp)
-				if (time.time()-phase_start_sec) >= target_seconds:
-					if progress_cb!=None:
-						progress_cb( '%4is end phase' % ( time.time()-phase_start_sec )  )
-					current_temp = target_temp
-					phase_start_sec = time.time()
-					phase_start_ms  = time.ticks_ms()
-					break # Lets process the next phase !
-				self.smart_sleep_ms( 100 )
-			previous_temp = target_temp # Remeber the previous phase temperature
+			if _t<cooling_stop_t:
+				break
+			if await self.p.ev.wait_press_ms( 500 ):
+				await self.p.ev.wait_release()
+				break
+		self.p.cooling.off()
+
+	async def profile_heating( self, profile, progress_cb=None ):
+		""" Follow a profile heating. See PROFILE_SNCU for info.
+		    The profile is compiled into a Trajectory sampled by the PID on every tick.
+		    progess_cb is called at each phase and every PROFILE_SUBSTEP_SEC. Must be a function(str) to capture profile follower debug message. """
+		# The feed-forward already anticipates the plate lag (theta): no setpoint lead then
+		self.state = 'reflow'
+		_lead = 0 if self.p.feedforward != None else PROFILE_LEAD_MS
+		traj = self.traj
+		traj.lead_ms = _lead
+		traj.load( profile, self.p.temperature )
+		self.recorder.start( self.profile or '', profile, self.store.liquidus( self.profile ), self.p.tick_stats )
+		self.p.follow( traj )
+		phase = -1
+		next_report = 0
+		while True:
+			if not(self.p.run_app):
+				self.p.stop()
+				self.p.phase = 0
+				self.end_run( aborted=True )
+				return
+
+			elapsed = traj.elapsed_ms()
+			i = traj.phase( elapsed )
+			if (self.p.cooldown != None) and self.p.cooldown.free:
+				i = traj.phases # The fans can not follow the cool-down ramp anymore: free cooling
+			if i != phase:
+				if (phase >= 0) and (progress_cb!=None):
+					progress_cb( '%4is end phase' % ((elapsed-traj.t[phase])//1000) )
+				if i >= traj.phases:
+					break # Profile done
+				phase = i
+				self.p.phase = i+1 # sent with the telemetry samples
+				# Ramps may request a faster regulation (or other gains) than the holds
+				self.p.control_period = traj.period[i]
+				self.p.use_gains( traj.gains[i] )
+				if i == traj.cool_from:
+					self.p.cool_down( traj, *COOL_GAINS, handover_ms=COOL_HANDOVER_MS )
+				if progress_cb!=None:
+					progress_cb( 'Phs %3i C..%3is' % (profile[i][0], profile[i][1]) )
+				next_report = traj.t[i]
+			if elapsed >= next_report:
+				if progress_cb!=None:
+					progress_cb( '%3isec - %3i C' % ((elapsed-traj.t[i])//1000, int(traj.at(elapsed))) )
+				next_report += PROFILE_SUBSTEP_SEC*1000
+			# Sleep until the next report or phase boundary
+			await asyncio.sleep_ms( max( 1, min( 500, next_report-elapsed, traj.t[i+1]-elapsed ) ) )
 
 		# Do not stop regulation but reduce it at 1°C 
 		#    this will keeps logging the temperature while cooling
 		self.p.temperature = 1
+		self.p.phase = 0
+		if self.p.cooldown != None:
+			self.p.end_cool_down() # App.cooling() takes over the fans
+		self.end_run()
+		self.p.control_period = PID_DT
+		self.p.use_gains( None )
 
 		# self.p.stop() # Stop the PID regulation!	
-		
 
-	def menu_loop( self ):
+	def end_run( self, aborted=False ):
+		""" Append the summary of the profile run to the history, returns its run number.
+		    A flash error does not stop the application """
+		if not( self.recorder.running ):
+			return None
+		_values = self.recorder.finish( aborted )
+		try:
+			return self.history.append( _values )
+		except OSError as e:
+			print( 'history: %s' % e )
+			return None
+
+	async def preheat( self, target_temp ):
+		""" Maintains the temperature until the button is pressed """
+		self.state = 'preheat'
+		self.p.lcd.clear()
+		self.p.lcd.print( "Pre-heating...", (0,0) )
+		self.p.enc.color = (255,0,0)
+		self.p.temperature = target_temp # Will start the PID
+		while True:
+			self.p.lcd.print( "temp: %3i C" % self.p.temperature, (0,1) )
+			if await self.p.ev.wait_press_ms( 500 ):
+				self.p.stop()
+				await self.p.ev.wait_release()
+				break
+
+	async def autotune( self ):
+		""" Relay autotune around AUTOTUNE_T. The gains are shown, then used and saved
+		    for the next boots only when [Save] is selected """
+		from autotune import TuneError
+		self.state = 'autotune'
+		self.p.lcd.clear()
+		self.p.lcd.print( "Autotune %3i C" % AUTOTUNE_T, (0,0) )
+		self.p.enc.color = (255,0,0)
+		def update_lcd( msg ):
+			self.p.lcd.print( msg, (0,1) )
+		_presses = self.p.ev.presses
+		def abort(): # RUN_APP switch or button, like the other heating modes
+			return not( self.p.run_app ) or self.p.ev.button or (self.p.ev.presses != _presses)
+		try:
+			gains = await self.p.autotune( AUTOTUNE_T, progress_cb=update_lcd, abort_func=abort )
+		except TuneError as e:
+			self.p.lcd.clear()
+			self.p.lcd.print( "Autotune %s" % e, (0,0) )
+			self.p.lcd.print( "gains unchanged", (0,1) )
+			await self.p.ev.wait_release()
+			if self.p.run_app:
+				await self.p.ev.wait_press()
+				await self.p.ev.wait_release()
+			return None
+		finally:
+			self.p.stop()
+		self.p.lcd.clear()
+		self.p.lcd.print( "Kp%5.2f Ki%5.3f" % (gains['Kp'], gains['Ki']), (0,0) )
+		self.p.lcd.print( "Kd%5.1f" % gains['Kd'], (0,1) )
+		await self.p.ev.wait_press()
+		await self.p.ev.wait_release()
+		# the previous gains stay in use unless the new ones are explicitly saved
+		self.p.lcd.clear()
+		self.p.lcd.print( "Save new gains?", (0,0) )
+		if await self.p.amenu_select( [(False,'[No]',(0,1)), (True,'[Save]',(10,1))], clear=False ):
+			self.p.apply_gains( gains )
+		await self.p.ev.wait_release()
+		return gains
+
+	async def menu_loop( self ):
 		# === Main Loop ===
 		while self.p.run_app:
+			self.state = 'menu'
 			self.p.enc.color = (0,255,0)
-			menu = self.p.menu_select( [ ('PREHEAT','[Pre-Heat]',(0,0)), ('COOL','[Cool]',(10,0)), ('REFLOW','[Reflow]',(0,1))] )
-			while self.p.enc.button:
-					pass
+			menu = await self.p.amenu_select( [ ('PREHEAT','[Pre-Heat]',(0,0)), ('COOL','[Cool]',(10,0)), ('REFLOW','[Reflow]',(0,1)), ('TUNE','[Tune]',(10,1))] )
+			await self.p.ev.wait_release()
 			if not(self.p.run_app):
 				break
 
 			if menu=='PREHEAT':
-				target_temp = self.p.int_select( "Pre-Heat temp?", "       %03i C", 100, imin=50, imax=250, istep=5 )
-				val = self.p.confirm_select( "Pre-heat %3i C" % target_temp )
-				# Wait button release
-				while self.p.enc.button:
-					pass
-
+				target_temp = await self.p.aint_select( "Pre-Heat temp?", "       %03i C", 100, imin=50, imax=250, istep=5 )
+				val = await self.p.aconfirm_select( "Pre-heat %3i C" % target_temp )
+				await self.p.ev.wait_release()
 				if not( val ):
 					continue # go to menu
 
-				# Pre Heating
-				self.p.lcd.clear()
-				self.p.lcd.print( "Pre-heating...", (0,0) )
-				self.p.enc.color = (255,0,0)
-				self.p.temperature = target_temp # Will start the PID
-				while True:
-					self.p.lcd.print( "temp: %3i C" % self.p.temperature, (0,1) )
-					if self.p.enc.button:
-						self.p.stop()
-						while self.p.enc.button:
-							pass
-						break
-					self.smart_sleep_ms( 500 )
+				await self.preheat( target_temp )
 				# Cooling (with automatic stop)
-				self.cooling( cooling_stop_t=COOLING_MIN_T )
+				await self.cooling( cooling_stop_t=COOLING_MIN_T )
 
 
 			elif menu=='COOL':
 				# Cooling (NO automatic stop)
-				self.cooling()
+				await self.cooling()
+
+
+			elif menu=='TUNE':
+				val = await self.p.aconfirm_select( "Autotune %3i C?" % AUTOTUNE_T )
+				await self.p.ev.wait_release()
+				if not( val ):
+					continue # go to menu
+				await self.autotune()
+				await self.cooling( cooling_stop_t=COOLING_MIN_T )
 
 
 			elif menu=='REFLOW':
-				# Dictionnary of Reflow profile availables
-				PROFILES = {'SnCu': PROFILE_SNCU }
-
-				def update_lcd( msg ):
-					# Called every PROFILE_SUBSTEP_SEC 
-					self.p.lcd.print( msg, (0,1) )
-				
-				profile_code = self.p.menu_select( [ ('SnCu','[SnCu]',(0,0)) ] )
-				# Wait button release
-				while self.p.enc.button:
-					pass
-
-				val = self.p.confirm_select( "%s reflow ?" % profile_code )
-				# Wait button release
-				while self.p.enc.button:
-					pass
+				profile_code = await self.select_profile()
+				try:
+					_profile = self.find_profile( profile_code )
+				except ValueError as e:
+					self.p.lcd.clear()
+					self.p.lcd.print( "Bad profile", (0,0) )
+					self.p.lcd.print( str( e )[:16], (0,1) )
+					await self.p.ev.wait_press()
+					await self.p.ev.wait_release()
+					continue # go to menu
 
+				self.p.lcd.clear()
+				self.p.lcd.print( "%s reflow ?" % profile_code, (0,0) )
+				val = await self.p.amenu_select( [(True,'[Yes]',(0,1)), ('BATCH','[Batch]',(5,1)), (False,'[No]',(12,1))], clear=False )
+				await self.p.ev.wait_release()
 				if not( val ):
 					continue # go to menu
 
+				if val == 'BATCH':
+					await self.batch( profile_code, _profile )
+				else:
+					await self.reflow( profile_code, _profile )
+
+	async def select_profile( self ):
+		""" Name of the profile chosen in the menu, 4 per screen ([>>] shows the next ones) """
+		_names = self.profile_names()
+		_first = 0
+		while True:
+			if len( _names ) <= 4:
+				_options = [ (_name, '[%s]' % _name[:NAME_LEN], ((i%2)*8, i//2)) for i, _name in enumerate( _names ) ]
+			else:
+				_options = [ (_name, '[%s]' % _name[:NAME_LEN], ((i%2)*8, i//2)) for i, _name in enumerate( _names[_first:_first+3] ) ]
+				_options.append( (None, '[>>]', (8,1)) )
+			profile_code = await self.p.amenu_select( _options )
+			await self.p.ev.wait_release()
+			if profile_code != None:
+				return profile_code
+			_first = _first+3 if _first+3 < len( _names ) else 0
+
+	async def reflow( self, profile_code, profile=None ):
+		""" Reflow with the profile profile_code (phases: profile or loaded), then cooling """
+		def update_lcd( msg ):
+			# Called every PROFILE_SUBSTEP_SEC
+			self.p.lcd.print( msg, (0,1) )
+
+		if profile == None:
+			profile = self.find_profile( profile_code )
+		self.profile = profile_code
+		self.p.lcd.clear()
+		self.p.enc.color = (255,0,0)
+		self.p.lcd.print( "%s reflow..." % profile_code, (0,0) )
+		try:
+			await self.profile_heating( profile, progress_cb=update_lcd )
+			# Cooling (with automatic stop)
+			await self.cooling( cooling_stop_t=100 )
+		finally:
+			self.p.stop() # Make sure PID is stopped! to avoid it to send a pulse. This will also stops the PID logging
+			self.p.phase = 0
+			self.end_run( aborted=True ) # interrupted during the profile
+			self.profile = None
+		await self.cooling( cooling_stop_t=COOLING_MIN_T )
+
+	async def batch( self, profile_code, profile=None ):
+		""" Back-to-back reflows with profile_code. After each board the plate is cooled
+		    to STANDBY_T and held there; [Next] (or the remote command next) starts the
+		    next board from the standby temperature, [End] cools the plate down """
+		def update_lcd( msg ):
+			self.p.lcd.print( msg, (0,1) )
+
+		_profile = profile if profile != None else self.find_profile( profile_code )
+		self.profile = profile_code
+		self.cycles = 0
+		self.cycle_ms = 0
+		self._batch_start = time.ticks_ms()
+		try:
+			while True:
+				_start = time.ticks_ms()
 				self.p.lcd.clear()
 				self.p.enc.color = (255,0,0)
-				self.p.lcd.print( "%s reflow..." % profile_code, (0,0) )
-				try:
-					self.profile_heating( PROFILES[profile_code], progress_cb=update_lcd )
-					# Cooling (with automatic stop)
-					self.cooling( cooling_stop_t=100 )
-				finally:
-					self.p.stop() # Make sure PID is stopped! to avoid it to send a pulse. This will also stops the PID logging
-				self.cooling( cooling_stop_t=COOLING_MIN_T )
+				self.p.lcd.print( "%s #%i" % (profile_code, self.cycles+1), (0,0) )
+				# the first phase keeps its ramp rate from the (standby) temperature
+				await self.profile_heating( from_start( _profile, self.p.temperature, PROFILE_COLD_T ), progress_cb=update_lcd )
+				if not( self.p.run_app ):
+					break
+				await self.cooling( cooling_stop_t=STANDBY_T )
+				self.p.temperature = STANDBY_T
+				self.cycles += 1
+				self.cycle_ms = time.ticks_diff( time.ticks_ms(), _start )
+				print( 'Batch %s #%i: %i sec, %.1f boards/h' % (profile_code, self.cycles, self.cycle_ms//1000, self.boards_per_hour()) )
+				if await self.standby() != 'NEXT':
+					break
+		finally:
+			self.p.stop()
+			self.p.phase = 0
+			self.end_run( aborted=True ) # interrupted during the profile
+			self.profile = None
+		await self.cooling( cooling_stop_t=COOLING_MIN_T )
+
+	async def standby( self ):
+		""" Hold STANDBY_T (PID running) until [Next] or [End], returns 'NEXT' or 'END' """
+		self.state = 'standby'
+		self._trigger = False
+		self.p.enc.color = (255,128,0)
+		self.p.lcd.clear()
+		def idle():
+			self.p.lcd.print( "n%3i %4is %3iC" % (self.cycles, self.cycle_ms//1000, self.p.temperature), (0,0) )
+			if not( self.p.run_app ):
+				return 'END'
+			if self._trigger:
+				return 'NEXT'
+			return None
+		idle()
+		_choice = await self.p.amenu_select( [('NEXT','[Next]',(0,1)), ('END','[End]',(11,1))], clear=False, idle_cb=idle, idle_ms=250 )
+		await self.p.ev.wait_release()
+		return _choice
+
+	def boards_per_hour( self ):
+		""" Throughput of the current (or last) batch, operator time included """
+		_ms = time.ticks_diff( time.ticks_ms(), self._batch_start )
+		return self.cycles*3600000/_ms if _ms > 0 else 0
+
+	# --- Remote control (see lib/remote.py), the commands must not block ---
+	def start_job( self, coro ):
+		""" Run the operation coro in place of the current one (menu included). None: stop it.
+		    The menu comes back at its end """
+		if self._next != None:
+			self._next.close() # never started
+		self._next = coro
+		if self._job != None:
+			self._job.cancel()
+
+	def cmd_state( self, args ):
+		return { 'state': self.state, 'temp': self.p.temperature, 'setpoint': self.p.setpoint, 'duty': self.p.duty,
+			'phase': self.p.phase, 'profile': self.profile, 'profiles': self.profile_names(),
+			'cycles': self.cycles, 'cycle_s': self.cycle_ms//1000 }
+
+	def cmd_preheat( self, args ):
+		_t = int( args )
+		if not( 50 <= _t <= 250 ):
+			raise ValueError( 'preheat temperature out of 50..250' )
+		async def _preheat():
+			await self.preheat( _t )
+			await self.cooling( cooling_stop_t=COOLING_MIN_T )
+		self.start_job( _preheat() )
+		return _t
 
+	def cmd_profile( self, args ):
+		_profile = self.find_profile( args )
+		if _profile == None:
+			raise ValueError( 'unknown profile %s' % args )
+		self.start_job( self.reflow( args, _profile ) )
+		return args
+
+	def cmd_batch( self, args ):
+		_profile = self.find_profile( args )
+		if _profile == None:
+			raise ValueError( 'unknown profile %s' % args )
+		self.start_job( self.batch( args, _profile ) )
+		return args
+
+	def cmd_next( self, args ):
+		""" Start the next board of the batch (as [Next]) """
+		if self.state != 'standby':
+			raise ValueError( 'not in standby' )
+		self._trigger = True
+		return self.cycles + 1
+
+	def cmd_history( self, args ):
+		""" [n]: the n (10, 50 max) last runs of the history, newest first """
+		_n = int( args ) if args else 10
+		if not( 1 <= _n <= 50 ):
+			raise ValueError( 'history count out of 1..50' )
+		try:
+			return self.history.last( _n )
+		except OSError as e:
+			raise ValueError( 'flash: %s' % e )
+
+	def cmd_boot( self, args ):
+		""" Boot timing and heap after the boot (see boot_report) """
+		return self.boot
+
+	def cmd_cool( self, args ):
+		_t = int( args ) if args else -1
+		self.start_job( self.cooling( cooling_stop_t=_t ) )
+		return _t
+
+	def cmd_stop( self, args ):
+		self.start_job( None )
+		return self.state
+
+	def cmd_upload( self, args ):
+		""" <name> <json list of phases>, see PROFILE_SNCU. Saved in the library of the flash """
+		_name, _json = args.split( None, 1 )
+		if self.profile == _name:
+			raise ValueError( 'profile %s in use' % _name )
+		try:
+			return len( self.store.save( _name, json.loads( _json ) ) )
+		except OSError as e:
+			raise ValueError( 'flash: %s' % e )
+
+	def cmd_remove( self, args ):
+		""" Remove a profile from the library of the flash """
+		if self.profile == args:
+			raise ValueError( 'profile %s in use' % args )
+		try:
+			if not self.store.remove( args ):
+				raise ValueError( 'profile %s not on the flash' % args )
+		except OSError as e:
+			raise ValueError( 'flash: %s' % e )
+		return args
+
+	async def main( self ):
+		""" Start the background tasks then run the menu (or the operations requested remotely) """
+		asyncio.create_task( self.p.ev.run() )
+		# regulation samples to the REPL or raw on the USB serial (see host/telemetry.py)
+		asyncio.create_task( self.p.log.drain( sys.stdout.buffer if TELEMETRY_BINARY else None ) )
+		if REMOTE_CONTROL:
+			from remote import RemoteControl
+			asyncio.create_task( RemoteControl( self ).run() )
+		if self.boot == None:
+			self.boot_report()
+		while self.p.run_app:
+			_coro, self._next = self._next, None
+			self._job = asyncio.create_task( _coro if _coro != None else self.menu_loop() )
+			try:
+				await self._job
+			except asyncio.CancelledError:
+				pass # replaced by a remote operation
+			finally:
+				self._job = None
+				# an interrupted operation leaves the plate safe
+				self.p.stop()
+				self.p.cooling.off()
 
 	def run( self ):
 		# Make sure we stop PID & restart microcontroler
 		# when unexpected thing happen
 		try:
-			self.menu_loop()
+			asyncio.run( self.main() )
 		except:
 			self.p.enc.color = (0,0,0)
 			self.p.stop()
 			reset()
 
 
-if __name__ == '__main__':
+def start():
+	""" Run the application: main.py, or the main.py stub of a precompiled install (install.sh --mpy) """
 	app = App()
 	try:
 		app.run()
 	finally:
 		app.p.lcd.print('Exit!', (0,1))
-		app.p.enc.color = (0,0,0)
\ No newline at end of file
+		app.p.enc.color = (0,0,0)
+
+if __name__ == '__main__':
+	start()